@@ -7,6 +7,21 @@ Point it at your own message and your own auto-approve limit.
   python approval_graph.py "refund my 120 euro plan" --answer denied
   python approval_graph.py "..." --model gemini-flash-latest
 
+Or a whole queue at once. Tickets are JSON lines, {"id": ..., "message": ...},
+run concurrently on one runner. Every ticket needs an id that is not pending
+from an earlier batch, the batch is refused otherwise. Approvals that need a
+human are persisted and answered later in bulk, from a JSONL of
+{"id": ..., "decision": ...} or all the same way.
+
+  python approval_graph.py --batch tickets.jsonl --rules --concurrency 32 --out results.jsonl
+  python approval_graph.py --pending
+  python approval_graph.py --decide decisions.jsonl
+  python approval_graph.py --decide-all denied
+
+--rules adds a deterministic pre-router in front of the LLM triage, it fills
+the Ticket itself when the intent and the amount are obvious and hands the
+message to the model only when unsure.
+
 Needs GEMINI_API_KEY in the environment and google-adk>=2.5.0.
 
 Verified against google-adk==2.5.0, Python 3.12, on 2026-07-20.
@@ -14,17 +29,24 @@ Verified against google-adk==2.5.0, Python 3.12, on 2026-07-20.
 
 import argparse
 import asyncio
+import json
+import os
+import re
+import time
 
 from pydantic import BaseModel
 
 from google.adk import Agent, Context, Workflow
 from google.adk.events import RequestInput
-from google.adk.runners import InMemoryRunner
+from google.adk.runners import InMemoryRunner, Runner
+from google.adk.sessions.sqlite_session_service import SqliteSessionService
 from google.adk.workflow import DEFAULT_ROUTE
 from google.genai import types
 
 APP = "approval_graph"
 USER = "local"
+SESSIONS_DB = "approval_sessions.db"
+PENDING_PATH = "approvals_pending.json"
 
 
 class Ticket(BaseModel):
@@ -33,7 +55,44 @@ class Ticket(BaseModel):
     summary: str
 
 
-def build(model: str, limit: float) -> Workflow:
+REFUND_WORDS = re.compile(r"\b(refund\w*|money back|reimburse\w*|charge ?back)\b", re.I)
+BUG_WORDS = re.compile(r"\b(bug|broken|crash\w*|error|not working|(doesn't|does not|won't) work)\b", re.I)
+# anything that can flip or blur the intent goes to the model
+UNSURE_WORDS = re.compile(r"\b(no|not|never|don't|dont|maybe|unless|instead|if|or)\b|\?", re.I)
+# the whole number token next to a currency marker, separators included
+AMOUNT = re.compile(r"(?:€|eur\s*)(\d[\d.,]*)|(?<![\d.,])(\d[\d.,]*)\s*(?:€|eur\b|euros?\b)", re.I)
+# plain digits with at most a two digit decimal part, "1,200" or "1.200" could be either
+PLAIN_AMOUNT = re.compile(r"\d+(?:[.,]\d{1,2})?")
+DECISIONS = ("approved", "denied")
+
+
+def parse_amounts(message: str) -> set | None:
+    """Every amount in the message, None if any of them is not an unambiguous number."""
+    amounts = set()
+    for a, b in AMOUNT.findall(message):
+        token = (a or b).rstrip(".,")
+        if not PLAIN_AMOUNT.fullmatch(token):
+            return None
+        amounts.add(float(token.replace(",", ".")))
+    return amounts
+
+
+def pre_route(message: str) -> Ticket | None:
+    """A Ticket for the obvious cases, None when the LLM should read it."""
+    amounts = parse_amounts(message)
+    if amounts is None:
+        return None
+    summary = re.split(r"(?<=[.!])\s", message.strip(), maxsplit=1)[0][:120]
+    refund, bug = REFUND_WORDS.search(message), BUG_WORDS.search(message)
+    if refund and not bug and len(amounts) == 1 and not UNSURE_WORDS.search(message):
+        return Ticket(category="REFUND", amount_eur=amounts.pop(), summary=summary)
+    # "not working" is the bug itself, any other negation or hedge is not obvious
+    if bug and not refund and not amounts and not UNSURE_WORDS.search(BUG_WORDS.sub("", message)):
+        return Ticket(category="BUG", amount_eur=0, summary=summary)
+    return None
+
+
+def build(model: str, limit: float, rules: bool = False, verbose: bool = True) -> Workflow:
     triage_agent = Agent(
         name="triage_agent",
         model=model,
@@ -46,6 +105,16 @@ summary is one short sentence in plain English.""",
         output_schema=Ticket,
     )
 
+    def pre_router(ctx: Context, node_input: types.Content):
+        message = "".join(p.text or "" for p in node_input.parts)
+        ticket = pre_route(message)
+        if ticket is None:
+            ctx.route = "UNSURE"
+            ctx.output = message
+        else:
+            ctx.route = "RULED"
+            ctx.output = ticket
+
     def route_ticket(ctx: Context, node_input: Ticket):
         if node_input.category != "REFUND":
             ctx.route = "NO_MONEY"
@@ -54,7 +123,8 @@ summary is one short sentence in plain English.""",
         else:
             ctx.route = "NEEDS_HUMAN"
         ctx.output = node_input
-        print(f"  [router] {node_input.category} {node_input.amount_eur:.2f} EUR -> {ctx.route}")
+        if verbose:
+            print(f"  [router] {node_input.category} {node_input.amount_eur:.2f} EUR -> {ctx.route}")
 
     def auto_approve(ctx: Context, node_input: Ticket):
         ctx.output = f"Auto approved {node_input.amount_eur:.2f} EUR, at or under the {limit:.0f} EUR limit."
@@ -80,10 +150,18 @@ summary is one short sentence in plain English.""",
     def unroutable(ctx: Context, node_input=None):
         ctx.output = "Could not route this one, escalating to a human queue."
 
+    if rules:
+        entry = [
+            ("START", pre_router),
+            (pre_router, {"RULED": route_ticket, "UNSURE": triage_agent, DEFAULT_ROUTE: unroutable}),
+            (triage_agent, route_ticket),
+        ]
+    else:
+        entry = [("START", triage_agent, route_ticket)]
     return Workflow(
         name=APP,
         edges=[
-            ("START", triage_agent, route_ticket),
+            *entry,
             (
                 route_ticket,
                 {
@@ -98,48 +176,256 @@ summary is one short sentence in plain English.""",
     )
 
 
-async def run(message: str, model: str, limit: float, canned: str | None):
-    runner = InMemoryRunner(agent=build(model, limit), app_name=APP)
+async def start(runner, message: str) -> dict:
+    """Runs one message until it finishes or suspends at the approval gate."""
     session = await runner.session_service.create_session(app_name=APP, user_id=USER)
-
-    interrupt_id = invocation_id = final = None
+    state = {"session_id": session.id, "interrupt_id": None, "invocation_id": None,
+             "final": None, "triage": "rules"}
     async for ev in runner.run_async(
         user_id=USER,
         session_id=session.id,
         new_message=types.Content(role="user", parts=[types.Part(text=message)]),
     ):
+        if ev.author == "triage_agent":
+            state["triage"] = "llm"
         if ev.long_running_tool_ids:
-            interrupt_id = list(ev.long_running_tool_ids)[0]
-            invocation_id = ev.invocation_id
+            state["interrupt_id"] = list(ev.long_running_tool_ids)[0]
+            state["invocation_id"] = ev.invocation_id
+        if ev.output is not None:
+            state["final"] = ev.output
+    return state
+
+
+async def resume(runner, session_id: str, interrupt_id: str, invocation_id: str, answer: str):
+    """Answers a suspended approval, returns the final output."""
+    final = None
+    resume = types.Part(
+        function_response=types.FunctionResponse(
+            id=interrupt_id, name="ask_for_approval", response={"decision": answer}
+        )
+    )
+    async for ev in runner.run_async(
+        user_id=USER,
+        session_id=session_id,
+        new_message=types.Content(role="user", parts=[resume]),
+        invocation_id=invocation_id,
+    ):
         if ev.output is not None:
             final = ev.output
+    return final
+
 
-    if interrupt_id:
+async def run(message: str, model: str, limit: float, canned: str | None, rules: bool = False):
+    runner = InMemoryRunner(agent=build(model, limit, rules), app_name=APP)
+    state = await start(runner, message)
+    final = state["final"]
+
+    if state["interrupt_id"]:
         print("  [graph suspended, nothing downstream has run]")
         answer = canned or input("  approve? [approved/denied] ").strip() or "denied"
-        resume = types.Part(
-            function_response=types.FunctionResponse(
-                id=interrupt_id, name="ask_for_approval", response={"decision": answer}
-            )
-        )
-        async for ev in runner.run_async(
-            user_id=USER,
-            session_id=session.id,
-            new_message=types.Content(role="user", parts=[resume]),
-            invocation_id=invocation_id,
-        ):
-            if ev.output is not None:
-                final = ev.output
+        final = await resume(runner, state["session_id"], state["interrupt_id"], state["invocation_id"], answer)
 
     print(f"\nresult: {final}\n")
     return final
 
 
+class PendingApprovals:
+    """Suspended approvals persisted as JSON, {ticket id: session, interrupt and the request}."""
+
+    def __init__(self, path=PENDING_PATH):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def add(self, ticket_id, entry):
+        # overwriting would orphan the suspended session of the earlier ticket
+        if ticket_id in self.entries:
+            raise ValueError(f"ticket {ticket_id} is already waiting for approval")
+        self.entries[ticket_id] = entry
+        self.save()
+
+    def remove(self, ticket_id):
+        if self.entries.pop(ticket_id, None) is not None:
+            self.save()
+
+    def save(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def batch_ids(tickets, pending) -> list:
+    """Ticket ids of a batch, every ticket needs its own id that is not pending already."""
+    missing = [n for n, ticket in enumerate(tickets, 1) if ticket.get("id") in (None, "")]
+    if missing:
+        raise ValueError(f"tickets without an id on lines {missing}, --batch needs an id per ticket")
+    ids = [str(ticket["id"]) for ticket in tickets]
+    duplicates = sorted({i for i in ids if ids.count(i) > 1})
+    if duplicates:
+        raise ValueError(f"ticket ids used more than once: {duplicates}")
+    taken = [i for i in ids if i in pending.entries]
+    if taken:
+        raise ValueError(f"ticket ids already waiting for approval: {taken}, decide them or use new ids")
+    return ids
+
+
+def _text(output) -> str:
+    return output.model_dump_json() if isinstance(output, BaseModel) else str(output)
+
+
+def _write(out, record):
+    print(f"  [{record['id']}] {record['status']:<8} {record.get('triage', ''):<5} {record['result']}")
+    if out:
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+
+
+async def run_batch(path, model, limit, rules, concurrency, sessions, pending_path, out_path, canned=None):
+    # one runner for the whole queue, sessions in SQLite so approvals outlive the process
+    runner = Runner(agent=build(model, limit, rules, verbose=False), app_name=APP,
+                    session_service=SqliteSessionService(sessions))
+    pending = PendingApprovals(pending_path)
+    with open(path) as f:
+        tickets = [json.loads(line) for line in f if line.strip()]
+    ids = batch_ids(tickets, pending)
+    slots = asyncio.Semaphore(concurrency)
+    counts = {"done": 0, "pending": 0, "error": 0, "llm": 0}
+    out = open(out_path, "a") if out_path else None
+    t0 = time.time()
+
+    async def one(ticket_id, ticket):
+        async with slots:
+            try:
+                state = await start(runner, ticket["message"])
+                if state["interrupt_id"] and canned:
+                    state["final"] = await resume(runner, state["session_id"], state["interrupt_id"],
+                                                  state["invocation_id"], canned)
+                    state["interrupt_id"] = None
+            except Exception as e:  # one bad ticket must not stop the queue
+                counts["error"] += 1
+                _write(out, {"id": ticket_id, "status": "error", "result": f"{type(e).__name__}: {e}"})
+                return
+        counts["llm"] += state["triage"] == "llm"
+        record = {"id": ticket_id, "triage": state["triage"]}
+        if state["interrupt_id"]:
+            ticket_state = state["final"]
+            pending.add(ticket_id, {
+                "session_id": state["session_id"], "interrupt_id": state["interrupt_id"],
+                "invocation_id": state["invocation_id"], "message": ticket["message"],
+                "rules": rules, "limit": limit,
+                "ticket": ticket_state.model_dump() if isinstance(ticket_state, BaseModel) else None,
+                "created": time.time(),
+            })
+            counts["pending"] += 1
+            record.update(status="pending", result="waiting for a human")
+        else:
+            counts["done"] += 1
+            record.update(status="done", result=_text(state["final"]))
+        _write(out, record)
+
+    try:
+        await asyncio.gather(*(one(ticket_id, ticket) for ticket_id, ticket in zip(ids, tickets)))
+    finally:
+        if out:
+            out.close()
+    print(f"\n{len(tickets)} tickets in {time.time() - t0:.1f}s, {counts['done']} done, "
+          f"{counts['pending']} waiting for approval, {counts['error']} failed, "
+          f"{counts['llm']} needed the LLM triage")
+    if counts["pending"]:
+        print(f"pending approvals saved to {pending_path}, answer them with --decide or --decide-all")
+
+
+async def decide(decisions, model, concurrency, sessions, pending_path, out_path):
+    """Resumes persisted approvals, decisions is {ticket id: "approved" | "denied"}."""
+    session_service = SqliteSessionService(sessions)
+    runners = {}
+    pending = PendingApprovals(pending_path)
+    slots = asyncio.Semaphore(concurrency)
+    out = open(out_path, "a") if out_path else None
+
+    def runner_for(entry):
+        # a run only resumes on the graph it was suspended in
+        key = (entry["rules"], entry["limit"])
+        if key not in runners:
+            runners[key] = Runner(agent=build(model, entry["limit"], entry["rules"], verbose=False),
+                                  app_name=APP, session_service=session_service)
+        return runners[key]
+
+    async def one(ticket_id, answer):
+        entry = pending.entries[ticket_id]
+        async with slots:
+            try:
+                final = await resume(runner_for(entry), entry["session_id"], entry["interrupt_id"],
+                                     entry["invocation_id"], answer)
+                if final is None:
+                    raise RuntimeError("the resumed run produced no output")
+            except Exception as e:  # stays pending, can be answered again
+                _write(out, {"id": ticket_id, "status": "error", "result": f"{type(e).__name__}: {e}"})
+                return
+        pending.remove(ticket_id)
+        _write(out, {"id": ticket_id, "status": answer, "result": _text(final)})
+
+    unknown = [t for t in decisions if t not in pending.entries]
+    if unknown:
+        print(f"  not pending, skipped: {', '.join(unknown[:10])}")
+    # settle reads anything but "approved" as a denial, a typo must not close a ticket
+    invalid = {t: a for t, a in decisions.items() if t in pending.entries and a not in DECISIONS}
+    for ticket_id, answer in invalid.items():
+        _write(out, {"id": ticket_id, "status": "error",
+                     "result": f"decision {answer!r} is not one of {', '.join(DECISIONS)}, left pending"})
+    try:
+        await asyncio.gather(*(one(t, a) for t, a in decisions.items()
+                               if t in pending.entries and t not in invalid))
+    finally:
+        if out:
+            out.close()
+    print(f"\n{len(pending.entries)} approvals still pending in {pending_path}")
+
+
+def show_pending(pending_path):
+    entries = PendingApprovals(pending_path).entries
+    for ticket_id, entry in entries.items():
+        ticket = entry.get("ticket") or {}
+        print(f"{ticket_id}\t{ticket.get('amount_eur', 0):.2f} EUR\t{ticket.get('summary') or entry['message']}")
+    print(f"{len(entries)} pending")
+
+
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
-    p.add_argument("message")
+    p.add_argument("message", nargs="?")
     p.add_argument("--limit", type=float, default=50, help="auto approve at or under this amount")
     p.add_argument("--model", default="gemini-flash-latest")
     p.add_argument("--answer", default=None, help="skip the prompt, approved or denied")
+    p.add_argument("--rules", action="store_true", help="pre-route obvious tickets without the LLM")
+    p.add_argument("--batch", help="JSONL of tickets, {\"id\": ..., \"message\": ...} per line")
+    p.add_argument("--concurrency", type=int, default=16, help="workflow runs in flight at once")
+    p.add_argument("--sessions", default=SESSIONS_DB, help="SQLite file holding the batch sessions")
+    p.add_argument("--pending-file", default=PENDING_PATH, help="where suspended approvals are kept")
+    p.add_argument("--out", help="append one JSON result per ticket here")
+    p.add_argument("--pending", action="store_true", help="list the approvals waiting for a human")
+    p.add_argument("--decide", help="JSONL of {\"id\": ..., \"decision\": ...} for pending approvals")
+    p.add_argument("--decide-all", choices=DECISIONS, help="answer every pending approval")
     a = p.parse_args()
-    asyncio.run(run(a.message, a.model, a.limit, a.answer))
+    if a.pending:
+        show_pending(a.pending_file)
+    elif a.decide or a.decide_all:
+        if a.decide:
+            with open(a.decide) as f:
+                decisions = {str(d["id"]): d["decision"] for d in (json.loads(line) for line in f if line.strip())}
+        else:
+            decisions = dict.fromkeys(PendingApprovals(a.pending_file).entries, a.decide_all)
+        asyncio.run(decide(decisions, a.model, a.concurrency, a.sessions, a.pending_file, a.out))
+    elif a.batch:
+        try:
+            asyncio.run(run_batch(a.batch, a.model, a.limit, a.rules, a.concurrency,
+                                  a.sessions, a.pending_file, a.out, a.answer))
+        except ValueError as e:
+            p.error(str(e))
+    elif a.message:
+        asyncio.run(run(a.message, a.model, a.limit, a.answer, a.rules))
+    else:
+        p.error("give a message, --batch, --pending, --decide or --decide-all")
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import approval_graph
+from approval_graph import pre_route
+
+
+class TestPreRoute(unittest.TestCase):
+
+    def test_obvious_refund(self):
+        ticket = pre_route("refund my 120 euro plan")
+        self.assertEqual((ticket.category, ticket.amount_eur), ("REFUND", 120))
+
+    def test_decimal_amount(self):
+        self.assertEqual(pre_route("I want my money back, €35.50 please.").amount_eur, 35.5)
+        self.assertEqual(pre_route("refund 9,99 EUR").amount_eur, 9.99)
+
+    def test_thousands_separator_goes_to_llm(self):
+        """A thousands separator must never be read as a decimal, 1,200 is not 200."""
+        self.assertIsNone(pre_route("refund my 1,200 euro laptop"))
+        self.assertIsNone(pre_route("Please refund 1.200 EUR for the annual plan."))
+        self.assertIsNone(pre_route("refund €1,200.50 now"))
+
+    def test_obvious_bug(self):
+        self.assertEqual(pre_route("The export button is broken").category, "BUG")
+        self.assertEqual(pre_route("Export is not working since Monday").category, "BUG")
+
+    def test_negated_bug_goes_to_llm(self):
+        self.assertIsNone(pre_route("This is not a bug, please cancel my account."))
+        self.assertIsNone(pre_route("Maybe the export is broken"))
+
+    def test_unsure_refund_goes_to_llm(self):
+        self.assertIsNone(pre_route("Can I get a refund?"))
+        self.assertIsNone(pre_route("I do not want a refund of 20 EUR"))
+        self.assertIsNone(pre_route("refund 10 EUR or 20 EUR"))
+
+
+class TestDecide(unittest.TestCase):
+
+    def test_invalid_decision_stays_pending(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pending_path = os.path.join(tmp, "pending.json")
+            approval_graph.PendingApprovals(pending_path).add("T1", {"message": "refund 900 EUR"})
+            out = StringIO()
+            with redirect_stdout(out):
+                asyncio.run(approval_graph.decide({"T1": "approve"}, "unused", 1,
+                                                  os.path.join(tmp, "s.db"), pending_path, None))
+            self.assertIn("not one of approved, denied", out.getvalue())
+            with open(pending_path) as f:
+                self.assertIn("T1", json.load(f))
+
+
+class TestBatchIds(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.pending = approval_graph.PendingApprovals(os.path.join(tmp.name, "pending.json"))
+        self.pending.add("T1", {"message": "refund 900 EUR"})
+
+    def test_ids_of_a_valid_batch(self):
+        tickets = [{"id": 7, "message": "a"}, {"id": "T2", "message": "b"}]
+        self.assertEqual(approval_graph.batch_ids(tickets, self.pending), ["7", "T2"])
+
+    def test_ticket_without_id_is_refused(self):
+        with self.assertRaisesRegex(ValueError, r"lines \[2\]"):
+            approval_graph.batch_ids([{"id": "T2", "message": "a"}, {"message": "b"}], self.pending)
+
+    def test_duplicate_id_is_refused(self):
+        with self.assertRaisesRegex(ValueError, "more than once"):
+            approval_graph.batch_ids([{"id": "T2", "message": "a"}, {"id": "T2", "message": "b"}], self.pending)
+
+    def test_pending_id_is_refused(self):
+        with self.assertRaisesRegex(ValueError, "already waiting"):
+            approval_graph.batch_ids([{"id": "T1", "message": "a"}], self.pending)
+
+    def test_add_does_not_overwrite(self):
+        with self.assertRaises(ValueError):
+            self.pending.add("T1", {"message": "another ticket"})
+        self.assertEqual(self.pending.entries["T1"]["message"], "refund 900 EUR")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,10 @@ history JSON you have to dig for. This wrapper runs the eval and prints, for
 every case and metric, the score AND the judge's written reason when there is
 one. Point it at your own agent and evalset.
 
+The eval runs through eval_runner.py, sharded across --workers adk eval
+processes, and cases whose agent source, inputs and config are unchanged are
+replayed from the recorded results. Pass --fresh to grade every case again.
+
 Usage:
     python eval_report.py AGENT_DIR EVALSET_JSON --config CONFIG_JSON
 
@@ -19,20 +23,11 @@ Requires the same env any adk eval needs, for the AI Studio key path:
     export GOOGLE_API_KEY=...
 """
 import argparse
-import glob
-import json
-import os
-import subprocess
 import sys
 
-_STATUS = {1: "PASSED", 2: "FAILED", 3: "NOT_EVALUATED"}
-
+from eval_runner import add_arguments, failed, run_eval
 
-def _latest_history(agent_dir: str) -> str:
-    hist = glob.glob(os.path.join(agent_dir, ".adk", "eval_history", "*.json"))
-    if not hist:
-        sys.exit("No eval history written, did the eval run fail?")
-    return max(hist, key=os.path.getmtime)
+_STATUS = {1: "PASSED", 2: "FAILED", 3: "NOT_EVALUATED"}
 
 
 def main() -> None:
@@ -40,15 +35,13 @@ def main() -> None:
     ap.add_argument("agent_dir", help="Path to the agent package dir")
     ap.add_argument("evalset", help="Path to the evalset JSON")
     ap.add_argument("--config", required=True, help="Path to the eval config JSON")
+    add_arguments(ap)
     args = ap.parse_args()
 
     # adk eval is the real work, we only re-read its history for the rationale.
-    proc = subprocess.run(
-        ["adk", "eval", args.agent_dir, args.evalset, "--config_file_path", args.config],
-        stderr=subprocess.DEVNULL,
-    )
-
-    data = json.load(open(_latest_history(args.agent_dir)))
+    data = run_eval(args.agent_dir, args.evalset, args.config, args.workers, args.fresh)
+    if not data["eval_case_results"]:
+        sys.exit("No eval history written, did the eval run fail?")
     print("\n=== Eval report, scores and the judge's reasons ===")
     for case in data["eval_case_results"]:
         inv = case["eval_metric_result_per_invocation"][0]
@@ -60,7 +53,8 @@ def main() -> None:
                   f"score={m['score']} threshold={m['threshold']}")
             for r in (m["details"].get("rubric_scores") or []):
                 print(f"      why [{r.get('rubric_id')}] {r.get('score')}: {r.get('rationale', '').strip()}")
-    sys.exit(proc.returncode)
+    print(f"\n{data['executed']} cases graded, {data['replayed']} replayed from earlier runs")
+    sys.exit(1 if failed(data) else 0)
 
 
 if __name__ == "__main__":
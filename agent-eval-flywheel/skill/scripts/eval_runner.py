@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""Run an ADK eval sharded across parallel `adk eval` processes, with replay.
+
+A plain `adk eval` runs every case one after the other, and every turn of the
+fix loop asks the agent model and the judge again for every case, even the
+ones nothing changed for. This runner does two things about that.
+
+1. Sharding. The evalset is split into shards, each shard is written as its
+   own evalset and graded by its own `adk eval` process, several at a time.
+2. Replay. Every graded case is recorded in a content addressed cassette under
+   AGENT_DIR/.adk/eval_cassette/. The key hashes the agent package source
+   (instruction and tools) and its .env (where the model is set, credentials
+   left out), the eval case (inputs and references), the eval config and the
+   adk version. A case whose key is already in the cassette is replayed from
+   it without calling the agent or the judge, only cases whose instruction,
+   tools, model or inputs changed run again. Only cases that passed every
+   metric are recorded, a failed or not evaluated case may be a transient
+   agent, API or judge error and is graded again on the next run.
+
+The recorded result is the case's eval result as adk writes it to the eval
+history, the agent's answer, the tool calls and the judge's scores and reasons.
+Shard histories are read back through eval_store.py, and every invocation is
+recorded there as one run, replayed cases included.
+
+Usage:
+    python eval_runner.py AGENT_DIR EVALSET_JSON --config CONFIG_JSON [--workers 4] [--fresh]
+
+eval_report.py and optimize/propose_fix.py run their evals through it.
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
+
+from eval_store import EvalStore
+
+DEFAULT_WORKERS = 4
+PASSED, FAILED = 1, 2
+# .env lines left out of the fingerprint, rotating a key must not invalidate the cassette
+SECRET_WORDS = ("KEY", "TOKEN", "SECRET", "PASSWORD", "CREDENTIAL")
+
+
+def _adk_version():
+    try:
+        return metadata.version("google-adk")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def agent_fingerprint(agent_dir):
+    """Hash of every source file of the agent package and its .env, instruction, tools and model live there."""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(agent_dir):
+        dirs[:] = sorted(d for d in dirs if d not in (".adk", "__pycache__"))
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if name == ".env":
+                digest.update(os.path.relpath(path, agent_dir).encode())
+                digest.update(_env_settings(path))
+            elif name.endswith((".py", ".json", ".yaml", ".yml", ".txt", ".md")):
+                digest.update(os.path.relpath(path, agent_dir).encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _env_settings(path):
+    """The .env lines that are not credentials, e.g. the model name, as bytes."""
+    with open(path, "rb") as f:
+        lines = f.read().decode(errors="replace").splitlines()
+    kept = [line.strip() for line in lines
+            if line.strip() and not any(word in line.partition("=")[0].upper() for word in SECRET_WORDS)]
+    return "\n".join(kept).encode()
+
+
+def recordable(case_result):
+    """True if every metric of the case was graded and passed, only those are recorded."""
+    statuses = [
+        m.get("eval_status")
+        for inv in case_result.get("eval_metric_result_per_invocation", [])
+        for m in inv.get("eval_metric_results", [])
+    ]
+    return bool(statuses) and all(status == PASSED for status in statuses)
+
+
+def case_key(agent_hash, case, config):
+    payload = json.dumps([agent_hash, case, config, _adk_version()], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class Cassette:
+    """Recorded case results, one JSON file per content hash."""
+
+    def __init__(self, agent_dir):
+        self.path = os.path.join(agent_dir, ".adk", "eval_cassette")
+        os.makedirs(self.path, exist_ok=True)
+
+    def get(self, key):
+        try:
+            with open(os.path.join(self.path, f"{key}.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, case_result):
+        tmp = os.path.join(self.path, f"{key}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(case_result, f)
+        os.replace(tmp, os.path.join(self.path, f"{key}.json"))
+
+
+def _run_shard(agent_dir, evalset, cases, config_path, shard_dir, index):
+    """Grades `cases` with one adk eval process, returns the shard's unique eval set id."""
+    eval_set_id = f"{evalset['eval_set_id']}__shard{index}_{os.getpid()}_{time.time_ns()}"
+    shard_path = os.path.join(shard_dir, f"shard{index}.evalset.json")
+    with open(shard_path, "w") as f:
+        json.dump({**evalset, "eval_set_id": eval_set_id, "eval_cases": cases}, f)
+
+    subprocess.run(
+        ["adk", "eval", agent_dir, shard_path, "--config_file_path", config_path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return eval_set_id
+
+
+def run_eval(agent_dir, evalset_path, config_path, workers=DEFAULT_WORKERS, fresh=False):
+    """Grades an evalset, replaying unchanged cases from the cassette.
+
+    Returns a history shaped dict, {"run_id", "eval_case_results": [...], "replayed": n,
+    "executed": n, "missing": [...]}, with the case results in evalset order.
+    """
+    with open(evalset_path) as f:
+        evalset = json.load(f)
+    with open(config_path) as f:
+        config = json.load(f)
+
+    cassette = Cassette(agent_dir)
+    store = EvalStore(agent_dir)
+    agent_hash = agent_fingerprint(agent_dir)
+    keys = {case["eval_id"]: case_key(agent_hash, case, config) for case in evalset["eval_cases"]}
+
+    results = {}
+    pending = []
+    for case in evalset["eval_cases"]:
+        recorded = None if fresh else cassette.get(keys[case["eval_id"]])
+        if recorded is not None:
+            results[case["eval_id"]] = recorded
+        else:
+            pending.append(case)
+    replayed = len(results)
+
+    if pending:
+        workers = max(1, min(workers, len(pending)))
+        shards = [pending[i::workers] for i in range(workers)]
+        with tempfile.TemporaryDirectory() as shard_dir, ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_run_shard, agent_dir, evalset, shard, config_path, shard_dir, index)
+                for index, shard in enumerate(shards)
+            ]
+            shard_ids = [future.result() for future in futures]
+
+        store.ingest()
+        for index, eval_set_id in enumerate(shard_ids):
+            case_results = store.case_results_for(eval_set_id)
+            if case_results is None:
+                print(f"shard {index}: no eval history written, did the eval run fail?", file=sys.stderr)
+                continue
+            for case_result in case_results:
+                eval_id = case_result["eval_id"]
+                results[eval_id] = case_result
+                if recordable(case_result):
+                    cassette.put(keys[eval_id], case_result)
+
+    missing = [case["eval_id"] for case in evalset["eval_cases"] if case["eval_id"] not in results]
+    if missing:
+        print(f"No results for cases: {', '.join(missing)}", file=sys.stderr)
+    case_results = [results[case["eval_id"]] for case in evalset["eval_cases"] if case["eval_id"] in results]
+    run_id = f"runner_{evalset['eval_set_id']}_{time.time_ns()}"
+    store.record_run(run_id, evalset["eval_set_id"], case_results)
+    store.close()
+    return {
+        "run_id": run_id,
+        "eval_case_results": case_results,
+        "replayed": replayed,
+        "executed": len(pending),
+        "missing": missing,
+    }
+
+
+def failed(history):
+    """True if any case is missing or any metric of any case failed."""
+    if history["missing"]:
+        return True
+    return any(
+        m["eval_status"] == FAILED
+        for case in history["eval_case_results"]
+        for inv in case["eval_metric_result_per_invocation"]
+        for m in inv["eval_metric_results"]
+    )
+
+
+def add_arguments(ap):
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                    help="Parallel adk eval processes (default %(default)s)")
+    ap.add_argument("--fresh", action="store_true",
+                    help="Ignore recorded results and grade every case again")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sharded adk eval with replay of unchanged cases.")
+    ap.add_argument("agent_dir", help="Path to the agent package dir")
+    ap.add_argument("evalset", help="Path to the evalset JSON")
+    ap.add_argument("--config", required=True, help="Path to the eval config JSON")
+    add_arguments(ap)
+    args = ap.parse_args()
+
+    started = time.time()
+    history = run_eval(args.agent_dir, args.evalset, args.config, args.workers, args.fresh)
+    for case in history["eval_case_results"]:
+        for inv in case["eval_metric_result_per_invocation"]:
+            for m in inv["eval_metric_results"]:
+                print(f"{case['eval_id']}  {m['metric_name']}: score={m['score']} threshold={m['threshold']}")
+    print(f"\n{history['executed']} cases graded, {history['replayed']} replayed "
+          f"in {time.time() - started:.1f}s")
+    sys.exit(1 if failed(history) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""An indexed store of eval runs, instead of globbing .adk/eval_history.
+
+Every `adk eval` writes one more history JSON under AGENT_DIR/.adk/eval_history/
+and over a long optimization campaign they pile up. Finding the newest one by
+globbing and stat-ing all of them, then loading the whole file, gets slower
+with every run. This store keeps the runs in one append only SQLite database,
+AGENT_DIR/.adk/eval_store.sqlite, with one row per run, per case and per
+metric, indexed by run, case and metric.
+
+History files are ingested incrementally, a file is parsed once and skipped
+afterwards. eval_runner.py also records each whole runner invocation,
+replayed cases included, as one run of source "runner", so turns of the fix
+loop can be compared with each other.
+
+Usage:
+    python eval_store.py AGENT_DIR runs [--limit 20]
+    python eval_store.py AGENT_DIR regressions [BASE_RUN NEW_RUN] [--eval-set NAME]
+    python eval_store.py AGENT_DIR trend [--metric NAME] [--limit 20]
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+
+PASSED, FAILED = 1, 2
+_STATUS = {1: "PASSED", 2: "FAILED", 3: "NOT_EVALUATED"}
+# eval_runner.py grades shards under eval set ids like "<id>__shard0_<pid>_<ns>"
+_SHARD_SUFFIX = re.compile(r"__shard\d+_\d+_\d+$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    eval_set_id TEXT NOT NULL,
+    eval_set TEXT NOT NULL,
+    source TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS case_results (
+    run_id TEXT NOT NULL,
+    eval_id TEXT NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (run_id, eval_id)
+);
+CREATE TABLE IF NOT EXISTS metric_results (
+    run_id TEXT NOT NULL,
+    eval_id TEXT NOT NULL,
+    invocation INTEGER NOT NULL,
+    metric_name TEXT NOT NULL,
+    status INTEGER,
+    score REAL,
+    threshold REAL
+);
+CREATE INDEX IF NOT EXISTS runs_by_set ON runs (eval_set, source, created);
+CREATE INDEX IF NOT EXISTS runs_by_set_id ON runs (eval_set_id);
+CREATE INDEX IF NOT EXISTS metrics_by_run ON metric_results (run_id, eval_id, metric_name);
+CREATE INDEX IF NOT EXISTS metrics_by_case ON metric_results (eval_id, metric_name);
+CREATE INDEX IF NOT EXISTS metrics_by_metric ON metric_results (metric_name, run_id);
+"""
+
+
+def eval_set_name(eval_set_id):
+    return _SHARD_SUFFIX.sub("", eval_set_id)
+
+
+class EvalStore:
+    """SQLite store of eval runs for one agent dir."""
+
+    def __init__(self, agent_dir):
+        self.agent_dir = agent_dir
+        self.history_dir = os.path.join(agent_dir, ".adk", "eval_history")
+        os.makedirs(os.path.join(agent_dir, ".adk"), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(agent_dir, ".adk", "eval_store.sqlite"), timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def ingest(self):
+        """Ingests history files not seen before, returns the number of new runs."""
+        if not os.path.isdir(self.history_dir):
+            return 0
+        seen = dict(self.db.execute("SELECT path, mtime FROM ingested_files"))
+        added = 0
+        for entry in os.scandir(self.history_dir):
+            if not entry.name.endswith(".json") or not entry.is_file():
+                continue
+            stat = entry.stat()
+            if seen.get(entry.name) == stat.st_mtime:
+                continue
+            try:
+                with open(entry.path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                # Still being written, picked up by the next ingest
+                continue
+            run_id = data.get("eval_set_result_id") or os.path.splitext(entry.name)[0]
+            with self.db:
+                self._insert_run(
+                    run_id,
+                    data.get("eval_set_id", ""),
+                    "adk",
+                    data.get("creation_timestamp") or stat.st_mtime,
+                    data.get("eval_case_results", []),
+                )
+                self.db.execute(
+                    "INSERT OR REPLACE INTO ingested_files (path, mtime, size) VALUES (?, ?, ?)",
+                    (entry.name, stat.st_mtime, stat.st_size),
+                )
+            added += 1
+        return added
+
+    def record_run(self, run_id, eval_set_id, case_results, source="runner"):
+        """Appends a run assembled outside adk, e.g. by eval_runner.py with replayed cases."""
+        with self.db:
+            self._insert_run(run_id, eval_set_id, source, time.time(), case_results)
+
+    def _insert_run(self, run_id, eval_set_id, source, created, case_results):
+        self.db.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+        self.db.execute("DELETE FROM case_results WHERE run_id = ?", (run_id,))
+        self.db.execute("DELETE FROM metric_results WHERE run_id = ?", (run_id,))
+        self.db.execute(
+            "INSERT INTO runs (run_id, eval_set_id, eval_set, source, created) VALUES (?, ?, ?, ?, ?)",
+            (run_id, eval_set_id, eval_set_name(eval_set_id), source, created),
+        )
+        self.db.executemany(
+            "INSERT OR REPLACE INTO case_results (run_id, eval_id, result) VALUES (?, ?, ?)",
+            [(run_id, case["eval_id"], json.dumps(case)) for case in case_results],
+        )
+        self.db.executemany(
+            "INSERT INTO metric_results (run_id, eval_id, invocation, metric_name, status, score, threshold) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (run_id, case["eval_id"], index, m["metric_name"], m.get("eval_status"),
+                 m.get("score"), m.get("threshold"))
+                for case in case_results
+                for index, inv in enumerate(case.get("eval_metric_result_per_invocation", []))
+                for m in inv.get("eval_metric_results", [])
+            ],
+        )
+
+    def case_results_for(self, eval_set_id):
+        """The eval case results of the newest run of `eval_set_id`, or None."""
+        row = self.db.execute(
+            "SELECT run_id FROM runs WHERE eval_set_id = ? ORDER BY created DESC LIMIT 1", (eval_set_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return [
+            json.loads(result)
+            for (result,) in self.db.execute("SELECT result FROM case_results WHERE run_id = ?", (row[0],))
+        ]
+
+    def runs(self, eval_set=None, source=None, limit=20):
+        """Newest first, [(run_id, eval_set, source, created, cases, failed metrics)]."""
+        query = (
+            "SELECT r.run_id, r.eval_set, r.source, r.created, "
+            "COUNT(DISTINCT m.eval_id), COALESCE(SUM(m.status = ?), 0) "
+            "FROM runs r LEFT JOIN metric_results m ON m.run_id = r.run_id WHERE 1=1"
+        )
+        params = [FAILED]
+        if eval_set:
+            query += " AND r.eval_set = ?"
+            params.append(eval_set)
+        if source:
+            query += " AND r.source = ?"
+            params.append(source)
+        query += " GROUP BY r.run_id ORDER BY r.created DESC LIMIT ?"
+        return self.db.execute(query, params + [limit]).fetchall()
+
+    def regressions(self, base_run, new_run):
+        """Case metrics that went from passed to failed, or lost score, between two runs."""
+        return self.db.execute(
+            "SELECT n.eval_id, n.metric_name, b.status, b.score, n.status, n.score "
+            "FROM metric_results n JOIN metric_results b "
+            "ON b.run_id = ? AND b.eval_id = n.eval_id AND b.metric_name = n.metric_name "
+            "AND b.invocation = n.invocation "
+            "WHERE n.run_id = ? AND ((b.status = ? AND n.status = ?) OR n.score < b.score) "
+            "ORDER BY n.eval_id, n.metric_name",
+            (base_run, new_run, PASSED, FAILED),
+        ).fetchall()
+
+    def trend(self, eval_set=None, metric_name=None, source="runner", limit=20):
+        """Per run and metric, oldest first, [(run_id, created, metric, mean score, passed, total)]."""
+        query = (
+            "SELECT r.run_id, r.created, m.metric_name, AVG(m.score), SUM(m.status = ?), COUNT(*) "
+            "FROM (SELECT * FROM runs WHERE source = ?"
+        )
+        params = [PASSED, source]
+        if eval_set:
+            query += " AND eval_set = ?"
+            params.append(eval_set)
+        query += " ORDER BY created DESC LIMIT ?) r JOIN metric_results m ON m.run_id = r.run_id"
+        params.append(limit)
+        if metric_name:
+            query += " WHERE m.metric_name = ?"
+            params.append(metric_name)
+        query += " GROUP BY r.run_id, m.metric_name ORDER BY r.created, m.metric_name"
+        return self.db.execute(query, params).fetchall()
+
+
+def _when(created):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Query the eval runs of an agent.")
+    ap.add_argument("agent_dir", help="Path to the agent package dir")
+    sub = ap.add_subparsers(dest="command", required=True)
+    runs = sub.add_parser("runs", help="List the newest runs")
+    runs.add_argument("--eval-set")
+    runs.add_argument("--source", choices=["runner", "adk"])
+    runs.add_argument("--limit", type=int, default=20)
+    reg = sub.add_parser("regressions", help="Case metrics that got worse between two runs")
+    reg.add_argument("base_run", nargs="?")
+    reg.add_argument("new_run", nargs="?")
+    reg.add_argument("--eval-set", help="compare its two newest runs, default the eval set of the newest run")
+    trend = sub.add_parser("trend", help="Mean score and pass count per run and metric")
+    trend.add_argument("--eval-set")
+    trend.add_argument("--metric")
+    trend.add_argument("--source", choices=["runner", "adk"], default="runner")
+    trend.add_argument("--limit", type=int, default=20)
+    args = ap.parse_args()
+
+    store = EvalStore(args.agent_dir)
+    store.ingest()
+
+    if args.command == "runs":
+        for run_id, eval_set, source, created, cases, fails in store.runs(args.eval_set, args.source, args.limit):
+            print(f"{_when(created)}  {source:6}  {run_id}  {eval_set}  cases={cases} failed_metrics={fails}")
+    elif args.command == "regressions":
+        base_run, new_run = args.base_run, args.new_run
+        if not (base_run and new_run):
+            # runs of different eval sets share no cases, default to the newest run's set
+            newest = store.runs(args.eval_set, "runner", limit=1)
+            eval_set = args.eval_set or (newest[0][1] if newest else None)
+            latest = store.runs(eval_set, "runner", limit=2)
+            if len(latest) < 2:
+                sys.exit(f"Need two runner runs of {eval_set or 'one eval set'} to compare, "
+                         "or pass BASE_RUN NEW_RUN.")
+            new_run, base_run = latest[0][0], latest[1][0]
+        rows = store.regressions(base_run, new_run)
+        print(f"{base_run} -> {new_run}: {len(rows)} regressions")
+        for eval_id, metric, b_status, b_score, n_status, n_score in rows:
+            print(f"  {eval_id}  {metric}: {_STATUS.get(b_status, b_status)} {b_score} -> "
+                  f"{_STATUS.get(n_status, n_status)} {n_score}")
+    else:
+        for run_id, created, metric, mean, passed, total in store.trend(
+                args.eval_set, args.metric, args.source, args.limit):
+            score = "-" if mean is None else f"{mean:.3f}"
+            print(f"{_when(created)}  {run_id}  {metric}: mean={score} passed={passed}/{total}")
+
+
+if __name__ == "__main__":
+    main()
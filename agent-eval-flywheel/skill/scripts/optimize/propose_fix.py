@@ -10,31 +10,28 @@ it, and if you agree, you paste it into the agent and rerun.
 The model that proposes the fix is deliberately NOT the judge that graded it,
 same decoupling rule as the flywheel, whatever proposes a fix never grades it.
 
+The eval runs through ../eval_runner.py, so between turns of the loop only
+the cases affected by the changed instruction are graded again, the rest are
+replayed from the recorded results.
+
 Usage:
-    python propose_fix.py AGENT_DIR EVALSET --config CONFIG_JSON
+    python propose_fix.py AGENT_DIR EVALSET --config CONFIG_JSON [--workers 4] [--fresh]
 
 Requires the same env any adk eval needs, for the AI Studio key path:
     export GOOGLE_GENAI_USE_VERTEXAI=0
     export GOOGLE_API_KEY=...
 """
 import argparse
-import glob
-import json
 import os
 import re
-import subprocess
 import sys
 
 from google import genai
 
-_PROPOSER_MODEL = "gemini-2.5-flash"
-
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from eval_runner import add_arguments, run_eval  # noqa: E402
 
-def _latest_history(agent_dir):
-    hist = glob.glob(os.path.join(agent_dir, ".adk", "eval_history", "*.json"))
-    if not hist:
-        sys.exit("No eval history written, did the eval run fail?")
-    return max(hist, key=os.path.getmtime)
+_PROPOSER_MODEL = "gemini-2.5-flash"
 
 
 def _read_instruction(agent_dir):
@@ -62,11 +59,12 @@ def main():
     ap.add_argument("agent_dir")
     ap.add_argument("evalset")
     ap.add_argument("--config", required=True)
+    add_arguments(ap)
     args = ap.parse_args()
 
-    subprocess.run(["adk", "eval", args.agent_dir, args.evalset,
-                    "--config_file_path", args.config], stderr=subprocess.DEVNULL)
-    history = json.load(open(_latest_history(args.agent_dir)))
+    history = run_eval(args.agent_dir, args.evalset, args.config, args.workers, args.fresh)
+    if not history["eval_case_results"]:
+        sys.exit("No eval history written, did the eval run fail?")
     fails = _failures(history)
     if not fails:
         print("No failing rubrics, nothing to fix.")
@@ -22,6 +22,8 @@ root_agent = Agent(
     tools=[
         github_tools.fetch_github_issue,
         github_tools.fetch_github_directory,
+        github_tools.fetch_github_repository_tree,
+        github_tools.fetch_github_files,
         github_tools.post_github_comment,
         github_tools.create_github_branch,
         github_tools.update_github_file,
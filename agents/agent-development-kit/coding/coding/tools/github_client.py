@@ -0,0 +1 @@
+../../../../agent-engine/coding/agent/github_client.py
\ No newline at end of file
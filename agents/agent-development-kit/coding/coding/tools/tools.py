@@ -12,6 +12,8 @@ load_dotenv()
 
 from rich.console import Console
 
+from .github_client import GitHubClient
+
 console = Console()
 
 
@@ -31,6 +33,8 @@ class GitHubTools:
                                       Options: AuthMethod.TOKEN (Personal Access Token) or AuthMethod.APP (GitHub App)
         """
         self.auth_method = auth_method
+        # Pooled, ETag caching client shared by all tools
+        self.client = GitHubClient(self._get_auth_headers)
         self.installation_id = None
         self.installation_token = None
         self.installation_token_expires_at = None
@@ -154,11 +158,11 @@ class GitHubTools:
                 return None
 
             # Get the installation token
-            url = f"https://api.github.com/app/installations/{installation_id}/access_tokens"
+            url = f"{self.client.base_url}/app/installations/{installation_id}/access_tokens"
             headers = {"Authorization": f"Bearer {self.token}", "Accept": "application/vnd.github.v3+json"}
 
             console.print(f"[cyan]Requesting installation token for installation ID: {installation_id}[/cyan]")
-            response = requests.post(url, headers=headers)
+            response = self.client.session.post(url, headers=headers)
 
             if response.status_code != 201:
                 console.print(f"[red]Error getting installation token: {response.status_code} - {response.text}[/red]")
@@ -212,11 +216,9 @@ class GitHubTools:
         """
         console.print("[cyan]USE TOOL FETCH_ISSUE[/cyan]")
 
-        headers = self._get_auth_headers()
-
         # Fetch issue details
-        issue_url = f"https://api.github.com/repos/{owner}/{repo}/issues/{issue_number}"
-        issue_response = requests.get(issue_url, headers=headers)
+        issue_url = f"repos/{owner}/{repo}/issues/{issue_number}"
+        issue_response = self.client.get(issue_url)
         #print(issue_response)
         if issue_response.status_code != 200:
             return {"error": f"Failed to fetch issue: {issue_response.text}"}
@@ -225,7 +227,7 @@ class GitHubTools:
 
         # Fetch issue comments
         comments_url = issue_data.get("comments_url")
-        comments_response = requests.get(comments_url, headers=headers)
+        comments_response = self.client.get(comments_url)
         comments = []
         if comments_response.status_code == 200:
             comments = [comment["body"] for comment in comments_response.json()]
@@ -256,12 +258,10 @@ class GitHubTools:
             dict: Content of the directory or file.
         """
         console.print("[cyan]USE TOOL FETCH_DIRECTORY[/cyan]")
-        url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}?ref={branch}"
+        url = f"repos/{owner}/{repo}/contents/{path}?ref={branch}"
         console.print(f"[cyan]Fetching from {url}[/cyan]")
 
-        headers = self._get_auth_headers()
-
-        response = requests.get(url, headers=headers)
+        response = self.client.get(url)
         if response.status_code != 200:
             return {"error": f"Failed to fetch directory contents: {response.text}"}
 
@@ -282,6 +282,65 @@ class GitHubTools:
 
         return response.json()
 
+    def fetch_github_repository_tree(self, owner: str, repo: str, branch: str = "main", path: str = ""):
+        """
+        Lists all files of a GitHub repository (recursively) with a single request.
+
+        Args:
+            owner (str): GitHub repository owner.
+            repo (str): Repository name.
+            branch (str): The branch to list (defaults to "main").
+            path (str): Optional directory to restrict the listing to.
+
+        Returns:
+            dict: File paths with their sizes, and whether GitHub truncated the listing.
+        """
+        console.print("[cyan]USE TOOL FETCH_REPOSITORY_TREE[/cyan]")
+
+        tree = self.client.get_tree(owner, repo, branch)
+        if "error" in tree:
+            return tree
+
+        prefix = path.strip("/") + "/" if path.strip("/") else ""
+        files = [
+            {"path": entry["path"], "size": entry["size"]}
+            for entry in tree["entries"]
+            if entry["type"] == "blob" and entry["path"].startswith(prefix)
+        ]
+        return {"files": files, "truncated": tree["truncated"]}
+
+    def fetch_github_files(self, owner: str, repo: str, paths: list[str], branch: str = "main"):
+        """
+        Fetches the content of several files of a GitHub repository at once.
+
+        Args:
+            owner (str): GitHub repository owner.
+            repo (str): Repository name.
+            paths (list[str]): File paths within the repository.
+            branch (str): The branch to fetch from (defaults to "main").
+
+        Returns:
+            dict: Mapping of file path to content, or to an error message.
+        """
+        console.print(f"[cyan]USE TOOL FETCH_FILES ({len(paths)} files)[/cyan]")
+
+        tree = self.client.get_tree(owner, repo, branch)
+        if "error" in tree:
+            return tree
+
+        shas = {entry["path"]: entry["sha"] for entry in tree["entries"] if entry["type"] == "blob"}
+        blobs = self.client.get_blobs(owner, repo, [shas[path] for path in paths if path in shas])
+
+        files = {}
+        for path in paths:
+            if path not in shas:
+                files[path] = {"error": "File not found"}
+            elif blobs.get(shas[path]) is None:
+                files[path] = {"error": "Binary file or failed to fetch"}
+            else:
+                files[path] = blobs[shas[path]]
+        return files
+
     def create_github_branch(self, owner: str, repo: str, new_branch: str):
         """
         Creates a new branch in a GitHub repository
@@ -297,11 +356,9 @@ class GitHubTools:
         # print("USE TOOL CREATE_BRANCH")
         console.print("[cyan]USE TOOL CREATE_BRANCH[/cyan]")
 
-        headers = self._get_auth_headers()
-
         # Fetch the latest commit SHA of the base branch
-        branch_url = f"https://api.github.com/repos/{owner}/{repo}/git/ref/heads/main"
-        response = requests.get(branch_url, headers=headers)
+        branch_url = f"repos/{owner}/{repo}/git/ref/heads/main"
+        response = self.client.get(branch_url)
 
         if response.status_code != 200:
             return {"error": f"Failed to fetch base branch: {response.text}"}
@@ -309,10 +366,10 @@ class GitHubTools:
         base_sha = response.json()["object"]["sha"]  # Get the latest commit SHA
 
         # Create the new branch reference
-        new_branch_url = f"https://api.github.com/repos/{owner}/{repo}/git/refs"
+        new_branch_url = f"repos/{owner}/{repo}/git/refs"
         payload = {"ref": f"refs/heads/{new_branch}", "sha": base_sha}
 
-        response = requests.post(new_branch_url, headers=headers, json=payload)
+        response = self.client.post(new_branch_url, json=payload)
 
         if response.status_code != 201:
             return {"error": f"Failed to create branch: {response.text}"}
@@ -350,11 +407,9 @@ class GitHubTools:
                 "error": f"direct commits to master or main branch are not allowed use a dedicated branch instead"
             }
 
-        headers = self._get_auth_headers()
-
         # Fetch the current file to get its SHA
-        file_url = f"https://api.github.com/repos/{owner}/{repo}/contents/{file_path}?ref={branch}"
-        response = requests.get(file_url, headers=headers)
+        file_url = f"repos/{owner}/{repo}/contents/{file_path}?ref={branch}"
+        response = self.client.get(file_url)
 
         # Encode the new content to Base64
         encoded_content = base64.b64encode(new_content.encode("utf-8")).decode("utf-8")
@@ -376,7 +431,7 @@ class GitHubTools:
         # For 404, we're creating a new file so we don't need a SHA
 
         # Send the request to update or create the file
-        update_response = requests.put(file_url, headers=headers, json=payload)
+        update_response = self.client.put(file_url, json=payload)
 
         if update_response.status_code not in [200, 201]:
             return {"error": f"Failed to update/create file: {update_response.text}"}
@@ -413,16 +468,14 @@ class GitHubTools:
             f"[cyan]USE TOOL CREATE_PULL_REQUEST for issue #{issue_number}[/cyan]"
         )
 
-        headers = self._get_auth_headers()
-
         # Automatically link the PR to the issue
         body += f"\n\nCloses #{issue_number}"
 
         # Create the pull request payload
         payload = {"title": title, "body": body, "head": branch, "base": base_branch}
 
-        pr_url = f"https://api.github.com/repos/{owner}/{repo}/pulls"
-        response = requests.post(pr_url, headers=headers, json=payload)
+        pr_url = f"repos/{owner}/{repo}/pulls"
+        response = self.client.post(pr_url, json=payload)
 
         if response.status_code not in [200, 201]:
             return {"error": f"Failed to create pull request: {response.text}"}
@@ -444,13 +497,11 @@ class GitHubTools:
         # print(f"USE TOOL FETCH_PR_CHANGES for PR #{pr_number}")
         console.print(f"[cyan]USE TOOL FETCH_PR_CHANGES for PR #{pr_number}[/cyan]")
 
-        headers = self._get_auth_headers()
-
         # Fetch list of changed files in the PR
         pr_files_url = (
-            f"https://api.github.com/repos/{owner}/{repo}/pulls/{pr_number}/files"
+            f"repos/{owner}/{repo}/pulls/{pr_number}/files"
         )
-        response = requests.get(pr_files_url, headers=headers)
+        response = self.client.get(pr_files_url)
 
         if response.status_code != 200:
             return {"error": f"Failed to fetch PR changes: {response.text}"}
@@ -474,12 +525,10 @@ class GitHubTools:
         """
         # print("USE TOOL POST_COMMENT")
         console.print(f"[cyan]USE TOOL POST_COMMENT[/cyan]")
-        url = f"https://api.github.com/repos/{owner}/{repo}/issues/{issue_number}/comments"
-
-        headers = self._get_auth_headers()
+        url = f"repos/{owner}/{repo}/issues/{issue_number}/comments"
 
         data = {"body": comment}
-        response = requests.post(url, headers=headers, json=data)
+        response = self.client.post(url, json=data)
         if response.status_code != 201:
             print(f"error: {response.text}")
             return {"error": f"Failed to post comment: {response.text}"}
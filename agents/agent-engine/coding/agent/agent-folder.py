@@ -22,6 +22,8 @@ agent = agent_engines.LangchainAgent(
     tools=[
         tools.fetch_github_issue,
         tools.fetch_github_directory,
+        tools.fetch_github_repository_tree,
+        tools.fetch_github_files,
         tools.post_github_comment,
         tools.create_github_branch,
         tools.update_github_file,
@@ -56,7 +58,7 @@ remote_agent = agent_engines.create(
     agent,
     display_name="next_25_agent_2_0_flash",
     requirements="requirements.txt",
-    extra_packages=["githubtools.py", "prompts.py", "github-private-key.pem"],
+    extra_packages=["githubtools.py", "github_client.py", "prompts.py", "github-private-key.pem"],
 )
 
 print(remote_agent)
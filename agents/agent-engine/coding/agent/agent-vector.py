@@ -35,19 +35,23 @@ collection = firestore_client.collection("code-embeddings")
 # Initialize Vertex AI Embedding Model
 MODEL_NAME = "text-embedding-005"
 DIMENSIONALITY = 256
+# Chunk hits retrieved per requested file before grouping
+CHUNKS_PER_FILE = 4
 embedding_model = TextEmbeddingModel.from_pretrained(MODEL_NAME)
 
 
 def fetch_similar_code(query: str, limit: int = 5):
     """
-    Fetches similar code snippets from Firestore using vector search.
+    Fetches similar code from Firestore using vector search over function/class level chunks.
 
     Args:
         query (str): The natural language query (e.g., "Find a function that adds two numbers").
-        limit (int): Number of similar code snippets to return.
+        limit (int): Number of files to return.
 
     Returns:
-        list: List of dictionaries containing file paths and relevant code snippets.
+        list: List of dictionaries, one per file, files ordered by their best chunk's similarity.
+              The matching chunks (name, line span, code and similarity_score) are in source
+              order, by start line. Load the whole file only if the chunks are not enough.
     """
     print(f"🔍 Searching Firestore for relevant code snippets: {query}")
 
@@ -60,27 +64,42 @@ def fetch_similar_code(query: str, limit: int = 5):
         print(f"❌ Embedding generation failed: {str(e)}")
         return []
 
-    # Perform vector search in Firestore
+    # Perform vector search in Firestore, fetch more chunks than files as several chunks may hit the same file
     vector_query = collection.find_nearest(
         vector_field="embedding",
         query_vector=Vector(query_embedding),
         distance_measure=DistanceMeasure.EUCLIDEAN,  # Lower = more similar
-        limit=limit,
+        limit=limit * CHUNKS_PER_FILE,
         distance_result_field="vector_distance",  # Store similarity score
     )
 
-    results = []
+    # Group chunk hits per file, files are ranked by their best chunk
+    files = {}
     for doc in vector_query.stream():
         result = doc.to_dict()
         similarity_score = doc.get("vector_distance")
+        file_path = result.get("file_path")
 
-        results.append({
-            "file_path": result.get("file_path"),
+        entry = files.setdefault(file_path, {
+            "file_path": file_path,
+            "repo": f"{result.get('repo_owner')}/{result.get('repo_name')}",
+            "similarity_score": similarity_score,
+            "chunks": [],
+        })
+        entry["similarity_score"] = min(entry["similarity_score"], similarity_score)
+        entry["chunks"].append({
+            "name": result.get("chunk_name"),
+            "start_line": result.get("start_line"),
+            "end_line": result.get("end_line"),
             "content": result.get("content"),
-            "similarity_score": similarity_score
+            "similarity_score": similarity_score,
         })
 
-    print(f"✅ Retrieved {len(results)} relevant code snippets.")
+    results = sorted(files.values(), key=lambda entry: entry["similarity_score"])[:limit]
+    for entry in results:
+        entry["chunks"].sort(key=lambda chunk: chunk["start_line"] or 0)
+
+    print(f"✅ Retrieved {sum(len(entry['chunks']) for entry in results)} relevant code chunks in {len(results)} files.")
     return results
 
 
@@ -92,6 +111,8 @@ agent = reasoning_engines.LangchainAgent(
         tools.fetch_github_issue,
         fetch_similar_code,
         tools.fetch_github_directory,
+        tools.fetch_github_repository_tree,
+        tools.fetch_github_files,
         tools.post_github_comment,
         tools.create_github_branch,
         tools.update_github_file,
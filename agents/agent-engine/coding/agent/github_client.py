@@ -0,0 +1,242 @@
+import base64
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from rich.console import Console
+
+console = Console()
+
+DEFAULT_BASE_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+# "~" is expanded when the cache is used, the client is pickled locally and runs on Agent Engine
+DEFAULT_CACHE_DIR = os.environ.get("GITHUB_CACHE_DIR", os.path.join("~", ".cache", "github-tools"))
+# Safe to send twice, a 5xx on anything else may already have taken effect
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+
+
+class GitHubClient:
+    """
+    Pooled GitHub REST client shared by all GitHubTools calls.
+
+    - one requests.Session with a connection pool for all calls
+    - GET responses are cached on disk with their ETag and revalidated with
+      If-None-Match, a 304 is served from the cache and does not count
+      against the rate limit
+    - rate limits are respected using the X-RateLimit-* and Retry-After headers
+    - whole repositories are listed with a single recursive git trees call and
+      blobs are fetched concurrently
+
+    `base_url` can point to a local stand-in server for testing.
+
+    This module is shared with the ADK coding agent, whose
+    coding/tools/github_client.py is a symlink to this file, so it only uses
+    absolute imports.
+    """
+
+    def __init__(
+        self,
+        headers_provider: Callable[[], Dict[str, str]],
+        base_url: str = DEFAULT_BASE_URL,
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+        pool_size: int = 16,
+        max_retries: int = 3,
+        max_rate_limit_wait: float = 300,
+    ):
+        """
+        Args:
+            headers_provider (Callable): Returns the authorization headers for a request.
+            base_url (str): GitHub API base URL.
+            cache_dir (str): Directory for the ETag response cache, created on first write, None disables caching.
+            pool_size (int): Maximum number of pooled connections (and concurrent blob fetches).
+            max_retries (int): Retries after rate limiting or server errors.
+            max_rate_limit_wait (float): Longest time in seconds to wait for a rate limit reset.
+        """
+        self.headers_provider = headers_provider
+        self.base_url = base_url.rstrip("/")
+        self.cache_dir = cache_dir
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.max_rate_limit_wait = max_rate_limit_wait
+        self.rate_limit_remaining = None
+        self.rate_limit_reset = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _url(self, path_or_url: str) -> str:
+        if path_or_url.startswith(("http://", "https://")):
+            return path_or_url
+        return f"{self.base_url}/{path_or_url.lstrip('/')}"
+
+    def _cache_path(self, url: str, params, headers) -> str:
+        # Responses differ per media type. Credentials are left out, installation tokens rotate
+        # hourly, and a cached body is only served after GitHub answered 304 to the current token.
+        key = json.dumps([url, sorted((params or {}).items()), headers.get("Accept", "")])
+        cache_dir = os.path.expanduser(self.cache_dir)
+        return os.path.join(cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _read_cache(self, path: str):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, path: str, response: requests.Response):
+        entry = {
+            "etag": response.headers.get("ETag"),
+            "headers": {
+                name: response.headers[name]
+                for name in ("Content-Type", "Link")
+                if name in response.headers
+            },
+            "content": base64.b64encode(response.content).decode("ascii"),
+        }
+        tmp_path = f"{path}.{os.getpid()}.{time.monotonic_ns()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # A read-only or missing home directory only costs the cache, not the call
+            console.print(f"[yellow]Could not cache {response.url}: {e}[/yellow]")
+
+    @staticmethod
+    def _cached_response(entry, url: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.headers["X-From-Cache"] = "1"
+        response._content = base64.b64decode(entry["content"])
+        response.encoding = "utf-8"
+        return response
+
+    def _update_rate_limit(self, response: requests.Response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is not None:
+            self.rate_limit_remaining = int(remaining)
+        if reset is not None:
+            self.rate_limit_reset = int(reset)
+
+    def _rate_limit_delay(self, method: str, response: requests.Response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the response should be returned as is."""
+        if response.status_code in (403, 429):
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None:
+                return float(retry_after)
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                reset = int(response.headers.get("X-RateLimit-Reset", time.time()))
+                return max(reset - time.time(), 0) + 1
+            return None
+        if response.status_code >= 500 and method.upper() in IDEMPOTENT_METHODS:
+            return min(2 ** attempt, 30)
+        return None
+
+    def request(self, method: str, path_or_url: str, headers: Optional[Dict[str, str]] = None, **kwargs):
+        """
+        Sends a request, using the ETag cache for GETs and waiting out rate limits.
+
+        Args:
+            method (str): HTTP method.
+            path_or_url (str): API path (e.g. "repos/owner/repo") or absolute URL.
+            headers (dict): Extra headers, overriding the headers from the provider.
+
+        Returns:
+            requests.Response: The response, cached GET responses are returned with status 200.
+        """
+        url = self._url(path_or_url)
+        request_headers = dict(self.headers_provider())
+        request_headers.update(headers or {})
+
+        cache_path = None
+        cached = None
+        if method.upper() == "GET" and self.cache_dir:
+            cache_path = self._cache_path(url, kwargs.get("params"), request_headers)
+            cached = self._read_cache(cache_path)
+            if cached and cached.get("etag"):
+                request_headers["If-None-Match"] = cached["etag"]
+
+        kwargs.setdefault("timeout", 30)
+        for attempt in range(self.max_retries + 1):
+            response = self.session.request(method, url, headers=request_headers, **kwargs)
+            self._update_rate_limit(response)
+
+            delay = self._rate_limit_delay(method, response, attempt)
+            if delay is None or attempt == self.max_retries:
+                break
+            if delay > self.max_rate_limit_wait:
+                console.print(f"[red]Rate limited for {delay:.0f}s, giving up on {url}[/red]")
+                break
+            console.print(f"[yellow]GitHub returned {response.status_code}, retrying in {delay:.0f}s[/yellow]")
+            time.sleep(delay)
+
+        if response.status_code == 304 and cached:
+            return self._cached_response(cached, url)
+        if cache_path and response.status_code == 200 and response.headers.get("ETag"):
+            self._write_cache(cache_path, response)
+        return response
+
+    def get(self, path_or_url: str, **kwargs):
+        return self.request("GET", path_or_url, **kwargs)
+
+    def post(self, path_or_url: str, **kwargs):
+        return self.request("POST", path_or_url, **kwargs)
+
+    def put(self, path_or_url: str, **kwargs):
+        return self.request("PUT", path_or_url, **kwargs)
+
+    def get_tree(self, owner: str, repo: str, ref: str = "main"):
+        """
+        Lists the whole repository with one recursive git trees call.
+
+        Returns:
+            dict: {"entries": [{"path", "type", "sha", "size"}], "truncated": bool} or {"error": ...}
+        """
+        response = self.get(f"repos/{owner}/{repo}/git/trees/{ref}", params={"recursive": "1"})
+        if response.status_code != 200:
+            return {"error": f"Failed to fetch repository tree: {response.text}"}
+        tree = response.json()
+        return {
+            "entries": [
+                {"path": entry["path"], "type": entry["type"], "sha": entry["sha"], "size": entry.get("size")}
+                for entry in tree.get("tree", [])
+            ],
+            "truncated": tree.get("truncated", False),
+        }
+
+    def get_blobs(self, owner: str, repo: str, shas: Iterable[str]):
+        """
+        Fetches blobs concurrently over the pooled session.
+
+        Returns:
+            dict: Mapping of sha to decoded text (None for binary or failed blobs).
+        """
+        def fetch(sha):
+            response = self.get(f"repos/{owner}/{repo}/git/blobs/{sha}")
+            if response.status_code != 200:
+                return sha, None
+            blob = response.json()
+            try:
+                if blob.get("encoding") == "base64":
+                    return sha, base64.b64decode(blob["content"]).decode("utf-8")
+                return sha, blob.get("content")
+            except UnicodeDecodeError:
+                return sha, None
+
+        shas = list(dict.fromkeys(shas))
+        if not shas:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.pool_size, len(shas))) as executor:
+            return dict(executor.map(fetch, shas))
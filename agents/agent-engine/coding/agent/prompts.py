@@ -20,6 +20,8 @@ Use `fetch_github_directory` with the 'branch' parameter set to a dedicated bran
 (not the main branch) to thoroughly explore the relevant files within the GitHub repository.
 DO NOT proceed until you have completed this step.
 Ensure you examine the contents of the files, not just the directory listings.
+Use `fetch_github_repository_tree` to list the whole repository in one call and
+`fetch_github_files` to read several files at once instead of walking directories one by one.
 If there is a readme or test ensure you integrate this into your plannign as well.
 
 2. **Check for Existing PRs:**
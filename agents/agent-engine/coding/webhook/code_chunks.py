@@ -0,0 +1,92 @@
+import ast
+
+# Chunks longer than this are split further into line windows
+MAX_CHUNK_LINES = 120
+WINDOW_LINES = 60
+WINDOW_OVERLAP = 10
+
+
+def chunk_file(file_path, content):
+    """Splits a file into chunks of {"name", "start_line", "end_line", "content"}.
+
+    Python files are split along top-level functions and classes (large
+    classes per method) using `ast`, the module level code in between is
+    kept as its own chunks. Other files, and Python files that do not parse,
+    fall back to overlapping line windows. Line numbers are 1-based and
+    inclusive.
+    """
+    lines = content.splitlines()
+    if not lines:
+        return []
+    if file_path.endswith(".py"):
+        try:
+            spans = _python_spans(ast.parse(content), len(lines))
+        except (SyntaxError, ValueError):
+            spans = [("module", 1, len(lines))]
+    else:
+        spans = [("file", 1, len(lines))]
+
+    chunks = []
+    for name, start, end in spans:
+        for window_start, window_end in _windows(start, end):
+            text = "\n".join(lines[window_start - 1:window_end])
+            if text.strip():
+                chunks.append({
+                    "name": name,
+                    "start_line": window_start,
+                    "end_line": window_end,
+                    "content": text,
+                })
+    return chunks
+
+
+def _node_start(node):
+    # Decorators belong to the function or class they decorate
+    return min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])])
+
+
+def _definition_spans(nodes, prefix=""):
+    spans = []
+    for node in nodes:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            spans.append((f"{prefix}{node.name}", _node_start(node), node.end_lineno))
+        elif isinstance(node, ast.ClassDef):
+            start, end = _node_start(node), node.end_lineno
+            if end - start + 1 <= MAX_CHUNK_LINES:
+                spans.append((f"{prefix}{node.name}", start, end))
+                continue
+            # Large class: header/attributes plus one chunk per method
+            methods = _definition_spans(node.body, prefix=f"{prefix}{node.name}.")
+            spans.extend(_fill_gaps(methods, start, end, f"{prefix}{node.name}"))
+    return spans
+
+
+def _fill_gaps(spans, start, end, gap_name):
+    """Adds chunks for the lines between `spans` so the whole range is covered."""
+    filled = []
+    cursor = start
+    for span in sorted(spans, key=lambda span: span[1]):
+        if span[1] > cursor:
+            filled.append((gap_name, cursor, span[1] - 1))
+        filled.append(span)
+        cursor = max(cursor, span[2] + 1)
+    if cursor <= end:
+        filled.append((gap_name, cursor, end))
+    return filled
+
+
+def _python_spans(tree, total_lines):
+    return _fill_gaps(_definition_spans(tree.body), 1, total_lines, "module")
+
+
+def _windows(start, end):
+    if end - start + 1 <= MAX_CHUNK_LINES:
+        return [(start, end)]
+    windows = []
+    window_start = start
+    while True:
+        window_end = min(window_start + WINDOW_LINES - 1, end)
+        windows.append((window_start, window_end))
+        if window_end == end:
+            return windows
+        window_start = window_end + 1 - WINDOW_OVERLAP
@@ -0,0 +1,232 @@
+import base64
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.vector import Vector
+from vertexai.language_models import TextEmbeddingInput
+
+from code_chunks import chunk_file
+
+logger = logging.getLogger(__name__)
+
+FETCH_WORKERS = 8
+# The embedding API accepts up to 250 inputs and ~20k tokens per request
+EMBEDDING_BATCH_SIZE = 16
+EMBEDDING_BATCH_CHARS = 40000
+EMBEDDING_DIMENSIONALITY = 256
+# Firestore allows at most 500 writes per batch
+FIRESTORE_BATCH_SIZE = 400
+# Firestore documents are limited to 1 MiB, chunks are far below that
+MAX_STORED_CHARS = 20000
+
+
+def plan_changes(commits):
+    """Collapses the commits of a push into the final set of files to upsert and delete.
+
+    Commits are replayed in order so a file modified several times is only
+    processed once, and a file that was added and then removed within the
+    same push is neither embedded nor deleted.
+    """
+    upserts = set()
+    deletes = set()
+    added_in_push = set()
+    for commit in commits:
+        for file_path in commit.get("added", []):
+            added_in_push.add(file_path)
+            upserts.add(file_path)
+            deletes.discard(file_path)
+        for file_path in commit.get("modified", []):
+            upserts.add(file_path)
+            deletes.discard(file_path)
+        for file_path in commit.get("removed", []):
+            upserts.discard(file_path)
+            if file_path in added_in_push:
+                # Never existed before this push, nothing to clean up
+                added_in_push.discard(file_path)
+                deletes.discard(file_path)
+            else:
+                deletes.add(file_path)
+    return sorted(upserts), sorted(deletes)
+
+
+def document_id(file_path):
+    # Firestore document ID: Convert slashes to underscores to avoid Firestore path issues
+    return f"{file_path}".replace("/", "_").replace("|", "_")
+
+
+def chunk_document_id(file_path, chunk):
+    return f"{document_id(file_path)}__L{chunk['start_line']}-{chunk['end_line']}"
+
+
+def create_session(github_token, pool_size=FETCH_WORKERS):
+    """Pooled GitHub session with retries on transient errors."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504]),
+    )
+    session.mount("https://", adapter)
+    session.headers.update({
+        "Authorization": f"token {github_token}",
+        "Accept": "application/vnd.github+json",
+    })
+    return session
+
+
+class EmbeddingSync:
+    """Background worker that syncs pushed files into the code-embeddings collection."""
+
+    def __init__(self, session, embedding_model, firestore_client, collection):
+        self.session = session
+        self.embedding_model = embedding_model
+        self.firestore_client = firestore_client
+        self.collection = collection
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def enqueue(self, repo_owner, repo_name, ref, commits):
+        upserts, deletes = plan_changes(commits)
+        logger.info(f"📥 Queued sync for {repo_owner}/{repo_name}@{ref}: "
+                    f"{len(upserts)} upserts, {len(deletes)} deletes")
+        self.jobs.put((repo_owner, repo_name, ref, upserts, deletes))
+        return upserts, deletes
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                self.sync(*job)
+            except Exception:
+                logger.exception("❌ Embedding sync failed")
+            finally:
+                self.jobs.task_done()
+
+    def sync(self, repo_owner, repo_name, ref, upserts, deletes):
+        contents = self.fetch_contents(repo_owner, repo_name, ref, upserts)
+        files = [(file_path, content) for file_path, content in contents if content]
+
+        chunks = []
+        for file_path, content in files:
+            for chunk in chunk_file(file_path, content):
+                chunks.append((file_path, chunk))
+        # Prefix each chunk with its location so the embedding knows where the code lives
+        embeddings = self.embed([
+            f"# {file_path} ({chunk['name']})\n{chunk['content']}" for file_path, chunk in chunks
+        ])
+
+        failed_files = {
+            file_path for (file_path, _), embedding in zip(chunks, embeddings) if not embedding
+        }
+        for file_path in sorted(failed_files):
+            logger.error(f"❌ Skipping storage for {file_path}, embedding failed.")
+
+        operations = []
+        written = {}
+        for (file_path, chunk), embedding in zip(chunks, embeddings):
+            if file_path in failed_files:
+                continue
+            doc_id = chunk_document_id(file_path, chunk)
+            written.setdefault(file_path, set()).add(doc_id)
+            operations.append(("set", doc_id, {
+                "repo_owner": repo_owner,
+                "repo_name": repo_name,
+                "file_path": file_path,
+                "chunk_name": chunk["name"],
+                "start_line": chunk["start_line"],
+                "end_line": chunk["end_line"],
+                "content": chunk["content"][:MAX_STORED_CHARS],
+                "embedding": Vector(embedding),
+            }))
+
+        # Chunks of updated files that no longer exist, and all chunks of removed files.
+        # Files that could not be fetched or embedded keep their previous chunks.
+        stale_files = [file_path for file_path, _ in files if file_path not in failed_files] + list(deletes)
+        existing = self.existing_chunk_ids(repo_owner, repo_name, stale_files)
+        for file_path, doc_ids in existing.items():
+            for doc_id in sorted(doc_ids - written.get(file_path, set())):
+                operations.append(("delete", doc_id, None))
+
+        self.write(operations)
+        logger.info(f"✅ Synced {len(chunks)} chunks from {len(files)} files and removed "
+                    f"{sum(action == 'delete' for action, _, _ in operations)} stale chunks from Firestore.")
+
+    def existing_chunk_ids(self, repo_owner, repo_name, file_paths):
+        """Returns {file_path: {document ids}} of everything currently stored for the files."""
+        def lookup(file_path):
+            query = (
+                self.collection
+                .where(filter=FieldFilter("repo_owner", "==", repo_owner))
+                .where(filter=FieldFilter("repo_name", "==", repo_name))
+                .where(filter=FieldFilter("file_path", "==", file_path))
+                .select([])
+            )
+            return file_path, {snapshot.id for snapshot in query.stream()}
+
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+            return dict(executor.map(lookup, file_paths))
+
+    def fetch_contents(self, repo_owner, repo_name, ref, file_paths):
+        """Fetches file contents at `ref` concurrently over the pooled session."""
+        def fetch(file_path):
+            url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contents/{file_path}"
+            response = self.session.get(url, params={"ref": ref} if ref else None, timeout=30)
+            if response.status_code != 200:
+                logger.error(f"❌ Failed to fetch {file_path}: {response.text}")
+                return file_path, None
+            file_data = response.json()
+            if "content" not in file_data:
+                return file_path, None
+            try:
+                return file_path, base64.b64decode(file_data["content"]).decode("utf-8")
+            except UnicodeDecodeError:
+                logger.info(f"⚠️ Skipping binary file {file_path}")
+                return file_path, None
+
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+            return list(executor.map(fetch, file_paths))
+
+    def embed(self, texts):
+        """Embeds texts in batches, returns one vector (or [] on failure) per text."""
+        vectors = []
+        batch = []
+        batch_chars = 0
+        for text in texts:
+            if batch and (len(batch) >= EMBEDDING_BATCH_SIZE or batch_chars + len(text) > EMBEDDING_BATCH_CHARS):
+                vectors.extend(self._embed_batch(batch))
+                batch, batch_chars = [], 0
+            batch.append(text)
+            batch_chars += len(text)
+        if batch:
+            vectors.extend(self._embed_batch(batch))
+        return vectors
+
+    def _embed_batch(self, texts):
+        try:
+            inputs = [TextEmbeddingInput(text, "RETRIEVAL_DOCUMENT") for text in texts]
+            embeddings = self.embedding_model.get_embeddings(
+                inputs, output_dimensionality=EMBEDDING_DIMENSIONALITY, auto_truncate=True
+            )
+            return [embedding.values for embedding in embeddings]
+        except Exception as e:
+            logger.error(f"❌ Embedding generation failed for batch of {len(texts)}: {str(e)}")
+            return [[] for _ in texts]
+
+    def write(self, operations):
+        """Applies (action, document id, data) set/delete operations with Firestore batched writes."""
+        for start in range(0, len(operations), FIRESTORE_BATCH_SIZE):
+            batch = self.firestore_client.batch()
+            for action, doc_id, data in operations[start:start + FIRESTORE_BATCH_SIZE]:
+                doc_ref = self.collection.document(doc_id)
+                if action == "set":
+                    batch.set(doc_ref, data, merge=True)
+                else:
+                    batch.delete(doc_ref)
+            batch.commit()
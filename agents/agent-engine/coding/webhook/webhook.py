@@ -1,16 +1,15 @@
 import logging
-import requests
-import base64
 import os
 from flask import Flask, request, jsonify
 from google.cloud import firestore
-from google.cloud.firestore_v1.vector import Vector
-from vertexai.language_models import TextEmbeddingInput, TextEmbeddingModel
+from vertexai.language_models import TextEmbeddingModel
 from dotenv import load_dotenv
 
 import vertexai
 from vertexai.preview import reasoning_engines
 
+from embedding_sync import EmbeddingSync, create_session
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -28,6 +27,13 @@ model = TextEmbeddingModel.from_pretrained("text-embedding-005")
 # Get secrets from environment variables
 GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
 AGENT_ENGINE = os.environ.get("AGENT_ENGINE")
+
+if not GITHUB_TOKEN:
+    logger.error("❌ GitHub token not found in environment variables!")
+
+# Background worker for push events, shares one pooled GitHub session
+embedding_sync = EmbeddingSync(create_session(GITHUB_TOKEN), model, firestore_client, collection)
+
 app = Flask(__name__)
 
 def analyze_issue(owner, repo, issue_number):
@@ -83,113 +89,17 @@ def github_webhook():
 
         logger.info(f"📦 Repository: {repo_owner}/{repo_name} (branch: {branch})")
 
-        changed_files = []
-        removed_files = []  # Track deleted files
-
-        for commit in payload.get("commits", []):
-            changed_files.extend(commit.get("added", []))
-            changed_files.extend(commit.get("modified", []))
-            removed_files.extend(commit.get("removed", []))  # ✅ Handle deleted files
+        # Acknowledge right away, files are fetched, embedded and stored by the background worker
+        upserts, deletes = embedding_sync.enqueue(
+            repo_owner, repo_name, payload.get("after"), payload.get("commits", [])
+        )
+        logger.info(f"📂 Changed files: {upserts}")
+        logger.info(f"🗑️ Removed files: {deletes}")
 
-        logger.info(f"📂 Changed files: {changed_files}")
-        logger.info(f"🗑️ Removed files: {removed_files}")
-
-        # Process and store embeddings for modified/new files
-        for file_path in changed_files:
-            file_content = fetch_file_content(repo_owner, repo_name, file_path)
-            if file_content:
-                upsert_embedding(repo_owner, repo_name, file_path, file_content)
-
-        # Handle file deletions
-        for file_path in removed_files:
-            delete_embedding(repo_owner, repo_name, file_path)
-
-        return jsonify({"message": "Webhook processed"}), 200
+        return jsonify({"message": "Webhook accepted", "upserts": len(upserts), "deletes": len(deletes)}), 202
 
     return jsonify({"message": "No action taken"}), 200
 
 
-def fetch_file_content(repo_owner: str, repo_name: str, file_path: str) -> str:
-    """Fetches the latest content of a file from GitHub."""
-    # Check if GitHub token is properly configured
-    if not GITHUB_TOKEN:
-        logger.error("❌ GitHub token not found in environment variables!")
-        return None
-
-    url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contents/{file_path}"
-    headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        file_data = response.json()
-        if "content" in file_data:
-            content = base64.b64decode(file_data["content"]).decode("utf-8")
-            logger.info(f"📄 Fetched content for {file_path} ({len(content)} chars)")
-            return content
-    else:
-        logger.error(f"❌ Failed to fetch {file_path}: {response.text}")
-        return None
-
-
-def generate_embedding(text: str) -> list[float]:
-    """Generates an embedding vector using Google's Vertex AI API."""
-    try:
-        inputs = [TextEmbeddingInput(text, "RETRIEVAL_DOCUMENT")]
-        embeddings = model.get_embeddings(inputs, output_dimensionality=256)
-        embedding_vector = embeddings[0].values
-        logger.info(f"🔢 Generated embedding of size {len(embedding_vector)}")
-        return embedding_vector
-    except Exception as e:
-        logger.error(f"❌ Embedding generation failed: {str(e)}")
-        return []
-
-
-def upsert_embedding(repo_owner: str, repo_name: str, file_path: str, file_content: str):
-    """Checks if a file exists in Firestore and updates or inserts it accordingly."""
-    embedding_vector = generate_embedding(file_content)
-
-    if not embedding_vector:
-        logger.error(f"❌ Skipping storage for {file_path}, embedding failed.")
-        return
-
-    # Firestore document ID: Convert slashes to underscores to avoid Firestore path issues
-    doc_id = f"{file_path}".replace("/", "_").replace("|", "_")
-
-    doc_ref = collection.document(doc_id)
-    doc_snapshot = doc_ref.get()
-
-    if doc_snapshot.exists:
-        # Update existing document
-        doc_ref.update({
-            "content": file_content[:500],  # Store first 500 chars for reference
-            "embedding": Vector(embedding_vector),
-        })
-        logger.info(f"🔄 Updated embedding for {file_path} in Firestore.")
-    else:
-        # Insert new document
-        doc_ref.set({
-            "repo_owner": repo_owner,
-            "repo_name": repo_name,
-            "file_path": file_path,
-            "content": file_content[:500],
-            "embedding": Vector(embedding_vector),
-        })
-        logger.info(f"✅ Stored new embedding for {file_path} in Firestore.")
-
-
-def delete_embedding(repo_owner: str, repo_name: str, file_path: str):
-    """Deletes the embedding of a removed file from Firestore."""
-    doc_id = f"{file_path}".replace("/", "_").replace("|", "_")
-
-    doc_ref = collection.document(doc_id)
-    doc_snapshot = doc_ref.get()
-
-    if doc_snapshot.exists:
-        doc_ref.delete()
-        logger.info(f"🗑️ Deleted embedding for {file_path} from Firestore.")
-    else:
-        logger.info(f"⚠️ Tried to delete {file_path}, but it was not found in Firestore.")
-
-
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8080)
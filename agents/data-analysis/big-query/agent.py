@@ -10,16 +10,21 @@ from langchain_google_firestore import FirestoreChatMessageHistory
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core import prompts
 from langchain.agents.format_scratchpad.tools import format_to_tool_messages
+from bq_cache import CachedBigQuery
 
 # Vertex AI Configuration
 PROJECT_ID = "sascha-playground-doit"
 LOCATION = "us-central1"
 STAGING_BUCKET = "gs://doit-llm"
 
+# Queries are dry-run first and rejected when they would scan more than this
+MAX_SCAN_BYTES = 100000000  # 100MB
+
 vertexai.init(project=PROJECT_ID, location=LOCATION, staging_bucket=STAGING_BUCKET)
 
-# Initialize BigQuery Client
+# Initialize BigQuery Client, metadata and query results are cached across agent turns
 bq_client = bigquery.Client()
+bq_cache = CachedBigQuery(bq_client)
 
 # 🔹 Firestore Chat History for Context
 def get_session_history(session_id: str):
@@ -37,8 +42,7 @@ def list_datasets_func() -> dict:
     """
     Get a list of datasets that will help answer the user's question
     """
-    datasets = [dataset.dataset_id for dataset in bq_client.list_datasets()]
-    return {"datasets": datasets}
+    return {"datasets": bq_cache.list_datasets()}
 
 # 🔹 Function: List Tables in a Dataset
 def list_tables_func(dataset_id: str) -> dict:
@@ -47,8 +51,7 @@ def list_tables_func(dataset_id: str) -> dict:
     Args:
         dataset_id (str): Dataset ID to fetch tables from.
     """
-    tables = [table.table_id for table in bq_client.list_tables(dataset_id)]
-    return {"tables": tables}
+    return {"tables": bq_cache.list_tables(dataset_id)}
 
 # 🔹 Function: Get Table Schema & Metadata
 def get_table_func(table_id: str) -> dict:
@@ -57,26 +60,31 @@ def get_table_func(table_id: str) -> dict:
     Args:
         table_id (str): Fully qualified ID of the table to get information about
     """
-    table = bq_client.get_table(table_id)
+    table = bq_cache.get_table(table_id)
     return {
         "description": table.description or "No description available",
         "schema": [field.name for field in table.schema],
         "num_rows": table.num_rows,
     }
 
+# 🔹 Function: Schema Catalog
+def get_schema_catalog_func() -> dict:
+    """Get a compact catalog of the tables with their columns, column types and number of rows. Call this first instead of listing datasets and tables one by one. Large catalogs are truncated, a note at the end names how many tables are not listed.
+    """
+    try:
+        return {"catalog": bq_cache.catalog_prompt()}
+    except Exception as e:
+        return {"error": str(e)}
+
 # 🔹 Function: Execute SQL Query
 def sql_query_func(query: str) -> dict:
-    """Get information from data in BigQuery using SQL queries
+    """Get information from data in BigQuery using SQL queries. Results are limited to the first rows, check `truncated` and `total_rows` and aggregate in SQL instead of fetching raw rows.
 
     Args:
         query (str):SQL query on a single line that will help give quantitative answers to the user's question when run on a BigQuery dataset and table. In the SQL query, always use the fully qualified dataset and table names..
     """
-    job_config = bigquery.QueryJobConfig(maximum_bytes_billed=100000000)  # 100MB limit
-
     try:
-        query_job = bq_client.query(query, job_config=job_config)
-        results = [dict(row) for row in query_job.result()]
-        return {"results": results}
+        return bq_cache.query(query, max_scan_bytes=MAX_SCAN_BYTES)
     except Exception as e:
         return {"error": str(e)}
 
@@ -119,7 +127,8 @@ agent = reasoning_engines.LangchainAgent(
     model_kwargs={"temperature": 0},
     model="gemini-1.5-pro",
     #chat_history=get_session_history,
-    tools=[list_datasets_func,
+    tools=[get_schema_catalog_func,
+        list_datasets_func,
         list_tables_func,
        get_table_func,
         sql_query_func],
@@ -159,3 +168,4 @@ response = remote_agent.query(
 )
 #print(response)
 print(response["output"])
+print(bq_cache.hit_rates())
@@ -0,0 +1,212 @@
+import json
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from query_results import run_bounded_query
+
+METADATA_TTL_SECONDS = 300
+QUERY_MAX_STALENESS_SECONDS = 900
+# Limits for the catalog that goes into every prompt, the rest is reachable with the tools
+CATALOG_MAX_TABLES = 50
+CATALOG_MAX_COLUMNS = 40
+CATALOG_MAX_CHARS = 8000
+
+
+def normalize_sql(query):
+    """Collapses whitespace outside of string literals and drops trailing semicolons."""
+    parts = re.split(r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`)""", query.strip())
+    normalized = []
+    for index, part in enumerate(parts):
+        # Odd indexes are the quoted literals captured by the split
+        normalized.append(part if index % 2 else re.sub(r"\s+", " ", part))
+    return "".join(normalized).strip().rstrip(";").strip()
+
+
+class CachedBigQuery:
+    """Caching layer in front of a bigquery.Client for the agent tools.
+
+    - dataset and table listings are kept for `metadata_ttl` seconds
+    - table metadata is kept for `metadata_ttl` seconds and its `modified`
+      time is used to invalidate cached query results reading that table
+    - query results are keyed by normalized SQL and served for at most
+      `max_staleness` seconds
+
+    Only list_datasets, list_tables, get_table and query are used on the
+    wrapped client, so a small fake client is enough for local testing.
+    """
+
+    def __init__(self, client, metadata_ttl=METADATA_TTL_SECONDS, max_staleness=QUERY_MAX_STALENESS_SECONDS,
+                 clock=time.monotonic):
+        self.client = client
+        self.metadata_ttl = metadata_ttl
+        self.max_staleness = max_staleness
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._datasets = None
+        self._tables = {}
+        self._table_metadata = {}
+        self._queries = {}
+        self._catalog = None
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def _fresh(self, entry, ttl):
+        return entry is not None and self.clock() - entry[0] < ttl
+
+    def _record(self, tool, hit):
+        with self._lock:
+            (self.hits if hit else self.misses)[tool] += 1
+
+    def list_datasets(self):
+        entry = self._datasets
+        if self._fresh(entry, self.metadata_ttl):
+            self._record("list_datasets", True)
+            return entry[1]
+        self._record("list_datasets", False)
+        datasets = [dataset.dataset_id for dataset in self.client.list_datasets()]
+        self._datasets = (self.clock(), datasets)
+        return datasets
+
+    def list_tables(self, dataset_id):
+        entry = self._tables.get(dataset_id)
+        if self._fresh(entry, self.metadata_ttl):
+            self._record("list_tables", True)
+            return entry[1]
+        self._record("list_tables", False)
+        tables = [table.table_id for table in self.client.list_tables(dataset_id)]
+        self._tables[dataset_id] = (self.clock(), tables)
+        return tables
+
+    def get_table(self, table_id):
+        table, hit = self._lookup_table(table_id)
+        self._record("get_table", hit)
+        return table
+
+    def _lookup_table(self, table_id):
+        """Table metadata through the cache without touching the hit stats, returns (table, hit)."""
+        key = self._canonical_table_id(table_id)
+        entry = self._table_metadata.get(key)
+        if self._fresh(entry, self.metadata_ttl):
+            return entry[1], True
+        table = self.client.get_table(table_id)
+        with self._lock:
+            if entry is not None and entry[1].modified != table.modified:
+                self._invalidate_queries_for(key)
+            self._table_metadata[key] = (self.clock(), table)
+        return table, False
+
+    def _canonical_table_id(self, table_id):
+        # Tables may be referenced with or without project, key them without it
+        parts = table_id.replace(":", ".").strip("`").split(".")
+        return ".".join(parts[-2:])
+
+    def _invalidate_queries_for(self, table_id):
+        for key, entry in list(self._queries.items()):
+            if table_id in entry["tables"]:
+                del self._queries[key]
+
+    def query(self, query, **kwargs):
+        """Runs a bounded query (see run_bounded_query), serving repeated SQL from the cache."""
+        key = (normalize_sql(query), tuple(sorted(kwargs.items())))
+        entry = self._queries.get(key)
+        if entry is not None and self._query_entry_valid(entry):
+            self._record("sql_query", True)
+            return entry["result"]
+        self._record("sql_query", False)
+
+        result, query_job = run_bounded_query(self.client, query, return_job=True, **kwargs)
+        tables = {}
+        for reference in getattr(query_job, "referenced_tables", None) or []:
+            table_id = f"{reference.project}.{reference.dataset_id}.{reference.table_id}"
+            try:
+                modified = self._lookup_table(table_id)[0].modified
+            except Exception:
+                modified = None
+            tables[self._canonical_table_id(table_id)] = (table_id, modified)
+        with self._lock:
+            self._queries[key] = {"created": self.clock(), "result": result, "tables": tables}
+        return result
+
+    def _query_entry_valid(self, entry):
+        if self.clock() - entry["created"] >= self.max_staleness:
+            return False
+        for table_id, modified in entry["tables"].values():
+            try:
+                if self._lookup_table(table_id)[0].modified != modified:
+                    return False
+            except Exception:
+                return False
+        return True
+
+    def schema_catalog(self, max_workers=8):
+        """Compact schema catalog of all datasets, loaded once per session.
+
+        Returns {"dataset.table": {"columns": "name:TYPE, ...", "num_rows": n, "description": ...}}.
+        """
+        with self._lock:
+            if self._catalog is not None:
+                self._record("schema_catalog", True)
+                return self._catalog
+        self._record("schema_catalog", False)
+
+        table_ids = [
+            f"{dataset_id}.{table_id}"
+            for dataset_id in self.list_datasets()
+            for table_id in self.list_tables(dataset_id)
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            tables = [table for table, _ in executor.map(self._lookup_table, table_ids)]
+
+        catalog = {}
+        for table_id, table in zip(table_ids, tables):
+            catalog[table_id] = {
+                "columns": ", ".join(f"{field.name}:{field.field_type}" for field in table.schema),
+                "num_rows": table.num_rows,
+                "description": table.description or "",
+            }
+        with self._lock:
+            self._catalog = catalog
+        return catalog
+
+    def catalog_prompt(self, max_tables=CATALOG_MAX_TABLES, max_columns=CATALOG_MAX_COLUMNS,
+                       max_chars=CATALOG_MAX_CHARS):
+        """The schema catalog as JSON for the prompt, capped by tables, columns per table and characters.
+
+        Truncated column lists end with "... N more", tables left out are counted
+        in a note after the JSON, the model can still look them up with the tools.
+        """
+        catalog = self.schema_catalog()
+        shown = {}
+        size = 2
+        for table_id, info in catalog.items():
+            if len(shown) >= max_tables:
+                break
+            columns = info["columns"].split(", ") if info["columns"] else []
+            if len(columns) > max_columns:
+                info = dict(info, columns=", ".join(columns[:max_columns]) + f", ... {len(columns) - max_columns} more")
+            # each entry costs its own JSON plus the ", " separator
+            cost = len(json.dumps({table_id: info})) - 2 + (2 if shown else 0)
+            if size + cost > max_chars:
+                break
+            shown[table_id] = info
+            size += cost
+        text = json.dumps(shown)
+        if len(shown) < len(catalog):
+            text += (f"\n({len(catalog) - len(shown)} more tables not listed, "
+                     "use list_datasets, list_tables and get_table to find them)")
+        return text
+
+    def hit_rates(self):
+        with self._lock:
+            tools = sorted(set(self.hits) | set(self.misses))
+            return {
+                tool: {
+                    "hits": self.hits[tool],
+                    "misses": self.misses[tool],
+                    "hit_rate": self.hits[tool] / (self.hits[tool] + self.misses[tool]),
+                }
+                for tool in tools
+            }
@@ -1,15 +1,18 @@
 # pylint: disable=broad-exception-caught,invalid-name
 
+import json
 import time
 
 from google import genai
 from google.cloud import bigquery
 from google.genai.types import FunctionDeclaration, GenerateContentConfig, Part, Tool
 import streamlit as st
+from bq_cache import CachedBigQuery
 
 #BIGQUERY_DATASET_ID = "thelook_ecommerce"
 MODEL_ID = "gemini-2.0-flash-001"
 LOCATION = "us-central1"
+MAX_SCAN_BYTES = 100000000  # Reject queries that would scan more than 100MB
 
 
 
@@ -132,7 +135,23 @@ if prompt := st.chat_input("Ask me about information in the database..."):
             model=MODEL_ID,
             config=GenerateContentConfig(temperature=0, tools=[sql_query_tool]),
         )
-        client = bigquery.Client()
+        # One cache per session: metadata and query results are reused across turns
+        if "bq_cache" not in st.session_state:
+            st.session_state.bq_cache = CachedBigQuery(bigquery.Client())
+        bq_cache = st.session_state.bq_cache
+
+        try:
+            prompt += f"""
+            Available tables with their columns (dataset.table: column:TYPE):
+            {bq_cache.catalog_prompt()}
+            """
+        except Exception as e:
+            # e.g. no metadata permission on a dataset, the tools can still explore
+            print(f"Schema catalog unavailable: {e}")
+            prompt += """
+            The table catalog is unavailable, use list_datasets, list_tables
+            and get_table to find the tables you need.
+            """
 
         prompt += """
             Please give a concise, high-level summary followed by detail in
@@ -161,22 +180,20 @@ if prompt := st.chat_input("Ask me about information in the database..."):
                     print(params)
 
                     if response.function_call.name == "list_datasets":
-                        api_response = client.list_datasets()
-                        api_response = [dataset.dataset_id for dataset in client.list_datasets()]
+                        api_response = bq_cache.list_datasets()
                         #api_response = BIGQUERY_DATASET_ID
                         api_requests_and_responses.append(
                             [response.function_call.name, params, api_response]
                         )
 
                     if response.function_call.name == "list_tables":
-                        api_response = client.list_tables(params["dataset_id"])
-                        api_response = str([table.table_id for table in api_response])
+                        api_response = str(bq_cache.list_tables(params["dataset_id"]))
                         api_requests_and_responses.append(
                             [response.function_call.name, params, api_response]
                         )
 
                     if response.function_call.name == "get_table":
-                        api_response = client.get_table(params["table_id"])
+                        api_response = bq_cache.get_table(params["table_id"])
                         api_response = api_response.to_api_repr()
                         api_requests_and_responses.append(
                             [
@@ -198,9 +215,6 @@ if prompt := st.chat_input("Ask me about information in the database..."):
                         api_response = str(api_response)
 
                     if response.function_call.name == "sql_query":
-                        job_config = bigquery.QueryJobConfig(
-                            maximum_bytes_billed=100000000
-                        )  # Data limit per query job
                         try:
                             cleaned_query = (
                                 params["query"]
@@ -208,13 +222,10 @@ if prompt := st.chat_input("Ask me about information in the database..."):
                                 .replace("\n", "")
                                 .replace("\\", "")
                             )
-                            query_job = client.query(
-                                cleaned_query, job_config=job_config
-                            )
-                            api_response = query_job.result()
-                            api_response = str([dict(row) for row in api_response])
-                            api_response = api_response.replace("\\", "").replace(
-                                "\n", ""
+                            api_response = json.dumps(
+                                bq_cache.query(
+                                    cleaned_query, max_scan_bytes=MAX_SCAN_BYTES
+                                )
                             )
                             api_requests_and_responses.append(
                                 [response.function_call.name, params, api_response]
@@ -278,6 +289,10 @@ if prompt := st.chat_input("Ask me about information in the database..."):
 
             time.sleep(3)
 
+            backend_details += (
+                "- Cache hit rates: ```" + json.dumps(bq_cache.hit_rates()) + "```\n\n"
+            )
+
             full_response = response.text
             with message_placeholder.container():
                 st.markdown(full_response.replace("$", r"\$"))  # noqa: W605
@@ -0,0 +1,93 @@
+import base64
+import datetime
+import decimal
+import json
+
+from google.cloud import bigquery
+
+# Defaults for what a single tool call may put into the model context
+MAX_ROWS = 200
+MAX_RESULT_BYTES = 20_000
+MAX_BYTES_BILLED = 100_000_000  # 100MB limit
+PAGE_SIZE = 500
+
+
+class QueryTooExpensiveError(Exception):
+    pass
+
+
+def _json_value(value):
+    """Converts BigQuery row values into compact JSON friendly values."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.time, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, dict):
+        return {key: _json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    return str(value)
+
+
+def dry_run(client, query):
+    """Returns the number of bytes the query would scan, without running it."""
+    job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+    return client.query(query, job_config=job_config).total_bytes_processed
+
+
+def run_bounded_query(client, query, max_rows=MAX_ROWS, max_bytes=MAX_RESULT_BYTES,
+                      max_scan_bytes=None, max_bytes_billed=MAX_BYTES_BILLED, return_job=False):
+    """Runs a query and returns at most `max_rows` rows / `max_bytes` of JSON.
+
+    Rows are paged from the job's row iterator, so rows beyond the budget are
+    never downloaded. The result is a header plus row arrays:
+
+        {"columns": [{"name": ..., "type": ...}], "rows": [[...], ...],
+         "total_rows": 1234, "returned_rows": 200, "truncated": true}
+
+    When `max_scan_bytes` is set the query is dry-run first and rejected with
+    QueryTooExpensiveError if it would scan more than that. With `return_job`
+    a (result, query_job) tuple is returned instead.
+    """
+    if max_scan_bytes is not None:
+        scan_bytes = dry_run(client, query)
+        if scan_bytes > max_scan_bytes:
+            raise QueryTooExpensiveError(
+                f"Query would scan {scan_bytes} bytes, the limit is {max_scan_bytes} bytes. "
+                "Select fewer columns, filter on partitioned columns or aggregate in SQL."
+            )
+
+    job_config = bigquery.QueryJobConfig(maximum_bytes_billed=max_bytes_billed)
+    query_job = client.query(query, job_config=job_config)
+    row_iterator = query_job.result(page_size=min(PAGE_SIZE, max_rows + 1))
+
+    columns = [{"name": field.name, "type": field.field_type} for field in row_iterator.schema]
+    rows = []
+    # Account for the surrounding JSON of the header
+    used_bytes = len(json.dumps(columns))
+    truncated = False
+    for row in row_iterator:
+        if len(rows) >= max_rows:
+            truncated = True
+            break
+        values = [_json_value(value) for value in row.values()]
+        row_bytes = len(json.dumps(values)) + 1
+        if used_bytes + row_bytes > max_bytes:
+            truncated = True
+            break
+        rows.append(values)
+        used_bytes += row_bytes
+
+    total_rows = row_iterator.total_rows
+    result = {
+        "columns": columns,
+        "rows": rows,
+        "total_rows": total_rows if total_rows is not None else len(rows),
+        "returned_rows": len(rows),
+        "truncated": truncated,
+    }
+    return (result, query_job) if return_job else result
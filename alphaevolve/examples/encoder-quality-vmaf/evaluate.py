@@ -6,38 +6,61 @@ The objective is perceptual quality at the same bandwidth. Candidates are
 Python programs whose encoder_args() returns ffmpeg output arguments. Gates,
 all hard failures rather than tradeoffs.
 
-  - the encoder must be h264_videotoolbox and the output must decode as h264
+  - the encoder must be one of ENCODERLAB_ENCODERS (default h264_videotoolbox)
+    and the output must decode as h264
   - measured output bitrate within +5 percent of the 12000 kbps target
   - keyframes at most 2.1 seconds apart (YouTube and LinkedIn ingest rules)
   - encode at least realtime (it feeds a live stream)
 
 VMAF is computed with both streams scaled to 1080p (the default model's
-training resolution) and is deterministic. Standalone use,
+training resolution) and is deterministic. The source is scaled to 1080p once
+and cached as Y4M under ENCODERLAB_CACHE, every VMAF run reads it directly
+and only scales the candidate's encode. The output is probed with a single
+ffprobe call. Scores are memoized on disk by the exact encoder_args() output,
+argument order and repeats included (ffmpeg applies filters, -map and stream
+specifiers in order), a candidate that returns the same arguments is not
+encoded again. Failures that depend on the host's load, a timeout or the
+realtime speed gate, are never memoized.
+
+Standalone use,
 
     python3 evaluate.py            # scores seed.py
     python3 evaluate.py cand.py    # scores a candidate
 
 Env overrides, ENCODERLAB_SOURCE (default source.mov next to this file),
-ENCODERLAB_TARGET_KBPS (default 12000).
+ENCODERLAB_TARGET_KBPS (default 12000), ENCODERLAB_ENCODERS (comma separated
+allowed encoders, default h264_videotoolbox, e.g. libx264 or libopenh264 on
+Linux build hosts, with seed_libx264.py as the seed), ENCODERLAB_CACHE
+(default .cache next to this file).
 """
 
+import functools
+import hashlib
 import json
 import os
 import re
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 from pathlib import Path
 
 LAB = Path(__file__).resolve().parent
 SOURCE = Path(os.environ.get("ENCODERLAB_SOURCE", LAB / "source.mov"))
 TARGET_KBPS = int(os.environ.get("ENCODERLAB_TARGET_KBPS", "12000"))
+ENCODERS = [e.strip() for e in os.environ.get("ENCODERLAB_ENCODERS", "h264_videotoolbox").split(",") if e.strip()]
+CACHE = Path(os.environ.get("ENCODERLAB_CACHE", LAB / ".cache"))
 BITRATE_TOLERANCE = 1.05
 MAX_KEYFRAME_GAP = 2.1
 MIN_SPEED = 1.0
 VMAF_THREADS = os.cpu_count() or 8
 
+# Encoders that run on the media engine, the product requirement the default gate stands for
+MEDIA_ENGINE_ENCODERS = ("h264_videotoolbox", "hevc_videotoolbox")
+# -c, -codec, -vcodec and their video or first-stream specifiers, e.g. -c:v, -c:v:0, -codec:0
+ENCODER_FLAG = re.compile(r"-vcodec|-(?:c|codec)(?::v)?(?::0)?")
+
 FAILED_SCORE = -1e12
 ENCODE_TIMEOUT = 300
 VMAF_TIMEOUT = 900
@@ -65,12 +88,71 @@ def extract_args(code):
         return None, f"encoder_args() raised, {error}"
     if not all(isinstance(a, str) for a in args):
         return None, "encoder_args() must return a flat list of strings"
-    if "h264_videotoolbox" not in args:
-        return None, ("the encoder must stay h264_videotoolbox, the app "
-                      "encodes on the media engine by design")
+    encoder = _encoder(args)
+    if encoder not in ENCODERS:
+        return None, (f"the encoder must stay {' or '.join(ENCODERS)}, got "
+                      f"{encoder or 'none'}, {encoder_requirement()}")
     return args, None
 
 
+def encoder_requirement():
+    """Why the encoder is pinned, in words that match ENCODERLAB_ENCODERS."""
+    if all(e in MEDIA_ENGINE_ENCODERS for e in ENCODERS):
+        return "hardware encode on the media engine is a product requirement"
+    return f"this host evaluates {' or '.join(ENCODERS)} only, set by ENCODERLAB_ENCODERS"
+
+
+def _encoder(args):
+    """The video encoder the arguments select, the last matching codec option wins as in ffmpeg."""
+    encoder = None
+    for flag, value in zip(args, args[1:]):
+        if ENCODER_FLAG.fullmatch(flag):
+            encoder = value
+    return encoder
+
+
+def _source_id():
+    stat = SOURCE.stat()
+    return f"{SOURCE.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+_memo_lock = threading.Lock()
+# Failure reason prefixes that can pass on a retry, never memoized
+TRANSIENT_FAILURES = ("encode timed out", "encode speed", "scaling the source to 1080p failed",
+                      "VMAF computation failed")
+
+
+def _memo_path():
+    return CACHE / "scores.json"
+
+
+def _memo_key(args):
+    payload = json.dumps([args, _source_id(), TARGET_KBPS, ENCODERS])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _memo_get(key):
+    with _memo_lock:
+        try:
+            return json.loads(_memo_path().read_text()).get(key)
+        except (OSError, ValueError):
+            return None
+
+
+def _memo_put(key, result):
+    with _memo_lock:
+        CACHE.mkdir(parents=True, exist_ok=True)
+        try:
+            memo = json.loads(_memo_path().read_text())
+        except (OSError, ValueError):
+            memo = {}
+        memo[key] = result
+        tmp = _memo_path().with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(memo, indent=1))
+        os.replace(tmp, _memo_path())
+
+
+@functools.lru_cache(maxsize=None)
 def source_duration():
     out = subprocess.run(
         ["ffprobe", "-v", "error", "-show_entries", "format=duration",
@@ -80,27 +162,26 @@ def source_duration():
 
 
 def probe_output(path):
-    """Return (codec, bitrate_kbps, max_keyframe_gap_seconds)."""
-    codec = subprocess.run(
-        ["ffprobe", "-v", "error", "-select_streams", "v:0",
-         "-show_entries", "stream=codec_name", "-of", "csv=p=0", str(path)],
-        capture_output=True, text=True, timeout=60).stdout.strip()
-    bitrate = subprocess.run(
-        ["ffprobe", "-v", "error", "-show_entries", "format=bit_rate",
-         "-of", "csv=p=0", str(path)],
-        capture_output=True, text=True, timeout=60).stdout.strip()
-    kbps = int(bitrate) / 1000 if bitrate.isdigit() else 0
-    packets = subprocess.run(
+    """Return (codec, bitrate_kbps, max_keyframe_gap_seconds), one ffprobe pass."""
+    out = subprocess.run(
         ["ffprobe", "-v", "error", "-select_streams", "v:0",
-         "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", str(path)],
+         "-show_entries", "stream=codec_name:format=bit_rate:packet=pts_time,flags",
+         "-of", "json", str(path)],
         capture_output=True, text=True, timeout=120).stdout
+    try:
+        info = json.loads(out)
+    except ValueError:
+        info = {}
+    streams = info.get("streams") or [{}]
+    codec = streams[0].get("codec_name", "")
+    bitrate = str(info.get("format", {}).get("bit_rate", ""))
+    kbps = int(bitrate) / 1000 if bitrate.isdigit() else 0
     key_times = []
-    for line in packets.splitlines():
-        parts = line.split(",")
-        if len(parts) >= 2 and "K" in parts[1]:
+    for packet in info.get("packets", []):
+        if "K" in packet.get("flags", ""):
             try:
-                key_times.append(float(parts[0]))
-            except ValueError:
+                key_times.append(float(packet["pts_time"]))
+            except (KeyError, ValueError):
                 pass
     gap = 0.0
     for a, b in zip(key_times, key_times[1:]):
@@ -108,15 +189,42 @@ def probe_output(path):
     return codec, kbps, gap
 
 
-def compute_vmaf(distorted):
-    """VMAF of distorted vs SOURCE, both scaled to 1080p."""
+_reference_lock = threading.Lock()
+
+
+def reference_1080p():
+    """SOURCE scaled to 1080p once, cached as Y4M and reused by every VMAF run, None if ffmpeg failed."""
+    key = hashlib.sha256(_source_id().encode()).hexdigest()[:16]
+    path = CACHE / f"reference-{key}.y4m"
+    with _reference_lock:
+        if path.exists():
+            return path
+        CACHE.mkdir(parents=True, exist_ok=True)
+        for stale in CACHE.glob("reference-*.y4m"):
+            stale.unlink()
+        tmp = CACHE / f"reference-{key}.{os.getpid()}.tmp.y4m"
+        try:
+            subprocess.run(
+                ["ffmpeg", "-y", "-hide_banner", "-i", str(SOURCE),
+                 "-vf", "scale=1920:1080:flags=bicubic,setpts=PTS-STARTPTS",
+                 "-an", "-strict", "-1", str(tmp)],
+                capture_output=True, text=True, timeout=VMAF_TIMEOUT, check=True)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            tmp.unlink(missing_ok=True)
+            return None
+        os.replace(tmp, path)
+    return path
+
+
+def compute_vmaf(distorted, reference):
+    """VMAF of distorted scaled to 1080p vs the cached 1080p reference."""
     graph = (
         "[0:v]scale=1920:1080:flags=bicubic,setpts=PTS-STARTPTS[d];"
-        "[1:v]scale=1920:1080:flags=bicubic,setpts=PTS-STARTPTS[r];"
+        "[1:v]setpts=PTS-STARTPTS[r];"
         f"[d][r]libvmaf=n_threads={VMAF_THREADS}"
     )
     result = subprocess.run(
-        ["ffmpeg", "-hide_banner", "-i", str(distorted), "-i", str(SOURCE),
+        ["ffmpeg", "-hide_banner", "-i", str(distorted), "-i", str(reference),
          "-lavfi", graph, "-f", "null", "-"],
         capture_output=True, text=True, timeout=VMAF_TIMEOUT)
     match = re.search(r"VMAF score: ([0-9.]+)", result.stderr)
@@ -124,11 +232,23 @@ def compute_vmaf(distorted):
 
 
 def evaluate(code):
-    """Score one candidate. The AlphaEvolve controller calls this."""
+    """Score one candidate, memoized by its encoder arguments."""
     args, error = extract_args(code)
     if error:
         return fail(error)
 
+    key = _memo_key(args)
+    cached = _memo_get(key)
+    if cached is not None:
+        return dict(cached)
+    result = _evaluate_args(args)
+    if not result.get("reason", "").startswith(TRANSIENT_FAILURES):
+        _memo_put(key, result)
+    return result
+
+
+def _evaluate_args(args):
+    """Encode with `args`, apply the gates and score VMAF."""
     duration = source_duration()
     with tempfile.TemporaryDirectory() as tmp:
         out = Path(tmp) / "out.mp4"
@@ -160,7 +280,10 @@ def evaluate(code):
             return fail(f"encode speed {speed:.2f}x is below realtime",
                         bitrate_kbps=kbps)
 
-        vmaf = compute_vmaf(out)
+        reference = reference_1080p()
+        if reference is None:
+            return fail("scaling the source to 1080p failed", bitrate_kbps=kbps)
+        vmaf = compute_vmaf(out, reference)
     if vmaf is None:
         return fail("VMAF computation failed")
     return {"vmaf": vmaf, "bitrate_kbps": round(kbps), "encode_speed": round(speed, 2)}
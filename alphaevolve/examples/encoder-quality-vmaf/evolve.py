@@ -9,7 +9,9 @@ Uses the alpha_evolve client from the blurlab venv, run it as
     ../blurlab/.venv/bin/python evolve.py
 
 Optional env vars, MAX_PROGRAMS (default 40), CONCURRENCY (default 2),
-MODEL_1 / MODEL_2 and MODEL_1_WEIGHT / MODEL_2_WEIGHT.
+MODEL_1 / MODEL_2 and MODEL_1_WEIGHT / MODEL_2_WEIGHT, ENCODERLAB_SEED
+(default seed.py, seed_libx264.py together with ENCODERLAB_ENCODERS=libx264
+on Linux hosts).
 
 The best program lands in best_program.py. Confirm it standalone with
 evaluate.py, then port the winning arguments into the ffmpeg command in
@@ -33,12 +35,38 @@ from alpha_evolve.models import (
 )
 from alpha_evolve.visualization import get_score
 
-from evaluate import FAILED_SCORE, TARGET_KBPS, evaluate
+from evaluate import ENCODERS, FAILED_SCORE, MEDIA_ENGINE_ENCODERS, TARGET_KBPS, encoder_requirement, evaluate
 
 LAB = Path(__file__).resolve().parent
-SEED = LAB / "seed.py"
+SEED = LAB / os.environ.get("ENCODERLAB_SEED", "seed.py")
 PRIMARY_METRIC = "vmaf"
 
+if all(e in MEDIA_ENGINE_ENCODERS for e in ENCODERS):
+    ENCODER_CONTEXT = f"""\
+Important context. The current settings measure only about 1500 kbps on
+this content, far below the {TARGET_KBPS} kbps budget, because the rate
+control undershoots on partly static screen content. Spending more of the
+allowed budget on quality is legitimate and encouraged, as long as the
+measured bitrate stays under the cap.
+
+Ideas worth exploring. h264_videotoolbox private options (see ffmpeg -h
+encoder=h264_videotoolbox), for example constant_bit_rate, prio_speed,
+power_efficient, entropy coder selection, profile and level. Rate control
+shaping via -b:v, -maxrate and -bufsize combinations that use more of the
+budget. Keyframe interval up to the 2.1s cap. Quality-biased flags that
+still hold realtime speed, the seed encodes at 3.6x realtime so there is
+speed headroom to trade.
+"""
+else:
+    ENCODER_CONTEXT = f"""\
+Ideas worth exploring. {" and ".join(ENCODERS)} private options (see
+ffmpeg -h encoder={ENCODERS[0]}), presets, tunes, profile and level. Rate
+control shaping via -b:v, -maxrate and -bufsize combinations that use more
+of the {TARGET_KBPS} kbps budget. Keyframe interval up to the 2.1s cap.
+Slower, quality-biased settings as long as the encode holds realtime speed
+on this host.
+"""
+
 PROBLEM = f"""\
 Maximize the perceptual video quality (VMAF, 0 to 100, higher is better) of
 a live-streaming H.264 encode at a fixed bandwidth budget. The encoder runs
@@ -51,25 +79,12 @@ clip (mixed screen share and camera content) with those arguments and
 scores VMAF against the source.
 
 Hard gates, violating any returns a failure score. The encoder must remain
-h264_videotoolbox (hardware encode on the media engine is a product
-requirement, do not switch to libx264 or any software or non-h264 encoder).
+{" or ".join(ENCODERS)} ({encoder_requirement()}, do not switch to any
+other encoder).
 Measured output bitrate at most {TARGET_KBPS} kbps plus 5 percent.
 Keyframe gap at most 2.1 seconds. Encode speed at least realtime.
 
-Important context. The current settings measure only about 1500 kbps on
-this content, far below the {TARGET_KBPS} kbps budget, because the rate
-control undershoots on partly static screen content. Spending more of the
-allowed budget on quality is legitimate and encouraged, as long as the
-measured bitrate stays under the cap.
-
-Ideas worth exploring. h264_videotoolbox private options (see ffmpeg -h
-encoder=h264_videotoolbox), for example constant_bit_rate, prio_speed,
-power_efficient, entropy coder selection, profile and level. Rate control
-shaping via -b:v, -maxrate and -bufsize combinations that use more of the
-budget. Keyframe interval up to the 2.1s cap. Quality-biased flags that
-still hold realtime speed, the seed encodes at 3.6x realtime so there is
-speed headroom to trade.
-"""
+{ENCODER_CONTEXT}"""
 
 
 def evaluation_fn(program_candidate) -> dict:
@@ -0,0 +1,24 @@
+# encoderlab seed program for Linux build hosts without VideoToolbox. The
+# same rate control and keyframe settings as seed.py on libx264, run with
+#
+#     ENCODERLAB_ENCODERS=libx264 ENCODERLAB_SEED=seed_libx264.py python3 evolve.py
+#
+# Scores from this backend are only comparable with each other, not with
+# h264_videotoolbox runs, it is for exercising the loop and the evaluator.
+
+# EVOLVE-BLOCK-START
+def encoder_args():
+    # Capped rate with a 2 second bufsize window and a 2 second keyframe
+    # interval, veryfast keeps the encode above realtime on a build host.
+    return [
+        "-c:v", "libx264",
+        "-preset", "veryfast",
+        "-b:v", "12000k",
+        "-maxrate", "12000k",
+        "-bufsize", "24000k",
+        "-g", "60",
+        "-pix_fmt", "yuv420p",
+        "-color_range", "tv",
+        "-fps_mode", "cfr",
+    ]
+# EVOLVE-BLOCK-END
@@ -0,0 +1,178 @@
+"""A pool of pre-started worker processes that score AlphaEvolve candidates.
+
+evolve.py used to exec every candidate inside the controller process, so one
+hanging candidate stalled the whole run and concurrent evaluations fought over
+the GIL. Here each candidate runs in a worker process that was started ahead
+of time with numpy already imported, under a wall clock timeout (the worker is
+killed and replaced) and a memory limit (RLIMIT_AS, where the OS enforces it).
+
+Scores are memoized by a normalized hash of the program plus the inputs and
+the metric. LLM mutation often produces the same program again with only
+comments or formatting changed, those are scored once. Identical candidates
+that arrive while the first one is still running wait for its result.
+Timeouts are not memoized, a candidate that ran out of time on a saturated
+machine is scored again the next time it comes up.
+"""
+import ast
+import hashlib
+import json
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Future
+
+# Workers are recycled after this many candidates, a candidate can leave
+# global state behind (monkeypatched modules, threads, leaked memory)
+MAX_TASKS_PER_WORKER = 50
+
+
+def normalize(code: str) -> str:
+    """Program text with comments and formatting removed, for memo keys."""
+    try:
+        return ast.dump(ast.parse(code), annotate_fields=False, include_attributes=False)
+    except (SyntaxError, ValueError):
+        return "\n".join(line.strip() for line in code.splitlines() if line.strip())
+
+
+def memo_key(code: str, inputs: dict, metric: str) -> str:
+    payload = json.dumps([normalize(code), inputs, metric], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _worker(conn, memory_mb):
+    """Worker loop, receives (code, inputs, metric) and sends back an outcome dict."""
+    import resource
+    from typing import Any, Mapping
+
+    import numpy as np
+
+    if memory_mb:
+        try:
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, resource.getrlimit(resource.RLIMIT_AS)[1]))
+        except (ValueError, OSError):
+            pass  # not enforceable here (e.g. macOS), the timeout still applies
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        code, inputs, metric = job
+        try:
+            ns = {"np": np, "Any": Any, "Mapping": Mapping}
+            exec(code, ns)
+            fn = ns.get("evaluate")
+            if not callable(fn):
+                outcome = {"status": "no_evaluate"}
+            else:
+                score = fn(inputs).get(metric)
+                if score is not None and score != -float("inf"):
+                    outcome = {"status": "ok", "score": float(score)}
+                else:
+                    outcome = {"status": "invalid_score", "got": repr(score)}
+        except MemoryError:
+            outcome = {"status": "error", "message": f"exceeded the {memory_mb} MB memory limit"}
+        except Exception as e:  # a broken candidate is a signal, not a crash
+            outcome = {"status": "error", "message": str(e)}
+        conn.send(outcome)
+
+
+class _Worker:
+    def __init__(self, ctx, memory_mb):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker, args=(child, memory_mb), daemon=True)
+        self.process.start()
+        child.close()
+        self.tasks = 0
+
+    def stop(self, kill=False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class CandidatePool:
+    """Scores candidates on `workers` processes with per-candidate limits and memoization."""
+
+    def __init__(self, workers=4, timeout=300, memory_mb=4096):
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        # forkserver keeps forks away from the controller's threads and event loop
+        methods = multiprocessing.get_all_start_methods()
+        self.ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        if "forkserver" in methods:
+            self.ctx.set_forkserver_preload(["numpy"])
+        self.idle = queue.Queue()
+        for _ in range(workers):
+            self.idle.put(_Worker(self.ctx, memory_mb))
+        self.memo = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def evaluate(self, code: str, inputs: dict, metric: str) -> dict:
+        """Outcome of one candidate, {"status": "ok", "score": ...} or a failure status."""
+        key = memo_key(code, inputs, metric)
+        with self.lock:
+            future = self.memo.get(key)
+            owner = future is None
+            if owner:
+                future = self.memo[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if owner:
+            try:
+                outcome = self._run(code, inputs, metric)
+            except BaseException as e:
+                outcome = e
+            # A timeout depends on the load at the time, callers already waiting share it,
+            # later ones score the candidate again. The same goes for errors in the pool itself.
+            if isinstance(outcome, BaseException) or outcome.get("status") == "timeout":
+                with self.lock:
+                    self.memo.pop(key, None)
+            if isinstance(outcome, BaseException):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+        return future.result()
+
+    def _run(self, code, inputs, metric):
+        worker = self.idle.get()
+        replace = False
+        try:
+            worker.conn.send((code, inputs, metric))
+            if worker.conn.poll(self.timeout):
+                outcome = worker.conn.recv()
+            else:
+                outcome = {"status": "timeout", "message": f"no result within {self.timeout}s"}
+                replace = True
+        except (EOFError, BrokenPipeError, OSError):
+            # Killed by the OS, e.g. a segfault or the memory limit in native code
+            worker.process.join(timeout=1)
+            outcome = {"status": "error", "message": f"worker exited with code {worker.process.exitcode}"}
+            replace = True
+        worker.tasks += 1
+        if replace or worker.tasks >= MAX_TASKS_PER_WORKER:
+            worker.stop(kill=replace)
+            worker = _Worker(self.ctx, self.memory_mb)
+        self.idle.put(worker)
+        return outcome
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().stop()
+            except queue.Empty:
+                return
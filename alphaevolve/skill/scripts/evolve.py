@@ -15,10 +15,13 @@ Config comes from the environment (or a .env next to where you run it):
     LOCATION=global  COLLECTION=default_collection  ASSISTANT=default_assistant
     MODEL_1=gemini-3.5-flash  MODEL_2=gemini-3.1-pro-preview  (weighted mixture)
 
+Candidates are scored on a pool of worker processes (candidate_pool.py), each
+with a wall clock --timeout and a --memory-mb limit, and duplicate candidates
+are scored once.
+
 Auth: run `gcloud auth application-default login` once first.
 """
 import argparse, asyncio, json, logging, os, importlib.util
-from typing import Any, Mapping
 
 import nest_asyncio
 from dotenv import load_dotenv
@@ -37,42 +40,43 @@ from alpha_evolve.models import (
 )
 from alpha_evolve.visualization import get_score
 
+from candidate_pool import CandidatePool
+
 # A big negative sentinel keeps failed candidates from ever being selected. The
 # API requires a numeric score per metric, so this is used instead of -inf.
 FAILED_SCORE = -1e12
 
 
-def make_evaluator(metric: str, inputs: dict):
+def make_evaluator(metric: str, inputs: dict, pool: CandidatePool):
     """Build the evaluator AlphaEvolve calls on every candidate it generates.
 
-    Your program is exec'd in a fresh namespace, then its evaluate(inputs) is
-    called. Whatever it returns under `metric` becomes the candidate's score.
+    Your program is exec'd in a fresh namespace on one of the pool's worker
+    processes, then its evaluate(inputs) is called. Whatever it returns under
+    `metric` becomes the candidate's score.
     """
 
     def evaluate_candidate(program_candidate) -> dict:
         code = program_candidate["content"]["files"][0]["content"]
         score_value = FAILED_SCORE
         insights = []
-        try:
-            ns = {"np": __import__("numpy"), "Any": Any, "Mapping": Mapping}
-            exec(code, ns)
-            fn = ns.get("evaluate")
-            if callable(fn):
-                result = fn(inputs)
-                score = result.get(metric)
-                if score is not None and score != -float("inf"):
-                    score_value = float(score)
-                else:
-                    insights.append(AlphaEvolveEvaluationInsight(
-                        label="Invalid Score",
-                        text=f"evaluate() returned no valid '{metric}' (got {score!r}); the candidate broke a constraint."))
-            else:
-                insights.append(AlphaEvolveEvaluationInsight(
-                    label="Invalid Program Structure",
-                    text="The program is missing a callable 'evaluate' function."))
-        except Exception as e:  # a broken candidate is a signal, not a crash
+        outcome = pool.evaluate(code, inputs, metric)
+        status = outcome["status"]
+        if status == "ok":
+            score_value = outcome["score"]
+        elif status == "invalid_score":
+            insights.append(AlphaEvolveEvaluationInsight(
+                label="Invalid Score",
+                text=f"evaluate() returned no valid '{metric}' (got {outcome['got']}); the candidate broke a constraint."))
+        elif status == "no_evaluate":
+            insights.append(AlphaEvolveEvaluationInsight(
+                label="Invalid Program Structure",
+                text="The program is missing a callable 'evaluate' function."))
+        elif status == "timeout":
+            insights.append(AlphaEvolveEvaluationInsight(
+                label="Timeout", text=f"Candidate was stopped, {outcome['message']}."))
+        else:
             insights.append(AlphaEvolveEvaluationInsight(
-                label="Runtime Error", text=f"Candidate failed during execution: {e}"))
+                label="Runtime Error", text=f"Candidate failed during execution: {outcome['message']}"))
 
         scores = AlphaEvolveEvaluationScores(
             scores=[AlphaEvolveEvaluationScore(metric=metric, score=score_value)])
@@ -90,6 +94,9 @@ def main():
     ap.add_argument("--inputs", default="{}", help="JSON dict passed to evaluate(). e.g. '{\"n\": 26}'")
     ap.add_argument("--max-programs", type=int, default=20, help="Search budget (candidates evaluated).")
     ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--workers", type=int, help="Evaluation worker processes (default: --concurrency).")
+    ap.add_argument("--timeout", type=float, default=300, help="Wall clock seconds per candidate evaluation.")
+    ap.add_argument("--memory-mb", type=int, default=4096, help="Memory limit per candidate, 0 for none.")
     ap.add_argument("--out", default="best_program.py", help="Where to write the winning program.")
     args = ap.parse_args()
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
@@ -107,7 +114,8 @@ def main():
         assistant=os.getenv("ASSISTANT", "default_assistant"),
         base_url=os.getenv("BASE_URL", "discoveryengine.googleapis.com"),
     )
-    experiment = AlphaEvolveExperiment(client, make_evaluator(args.metric, inputs), args.max_programs)
+    pool = CandidatePool(workers=args.workers or args.concurrency, timeout=args.timeout, memory_mb=args.memory_mb)
+    experiment = AlphaEvolveExperiment(client, make_evaluator(args.metric, inputs, pool), args.max_programs)
     experiment.create_experiment({
         "title": f"Evolve {os.path.basename(args.program)}",
         "problem_description": f"Evolve the marked region to maximize {args.metric}.",
@@ -126,6 +134,8 @@ def main():
 
     nest_asyncio.apply()
     asyncio.run(run_controller_loop(experiment))
+    pool.close()
+    logging.info("evaluated %d distinct candidates, %d duplicates served from the memo", pool.misses, pool.hits)
 
     resp = experiment.list_programs(params={"order_by": f"{args.metric} desc"})
     progs = resp.get("alphaEvolvePrograms", []) if resp else []
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of the circle_packing evaluator cost per candidate.
+
+Times the protected checks (_valid_packing, containment plus the broadcast
+pairwise overlap test) against the previous pure-Python double loop, on a
+valid random packing at n=26 and n=1000, plus one full evaluate() call of
+the seed program at n=26 and a multi-seed call.
+
+    python bench_circle_packing.py [--repeats 20]
+"""
+import argparse
+import time
+
+import numpy as np
+
+import circle_packing
+
+
+def _circles_overlap_loop(centers, radii):
+    # The evaluator before vectorization, kept as the baseline
+    n = centers.shape[0]
+    for i in range(n):
+        for j in range(i + 1, n):
+            dist = np.sqrt(np.sum((centers[i] - centers[j]) ** 2))
+            if radii[i] + radii[j] > dist:
+                return True
+    return False
+
+
+def random_packing(n, seed=0):
+    """A valid packing, random centers with radii that just avoid the walls and each other."""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(0.05, 0.95, size=(n, 2))
+    dist = np.sqrt(np.sum((centers[:, None] - centers[None, :]) ** 2, axis=-1))
+    np.fill_diagonal(dist, np.inf)
+    walls = np.minimum(centers, 1 - centers).min(axis=1)
+    radii = np.minimum(dist.min(axis=1) / 2, walls) * 0.999
+    return centers, radii
+
+
+def bench(fn, repeats):
+    """Best of `repeats` wall times in milliseconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the circle_packing evaluator.")
+    ap.add_argument("--repeats", type=int, default=20)
+    args = ap.parse_args()
+
+    for n in (26, 1000):
+        centers, radii = random_packing(n)
+        assert circle_packing._valid_packing(centers, radii, n)
+        vectorized = bench(lambda: circle_packing._valid_packing(centers, radii, n), args.repeats)
+        loop = bench(lambda: _circles_overlap_loop(centers, radii), max(1, args.repeats // 10))
+        print(f"n={n:5d}  checks vectorized {vectorized:9.3f} ms   "
+              f"overlap loop {loop:9.3f} ms   {loop / vectorized:7.1f}x")
+
+    full = bench(lambda: circle_packing.evaluate({"n": 26}), args.repeats)
+    print(f"evaluate() seed program, n=26, 1 seed          {full:9.3f} ms")
+    multi = bench(lambda: circle_packing.evaluate({"sizes": [26, 32], "seeds": list(range(8))}), args.repeats)
+    print(f"evaluate() seed program, n=26,32 x 8 seeds     {multi:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -113,37 +113,56 @@ def compute_max_radii(centers, random_seed: int):
 
 
 def _circles_overlap(centers, radii):
-    """Protected function to compute max radii."""
+    """Protected function to check whether any two circles overlap.
+
+    Compares every pair at once with a broadcast pairwise-distance matrix
+    instead of a Python double loop.
+    """
     n = centers.shape[0]
+    i, j = np.triu_indices(n, 1)
+    dist = np.sqrt(np.sum((centers[i] - centers[j]) ** 2, axis=-1))
+    return bool((radii[i] + radii[j] > dist).any())
 
-    for i in range(n):
-        for j in range(i + 1, n):
-            dist = np.sqrt(np.sum((centers[i] - centers[j]) ** 2))
-            if radii[i] + radii[j] > dist:
-                return True
 
-    return False
+def _valid_packing(centers, radii, n) -> bool:
+    """Protected shape, finiteness, containment and overlap checks."""
+    if centers.shape != (n, 2) or not np.isfinite(centers).all():
+        return False
+    if radii.shape != (n,) or not np.isfinite(radii).all() or not (0 <= radii).all():
+        return False
+    if not ((radii[:, None] <= centers) & (centers <= 1 - radii[:, None])).all():
+        return False
+    return not _circles_overlap(centers, radii)
 
 
-def evaluate(eval_inputs: Mapping[str, Any]) -> dict[str, float]:
-    """Construct a packing and evaluate its score."""
-    n = eval_inputs["n"]
-    if "random_seed" not in eval_inputs:
-        random_seed = 42
-    else:
-        random_seed = eval_inputs["random_seed"]
+def _score(n, random_seed) -> float:
     centers, radii, _ = construct_packing(n, random_seed=random_seed)
-    if (
-        centers.shape != (n, 2)
-        or not np.isfinite(centers).all()
-        or not ((radii[:, None] <= centers) & (centers <= 1 - radii[:, None])).all()
-    ):
-        return {"sum_of_radii": -np.inf}
+    centers, radii = np.asarray(centers), np.asarray(radii)
+    if not _valid_packing(centers, radii, n):
+        return -np.inf
+    return float(np.sum(radii))
 
-    if radii.shape != (n,) or not np.isfinite(radii).all() or not (0 <= radii).all():
-        return {"sum_of_radii": -np.inf}
 
-    if _circles_overlap(centers, radii):
-        return {"sum_of_radii": -np.inf}
+def evaluate(eval_inputs: Mapping[str, Any]) -> dict[str, float]:
+    """Construct a packing and evaluate its score.
+
+    Scores a single packing by default. Pass "seeds" and/or "sizes" lists
+    (e.g. {"sizes": [26, 32], "seeds": [0, 1, 2]}) to score every combination
+    in one call. sum_of_radii is then the mean over all of them, and the
+    mean, min and per-size means are reported next to it. Any invalid
+    packing makes the whole candidate invalid.
+    """
+    sizes = eval_inputs.get("sizes") or [eval_inputs["n"]]
+    seeds = eval_inputs.get("seeds") or [eval_inputs.get("random_seed", 42)]
+    if len(sizes) == 1 and len(seeds) == 1:
+        return {"sum_of_radii": _score(sizes[0], seeds[0])}
 
-    return {"sum_of_radii": float(np.sum(radii))}
\ No newline at end of file
+    scores = np.array([[_score(n, seed) for seed in seeds] for n in sizes])
+    if not np.isfinite(scores).all():
+        return {"sum_of_radii": -np.inf}
+    return {
+        "sum_of_radii": float(scores.mean()),
+        "sum_of_radii_mean": float(scores.mean()),
+        "sum_of_radii_min": float(scores.min()),
+        **{f"sum_of_radii_n{n}": float(row.mean()) for n, row in zip(sizes, scores)},
+    }
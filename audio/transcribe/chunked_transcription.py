@@ -0,0 +1,217 @@
+"""Chunked, parallel transcription for long recordings.
+
+The audio is cut into overlapping windows whose boundaries are snapped to
+silences (found with ffmpeg's silencedetect filter, so the file is never
+decoded into memory), the windows are transcribed concurrently and the
+per-window segments are stitched back together:
+
+- timestamps are shifted by the window offset
+- generic speaker labels ("Speaker A") are mapped onto the labels of the
+  previous window by matching the segments both windows heard in the overlap
+- segments in the overlap are kept from one window only, split at the
+  middle of the overlap
+
+Windows go to the model inline, so they are also sized by bytes, a window
+of high-bitrate audio is shortened to stay below MAX_WINDOW_BYTES. A window
+that fails is retried on its own, one that keeps failing becomes a marker
+segment in the transcript instead of failing the whole recording.
+"""
+import difflib
+import os
+import re
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, defaultdict
+
+WINDOW_SECONDS = 10 * 60
+OVERLAP_SECONDS = 20
+# How far a window boundary may move to land on a silence
+SNAP_SECONDS = 30
+MAX_WORKERS = 8
+# Inline request data is capped at 20 MB and base64 grows it by a third, stay well below
+MAX_WINDOW_BYTES = 12 * 1024 * 1024
+# Shortest window sizing by bytes may produce, windows must stay well above the overlap
+MIN_WINDOW_SECONDS = 2 * 60
+WINDOW_ATTEMPTS = 3
+
+GENERIC_SPEAKER = re.compile(r"^speaker\s+\w+$", re.IGNORECASE)
+SILENCE_LINE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+
+
+def probe_duration(path):
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return float(output.strip())
+
+
+def detect_silences(path, noise_db=-35, min_silence=0.4):
+    """Returns the midpoints of all silences in the file, in seconds."""
+    stderr = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostats", "-i", path,
+         "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}", "-f", "null", "-"],
+        check=True, capture_output=True, text=True,
+    ).stderr
+    midpoints = []
+    start = None
+    for kind, value in SILENCE_LINE.findall(stderr):
+        if kind == "start":
+            start = float(value)
+        elif start is not None:
+            midpoints.append((start + float(value)) / 2)
+            start = None
+    return midpoints
+
+
+def plan_windows(duration, silences, window=WINDOW_SECONDS, overlap=OVERLAP_SECONDS, snap=SNAP_SECONDS):
+    """Returns (start, end) windows covering the audio, overlapping by about `overlap` seconds."""
+    windows = []
+    start = 0.0
+    while True:
+        target = start + window
+        if target >= duration - snap:
+            windows.append((start, duration))
+            return windows
+        nearby = [s for s in silences if abs(s - target) <= snap and s > start + overlap * 2]
+        cut = min(nearby, key=lambda s: abs(s - target)) if nearby else target
+        windows.append((start, min(cut + overlap / 2, duration)))
+        start = max(cut - overlap / 2, 0.0)
+
+
+def extract_window(path, start, end):
+    """Cuts [start, end) out of the source without re-encoding and returns the MP3 bytes."""
+    return subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+         "-i", path, "-c", "copy", "-f", "mp3", "-"],
+        check=True, capture_output=True,
+    ).stdout
+
+
+def parse_timestamp(timestamp):
+    parts = [float(part) for part in timestamp.strip().split(":")]
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + part
+    return seconds
+
+
+def format_timestamp(seconds):
+    seconds = int(round(seconds))
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _normalize(text):
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def _speaker_mapping(previous, current, overlap_start, overlap_end):
+    """Maps generic labels in `current` to labels of `previous` via segments both heard in the overlap."""
+    previous_overlap = [s for s in previous if overlap_start <= s["seconds"] <= overlap_end]
+    votes = defaultdict(Counter)
+    for segment in current:
+        if segment["seconds"] > overlap_end or not GENERIC_SPEAKER.match(segment["speaker"]):
+            continue
+        text = _normalize(segment["transcription"])
+        best, best_ratio = None, 0.6
+        for candidate in previous_overlap:
+            ratio = difflib.SequenceMatcher(None, text, _normalize(candidate["transcription"])).ratio()
+            if ratio > best_ratio:
+                best, best_ratio = candidate, ratio
+        if best is not None:
+            votes[segment["speaker"]][best["speaker"]] += 1
+    return {label: counter.most_common(1)[0][0] for label, counter in votes.items()}
+
+
+def stitch(windows, window_segments):
+    """Combines per-window segments (timestamps relative to their window) into one transcript."""
+    stitched = []
+    previous = []
+    for index, ((start, end), segments) in enumerate(zip(windows, window_segments)):
+        absolute = []
+        for segment in segments:
+            try:
+                seconds = start + parse_timestamp(segment["timestamp"])
+            except ValueError:
+                continue
+            absolute.append(dict(segment, seconds=seconds))
+
+        if index > 0:
+            overlap_start, overlap_end = start, windows[index - 1][1]
+            mapping = _speaker_mapping(previous, absolute, overlap_start, overlap_end)
+            for segment in absolute:
+                segment["speaker"] = mapping.get(segment["speaker"], segment["speaker"])
+            # Split the overlap in the middle, earlier window keeps the first half
+            cut = (overlap_start + overlap_end) / 2
+            stitched = [s for s in stitched if s["seconds"] < cut]
+            absolute = [s for s in absolute if s["seconds"] >= cut]
+
+        stitched.extend(absolute)
+        previous = absolute
+
+    stitched.sort(key=lambda s: s["seconds"])
+    return [
+        {"speaker": s["speaker"], "transcription": s["transcription"], "timestamp": format_timestamp(s["seconds"])}
+        for s in stitched
+    ]
+
+
+def window_for_size(duration, size, window=WINDOW_SECONDS, max_bytes=MAX_WINDOW_BYTES):
+    """Window length in seconds whose audio stays below max_bytes at the file's average bitrate."""
+    if duration <= 0 or size <= max_bytes:
+        return window
+    return max(MIN_WINDOW_SECONDS, min(window, max_bytes * duration / size))
+
+
+def transcribe_with_retry(transcribe_window, audio_bytes, bounds, attempts=WINDOW_ATTEMPTS, overlap=OVERLAP_SECONDS):
+    """Segments of one window, retried on its own, a marker segment if every attempt failed."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return transcribe_window(audio_bytes)
+        except Exception as error:
+            last_error = error
+            print(f"Window {format_timestamp(bounds[0])}-{format_timestamp(bounds[1])}, "
+                  f"attempt {attempt} of {attempts} failed: {error}")
+            if attempt < attempts:
+                time.sleep(2 ** attempt)
+    # placed after the overlap, so stitching keeps it
+    return [{"speaker": "", "timestamp": format_timestamp(min(overlap, bounds[1] - bounds[0])),
+             "transcription": f"[{format_timestamp(bounds[0])}-{format_timestamp(bounds[1])} "
+                              f"could not be transcribed: {last_error}]"}]
+
+
+def transcribe_file(path, transcribe_window, window=WINDOW_SECONDS, overlap=OVERLAP_SECONDS, max_workers=MAX_WORKERS):
+    """Transcribes a local audio file.
+
+    `transcribe_window` receives the MP3 bytes of one window and returns its
+    list of segments with timestamps relative to the window start.
+    """
+    duration = probe_duration(path)
+    window = window_for_size(duration, os.path.getsize(path), window)
+    if duration <= window:
+        with open(path, "rb") as f:
+            return transcribe_with_retry(transcribe_window, f.read(), (0.0, duration), overlap=0)
+
+    windows = plan_windows(duration, detect_silences(path), window, overlap)
+    print(f"Transcribing {duration:.0f}s of audio in {len(windows)} windows")
+
+    def run(bounds):
+        return transcribe_with_retry(transcribe_window, extract_window(path, *bounds), bounds, overlap=overlap)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        window_segments = list(executor.map(run, windows))
+
+    return stitch(windows, window_segments)
+
+
+def transcribe_gcs(gs_uri, transcribe_window, **kwargs):
+    """Downloads a gs:// object to a temporary file and transcribes it in windows."""
+    from google.cloud import storage
+
+    bucket_name, blob_name = gs_uri[len("gs://"):].split("/", 1)
+    blob = storage.Client().bucket(bucket_name).blob(blob_name)
+    with tempfile.NamedTemporaryFile(suffix=".mp3") as tmp:
+        blob.download_to_filename(tmp.name)
+        return transcribe_file(tmp.name, transcribe_window, **kwargs)
@@ -4,6 +4,7 @@ import vertexai
 from vertexai.generative_models import GenerativeModel, GenerationConfig, Part
 from datetime import datetime
 import json
+from chunked_transcription import transcribe_gcs
 
 # Google Cloud Configuration
 PROJECT_ID = "sascha-playground-doit"
@@ -44,20 +45,18 @@ def upload_to_gcs(file, bucket_name, destination_blob_name):
     public_url = f"https://storage.cloud.google.com/{bucket_name}/{destination_blob_name}"
     return gs_uri, public_url
 
-# Call Gemini model with controlled JSON schema
-@st.cache_data
-def process_audio_with_gemini(gs_uri):
-    vertexai.init(project=PROJECT_ID, location="us-central1")
-    model = GenerativeModel("gemini-1.5-pro-002")
-
-    prompt = """
+PROMPT = """
     Generate audio diarization for this audio file. 
     - Use JSON format for the output, with the following keys: "speaker", "transcription", "timestamp". 
     - If you can infer the speaker, please do, only use first name. 
     - If not, use speaker A, speaker B
     """
 
-    audio_file = Part.from_uri(gs_uri, mime_type="audio/mpeg")
+# Transcribe a single window of audio (bytes) with a controlled JSON schema
+def transcribe_audio_bytes(audio_bytes):
+    model = GenerativeModel("gemini-1.5-pro-002")
+
+    audio_file = Part.from_data(audio_bytes, mime_type="audio/mpeg")
 
     generation_config = GenerationConfig(
         audio_timestamp=True,
@@ -68,12 +67,19 @@ def process_audio_with_gemini(gs_uri):
     )
 
     response = model.generate_content(
-        [audio_file, prompt],
+        [audio_file, PROMPT],
         generation_config=generation_config,
         stream=False
     )
 
-    return response.candidates[0].content.parts[0].text
+    return json.loads(response.candidates[0].content.parts[0].text)
+
+# Call Gemini model, long recordings are split into overlapping windows that are transcribed in parallel
+@st.cache_data
+def process_audio_with_gemini(gs_uri):
+    vertexai.init(project=PROJECT_ID, location="us-central1")
+    sections = transcribe_gcs(gs_uri, transcribe_audio_bytes)
+    return json.dumps(sections)
 
 # Convert HH:MM:SS to seconds
 def timestamp_to_seconds(timestamp):
@@ -9,10 +9,18 @@ inside a sandbox. Two modes.
   python sandbox_run.py --url https://SERVICE.run.app --generate "sum these numbers 1 2 3"
 
 Add --allow-egress to permit outbound network for that one run (off by default).
+Add --stream with --file to print stdout and stderr while the code is still running.
+
+  # run every *.py file of a directory in one /run_batch call, one JSON line per file
+  python sandbox_run.py --url https://SERVICE.run.app --dir snippets/ --order completion
+
 Standard library only, no dependencies.
 """
 import argparse
+import glob
 import json
+import os
+import sys
 import urllib.request
 
 
@@ -25,17 +33,81 @@ def post(url, payload):
         return json.loads(r.read().decode())
 
 
+def stream(url, payload):
+    """POST and print the server-sent events of a /run/stream call as they arrive."""
+    data = json.dumps(payload).encode()
+    req = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"}, method="POST"
+    )
+    result = None
+    with urllib.request.urlopen(req, timeout=120) as r:
+        event = None
+        for raw in r:
+            line = raw.decode().rstrip("\n")
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                value = json.loads(line[len("data: "):])
+                if event == "stdout":
+                    sys.stdout.write(value)
+                    sys.stdout.flush()
+                elif event == "stderr":
+                    sys.stderr.write(value)
+                    sys.stderr.flush()
+                elif event == "exit":
+                    result = value
+    return result
+
+
+def run_batch(url, items, order, concurrency):
+    """POST a /run_batch call and print each NDJSON result line as it arrives."""
+    payload = {"items": items, "order": order}
+    if concurrency:
+        payload["concurrency"] = concurrency
+    data = json.dumps(payload).encode()
+    req = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"}, method="POST"
+    )
+    failed = 0
+    with urllib.request.urlopen(req, timeout=600) as r:
+        for raw in r:
+            if not raw.strip():
+                continue
+            result = json.loads(raw.decode())
+            failed += result.get("returncode") != 0
+            print(json.dumps(result), flush=True)
+    return failed
+
+
 def main():
     ap = argparse.ArgumentParser(description="Run code inside a Cloud Run sandbox")
     ap.add_argument("--url", required=True, help="Service base URL")
     group = ap.add_mutually_exclusive_group(required=True)
     group.add_argument("--file", help="Path to a Python file to run in the sandbox")
     group.add_argument("--generate", metavar="TASK", help="Let Gemini write the code for TASK, then run it")
+    group.add_argument("--dir", help="Run every *.py file in this directory with one /run_batch call")
     ap.add_argument("--allow-egress", action="store_true", help="Permit outbound network for this run")
+    ap.add_argument("--stream", action="store_true", help="Stream output while the file runs (--file only)")
+    ap.add_argument("--order", choices=["submission", "completion"], default="submission",
+                    help="Result order for --dir, file order or as soon as each finishes")
+    ap.add_argument("--concurrency", type=int, help="Parallel runs for --dir (capped by the service)")
     args = ap.parse_args()
 
     base = args.url.rstrip("/")
-    if args.file:
+    if args.dir:
+        items = []
+        for path in sorted(glob.glob(os.path.join(args.dir, "*.py"))):
+            with open(path) as f:
+                items.append({"id": os.path.basename(path), "code": f.read(), "allow_egress": args.allow_egress})
+        if not items:
+            sys.exit(f"No *.py files in {args.dir}")
+        failed = run_batch(base + "/run_batch", items, args.order, args.concurrency)
+        sys.exit(1 if failed else 0)
+    if args.file and args.stream:
+        with open(args.file) as f:
+            code = f.read()
+        out = stream(base + "/run/stream", {"code": code, "allow_egress": args.allow_egress})
+    elif args.file:
         with open(args.file) as f:
             code = f.read()
         out = post(base + "/run", {"code": code, "allow_egress": args.allow_egress})
@@ -1,18 +1,25 @@
+import json
 import os
-import subprocess
-import sys
-import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from google import genai
 
+from pool import InterpreterPool
+
 app = Flask(__name__)
 
-SANDBOX = "/usr/local/gcp/bin/sandbox"
-# The sandbox runs with an EMPTY PATH (env is not inherited), so "python3" is not
-# found. Invoke the interpreter by absolute path.
-PYTHON = os.path.realpath(sys.executable)
+# Warm interpreters kept per egress setting, and modules they import before any code arrives
+POOL_SIZE = int(os.environ.get("POOL_SIZE", "2"))
+PREIMPORT = [m for m in os.environ.get("PREIMPORT", "json,math,re,datetime").split(",") if m]
+MAX_OUTPUT_BYTES = int(os.environ.get("MAX_OUTPUT_BYTES", str(1_000_000)))
+RUN_TIMEOUT = float(os.environ.get("RUN_TIMEOUT", "60"))
+# Upper bound for concurrently running snippets of one /run_batch request
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "8"))
+MAX_BATCH_ITEMS = int(os.environ.get("MAX_BATCH_ITEMS", "1000"))
 _client = None
+_pool = None
 
 
 def client():
@@ -22,17 +29,28 @@ def client():
     return _client
 
 
+def pool():
+    # Created lazily so every gunicorn worker starts its own interpreters after the fork
+    global _pool
+    if _pool is None:
+        _pool = InterpreterPool(
+            size=POOL_SIZE,
+            preimport=PREIMPORT,
+            max_output_bytes=MAX_OUTPUT_BYTES,
+            timeout=RUN_TIMEOUT,
+        )
+    return _pool
+
+
 def run_in_sandbox(code, allow_egress=False):
-    """Write code to a temp file and run it inside a fresh throwaway sandbox."""
-    with tempfile.NamedTemporaryFile("w", suffix=".py", dir="/tmp", delete=False) as f:
-        f.write(code)
-        path = f.name
-    cmd = [SANDBOX, "do"]
-    if allow_egress:
-        cmd.append("--allow-egress")
-    cmd += ["--", PYTHON, path]
-    proc = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-    return {"stdout": proc.stdout, "stderr": proc.stderr, "returncode": proc.returncode}
+    """Run code on a pre-warmed sandboxed interpreter, the interpreter is discarded afterwards."""
+    return pool().run(code, allow_egress)
+
+
+def sse(events):
+    """Format (kind, value) events from the pool as server-sent events."""
+    for kind, value in events:
+        yield f"event: {kind}\ndata: {json.dumps(value)}\n\n"
 
 
 @app.get("/")
@@ -49,6 +67,99 @@ def run():
     return jsonify(run_in_sandbox(code, allow))
 
 
+@app.post("/run/stream")
+def run_stream():
+    """Like /run, but stream stdout and stderr back as server-sent events while the code runs."""
+    body = request.get_json(force=True)
+    code = body["code"]
+    allow = bool(body.get("allow_egress", False))
+    return Response(
+        stream_with_context(sse(pool().stream(code, allow))),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def run_batch_items(items, order="submission", workers=BATCH_WORKERS):
+    """Run many snippets on a bounded worker pool and yield one result per item.
+
+    With order="submission" results are yielded in the order of `items`,
+    finished results wait for the earlier ones. With order="completion" each
+    result is yielded as soon as it is done. Closing the generator (the client
+    went away) drops the queued items and kills the running ones.
+    """
+    cancel = threading.Event()
+
+    def run_item(item):
+        if cancel.is_set():
+            return {"id": item.get("id"), "error": "cancelled"}
+        try:
+            result = pool().run(
+                item["code"],
+                bool(item.get("allow_egress", False)),
+                timeout=min(float(item.get("timeout", RUN_TIMEOUT)), RUN_TIMEOUT),
+                max_output_bytes=min(int(item.get("max_output_bytes", MAX_OUTPUT_BYTES)), MAX_OUTPUT_BYTES),
+                memory_mb=item.get("memory_mb"),
+                cpu_seconds=item.get("cpu_seconds"),
+                cancel=cancel,
+            )
+        except Exception as e:
+            result = {"error": str(e)}
+        return {"id": item.get("id"), **result}
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(run_item, item): index for index, item in enumerate(items)}
+        if order == "completion":
+            for future in as_completed(futures):
+                yield {"index": futures[future], **future.result()}
+            return
+
+        done = {}
+        next_index = 0
+        for future in as_completed(futures):
+            done[futures[future]] = future.result()
+            while next_index in done:
+                yield {"index": next_index, **done.pop(next_index)}
+                next_index += 1
+    finally:
+        # do not wait for work nobody will read
+        cancel.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+@app.post("/run_batch")
+def run_batch():
+    """Run many code items, results are streamed back as NDJSON, one line per item.
+
+    Body: {"items": [{"id", "code", "allow_egress", "timeout", "max_output_bytes",
+    "memory_mb", "cpu_seconds"}], "order": "submission" | "completion", "concurrency": n}
+    """
+    body = request.get_json(force=True)
+    items = body.get("items") or []
+    if not items or not all(isinstance(item, dict) and "code" in item for item in items):
+        return jsonify({"error": "items must be a non-empty list of objects with code"}), 400
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({"error": f"at most {MAX_BATCH_ITEMS} items per batch"}), 400
+    order = body.get("order", "submission")
+    if order not in ("submission", "completion"):
+        return jsonify({"error": "order must be submission or completion"}), 400
+    try:
+        workers = max(1, min(int(body.get("concurrency", BATCH_WORKERS)), BATCH_WORKERS))
+    except (TypeError, ValueError):
+        return jsonify({"error": "concurrency must be an integer"}), 400
+
+    def ndjson():
+        for result in run_batch_items(items, order, workers):
+            yield json.dumps(result) + "\n"
+
+    return Response(
+        stream_with_context(ndjson()),
+        mimetype="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/generate")
 def generate():
     """Let Gemini write the Python for a task, then run it in the sandbox."""
@@ -0,0 +1,238 @@
+"""A pool of pre-started sandboxed Python interpreters.
+
+Starting a sandbox and an interpreter (and importing numpy or pandas) is most
+of the latency of a short snippet, so the pool keeps interpreters running and
+idle, with the configured modules already imported. A request takes one,
+sends the code over stdin, streams stdout and stderr back as they are written
+and the interpreter exits afterwards. Every interpreter runs exactly one
+snippet, nothing leaks from one run into the next, and the pool starts a
+replacement in the background.
+
+The launcher is swappable. "sandbox" runs each interpreter inside
+`sandbox do`, "subprocess" runs a plain local interpreter so the service can
+be run and tested outside Cloud Run.
+"""
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+SANDBOX = "/usr/local/gcp/bin/sandbox"
+# The sandbox runs with an EMPTY PATH (env is not inherited), so "python3" is not
+# found. Invoke the interpreter by absolute path.
+PYTHON = os.path.realpath(sys.executable)
+# How often a run with a cancel event checks it, in seconds
+CANCEL_POLL = 0.2
+
+# Runs inside the interpreter: import the warm modules, then wait for one
+# snippet on stdin, preceded by a JSON header line with its size and resource
+# limits, apply the limits and execute the snippet as __main__.
+BOOTSTRAP = r"""
+import importlib, json, resource, sys, traceback
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+    except Exception:
+        pass
+header = json.loads(sys.stdin.buffer.readline())
+code = sys.stdin.buffer.read(header["size"]).decode("utf-8")
+if header.get("memory_mb"):
+    limit = header["memory_mb"] * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+if header.get("cpu_seconds"):
+    resource.setrlimit(resource.RLIMIT_CPU, (header["cpu_seconds"], header["cpu_seconds"]))
+sys.argv = ["<sandbox>"]
+returncode = 0
+try:
+    exec(compile(code, "<sandbox>", "exec"), {"__name__": "__main__", "__builtins__": __builtins__})
+except SystemExit as e:
+    returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    if not isinstance(e.code, (int, type(None))):
+        print(e.code, file=sys.stderr)
+except BaseException:
+    traceback.print_exc()
+    returncode = 1
+sys.stdout.flush()
+sys.stderr.flush()
+sys.exit(returncode)
+"""
+
+
+def default_launcher():
+    launcher = os.environ.get("SANDBOX_LAUNCHER")
+    if launcher:
+        return launcher
+    if not os.path.exists(SANDBOX):
+        # Never drop the isolation silently, running unsandboxed must be asked for
+        raise RuntimeError(f"{SANDBOX} not found, set SANDBOX_LAUNCHER=subprocess to run "
+                           "unsandboxed local interpreters outside Cloud Run")
+    return "sandbox"
+
+
+def launch_command(launcher, allow_egress, preimport):
+    interpreter = [PYTHON, "-u", "-c", BOOTSTRAP, *preimport]
+    if launcher == "subprocess":
+        return interpreter
+    cmd = [SANDBOX, "do"]
+    if allow_egress:
+        cmd.append("--allow-egress")
+    return cmd + ["--", *interpreter]
+
+
+class InterpreterPool:
+    """Keeps `size` idle interpreters per egress setting."""
+
+    def __init__(self, size=2, preimport=(), launcher=None, max_output_bytes=1_000_000, timeout=60):
+        self.size = size
+        self.preimport = list(preimport)
+        self.launcher = launcher or default_launcher()
+        self.max_output_bytes = max_output_bytes
+        self.timeout = timeout
+        self._idle = {False: queue.Queue(), True: queue.Queue()}
+        for allow_egress in (False, True):
+            for _ in range(size):
+                self._replenish(allow_egress)
+
+    def _start(self, allow_egress):
+        return subprocess.Popen(
+            launch_command(self.launcher, allow_egress, self.preimport),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            # Own process group, so a timeout kills whatever the snippet spawned too
+            start_new_session=True,
+        )
+
+    def _replenish(self, allow_egress):
+        threading.Thread(
+            target=lambda: self._idle[allow_egress].put(self._start(allow_egress)), daemon=True
+        ).start()
+
+    def _acquire(self, allow_egress):
+        idle = self._idle[allow_egress]
+        while True:
+            try:
+                proc = idle.get_nowait()
+            except queue.Empty:
+                # Pool drained, pay the cold start for this request, the
+                # replacements for taken interpreters are already on their way
+                return self._start(allow_egress)
+            self._replenish(allow_egress)
+            if proc.poll() is None:
+                return proc
+
+    def stream(self, code, allow_egress=False, timeout=None, max_output_bytes=None, memory_mb=None, cpu_seconds=None,
+               cancel=None):
+        """Runs `code` on a warm interpreter and yields (kind, value) events.
+
+        `memory_mb` and `cpu_seconds` are applied with setrlimit inside the
+        interpreter before the code runs. Setting the `cancel` threading.Event
+        from another thread kills the run within a fraction of a second.
+
+        kind is "stdout" or "stderr" with a text chunk, and finally "exit" with
+        {"returncode", "truncated", "timed_out", "cancelled", "duration_ms"}.
+        """
+        timeout = timeout or self.timeout
+        max_output_bytes = max_output_bytes or self.max_output_bytes
+        proc = self._acquire(bool(allow_egress))
+        started = time.monotonic()
+
+        events = queue.Queue()
+
+        def pump(pipe, kind):
+            for chunk in iter(lambda: pipe.read1(8192), b""):
+                events.put((kind, chunk))
+            events.put((kind, None))
+
+        readers = [
+            threading.Thread(target=pump, args=(proc.stdout, "stdout"), daemon=True),
+            threading.Thread(target=pump, args=(proc.stderr, "stderr"), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+
+        payload = code.encode("utf-8")
+        header = {"size": len(payload), "memory_mb": memory_mb, "cpu_seconds": cpu_seconds}
+        try:
+            proc.stdin.write(json.dumps(header).encode("utf-8") + b"\n" + payload)
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+
+        try:
+            output_bytes = 0
+            truncated = False
+            timed_out = False
+            cancelled = False
+            open_streams = 2
+            while open_streams:
+                remaining = timeout - (time.monotonic() - started)
+                try:
+                    # with a cancel event, wake up regularly to look at it
+                    kind, chunk = events.get(timeout=max(min(remaining, CANCEL_POLL) if cancel else remaining, 0))
+                except queue.Empty:
+                    kind, chunk = None, None
+                if cancel is not None and cancel.is_set():
+                    cancelled = True
+                    self._kill(proc)
+                    break
+                if kind is None:
+                    if time.monotonic() - started < timeout:
+                        continue
+                    timed_out = True
+                    self._kill(proc)
+                    break
+                if chunk is None:
+                    open_streams -= 1
+                    continue
+                if truncated:
+                    continue
+                if output_bytes + len(chunk) > max_output_bytes:
+                    chunk = chunk[:max_output_bytes - output_bytes]
+                    truncated = True
+                    self._kill(proc)
+                output_bytes += len(chunk)
+                if chunk:
+                    yield kind, chunk.decode("utf-8", errors="replace")
+
+            try:
+                returncode = proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._kill(proc)
+                returncode = proc.wait()
+            yield "exit", {
+                "returncode": returncode,
+                "truncated": truncated,
+                "timed_out": timed_out,
+                "cancelled": cancelled,
+                "duration_ms": round((time.monotonic() - started) * 1000, 1),
+            }
+        finally:
+            # The consumer may stop early, e.g. the client disconnected
+            if proc.poll() is None:
+                self._kill(proc)
+                try:
+                    proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    pass
+
+    def run(self, code, allow_egress=False, **kwargs):
+        """Runs `code` and returns the collected {"stdout", "stderr", "returncode", ...}."""
+        output = {"stdout": [], "stderr": []}
+        result = {}
+        for kind, value in self.stream(code, allow_egress, **kwargs):
+            if kind == "exit":
+                result = value
+            else:
+                output[kind].append(value)
+        return {"stdout": "".join(output["stdout"]), "stderr": "".join(output["stderr"]), **result}
+
+    @staticmethod
+    def _kill(proc):
+        try:
+            os.killpg(proc.pid, 9)
+        except (ProcessLookupError, PermissionError):
+            proc.kill()
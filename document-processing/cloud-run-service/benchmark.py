@@ -0,0 +1,70 @@
+"""Compares single-shot and page-parallel extraction over the sample documents.
+
+The samples are single page invoices, so besides each sample on its own the
+benchmark also runs a combined document with all samples concatenated, which
+is where splitting pays off.
+
+Usage:
+    python benchmark.py [--samples ../sample-documents] [--pages-per-chunk 1]
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import time
+
+from pypdf import PdfReader, PdfWriter
+
+# Measure real extraction latency, not result cache hits
+os.environ.setdefault("RESULT_CACHE", "none")
+
+from main import generate, generate_split
+
+
+def combine_pdfs(paths):
+    writer = PdfWriter()
+    for path in paths:
+        for page in PdfReader(path).pages:
+            writer.add_page(page)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def count_items(json_output):
+    try:
+        return len(json.loads(json_output).get("items") or [])
+    except (ValueError, AttributeError):
+        return "invalid"
+
+
+def run(name, pdf_bytes, pages_per_chunk):
+    pages = len(PdfReader(io.BytesIO(pdf_bytes)).pages)
+    for mode in ("single", "split"):
+        start_time = time.time()
+        if mode == "single":
+            json_output = generate(pdf_bytes)
+        else:
+            json_output = generate_split(pdf_bytes, pages_per_chunk=pages_per_chunk)
+        elapsed = time.time() - start_time
+        print(f"{name:<20} {pages:>5} {mode:<7} {elapsed:>9.2f}s {count_items(json_output):>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", default=os.path.join(os.path.dirname(__file__), "..", "sample-documents"))
+    parser.add_argument("--pages-per-chunk", type=int, default=1)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.samples, "*.pdf")))
+
+    print(f"{'document':<20} {'pages':>5} {'mode':<7} {'latency':>10} {'items':>7}")
+    for path in paths:
+        with open(path, "rb") as pdf_file:
+            run(os.path.basename(path), pdf_file.read(), args.pages_per_chunk)
+    run("combined", combine_pdfs(paths), args.pages_per_chunk)
+
+
+if __name__ == "__main__":
+    main()
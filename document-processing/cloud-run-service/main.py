@@ -1,11 +1,26 @@
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, request, jsonify
 import vertexai
 from vertexai.generative_models import GenerativeModel, Part, GenerationConfig
+from splitting import page_count, split_pdf, merge_results
+from result_cache import cache_key, create_result_cache
 
 app = Flask(__name__)
 
+MODEL_NAME = os.environ.get("MODEL_NAME", "gemini-2.5-flash")
+
+# Initialize the client and model once per process instead of once per request
+vertexai.init(
+    project=os.environ.get("PROJECT_ID", "sascha-playground-doit"),
+    location=os.environ.get("LOCATION", "us-central1"),
+)
+model = GenerativeModel(MODEL_NAME)
+
+# Content-addressed cache of extraction results, duplicate submissions skip the model
+result_cache = create_result_cache()
+
 prompt = """
 You are a document entity extraction specialist.
 Given a document, your task is to extract the text value of entities.
@@ -32,15 +47,19 @@ DEFAULT_RESPONSE_SCHEMA = {
     }
 }
 
-def generate(pdf_bytes, response_schema=None):
-    vertexai.init(project="sascha-playground-doit", location="us-central1")
+# Documents with more pages than this are split into page ranges in "auto" mode
+SPLIT_PAGE_THRESHOLD = int(os.environ.get("SPLIT_PAGE_THRESHOLD", 4))
+PAGES_PER_CHUNK = int(os.environ.get("PAGES_PER_CHUNK", 2))
+MAX_PARALLEL_CHUNKS = int(os.environ.get("MAX_PARALLEL_CHUNKS", 8))
+# Tries per page range before it is left out of a split result
+CHUNK_ATTEMPTS = int(os.environ.get("CHUNK_ATTEMPTS", 2))
+# Key of the page ranges ("3-4") a split result is missing, only present if any failed
+FAILED_PAGES_KEY = "_failed_pages"
 
+def generate(pdf_bytes, response_schema=None):
     # Use the provided response schema, or fall back to the default
     RESPONSE_SCHEMA = response_schema if response_schema else DEFAULT_RESPONSE_SCHEMA
 
-    # Initialize the model with the controlled JSON output configuration
-    model = GenerativeModel("gemini-2.5-flash")
-
     generation_config = GenerationConfig(
         max_output_tokens=8192,
         temperature=1,
@@ -71,6 +90,70 @@ def generate(pdf_bytes, response_schema=None):
 
     return json_response
 
+def generate_chunk(chunk, response_schema=None):
+    """Parsed extraction of one (first, last, bytes) page range, None if every attempt failed."""
+    first, last, chunk_bytes = chunk
+    for attempt in range(1, CHUNK_ATTEMPTS + 1):
+        try:
+            json_response = generate(chunk_bytes, response_schema)
+            # generate() answers "{}" when the model returned no candidates
+            if json_response == "{}":
+                raise ValueError("no candidates in the response")
+            return json.loads(json_response)
+        except Exception as error:
+            # e.g. JSON cut off at max_output_tokens, or a failed model call
+            print(f"Pages {first}-{last}, attempt {attempt} of {CHUNK_ATTEMPTS} failed: {error}")
+    return None
+
+def generate_split(pdf_bytes, response_schema=None, pages_per_chunk=PAGES_PER_CHUNK):
+    chunks = split_pdf(pdf_bytes, pages_per_chunk)
+    print(f"Extracting {len(chunks)} page ranges: {[(first, last) for first, last, _ in chunks]}")
+
+    # Chunks are extracted concurrently, map keeps the results in page order
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_CHUNKS, len(chunks))) as executor:
+        results = list(executor.map(lambda chunk: generate_chunk(chunk, response_schema), chunks))
+
+    # A page range that failed is left out and reported, the rest of the document is kept
+    merged = merge_results([result for result in results if result is not None])
+    failed = [f"{first}-{last}" for (first, last, _), result in zip(chunks, results) if result is None]
+    if failed and isinstance(merged, dict):
+        merged[FAILED_PAGES_KEY] = failed
+    return json.dumps(merged)
+
+def extract(pdf_bytes, response_schema=None, mode="auto"):
+    if mode == "auto":
+        try:
+            mode = "split" if page_count(pdf_bytes) > SPLIT_PAGE_THRESHOLD else "single"
+        except Exception as error:
+            # Encrypted or damaged PDFs pypdf cannot read may still be readable by the model
+            print(f"Could not count pages, extracting in one request: {error}")
+            mode = "single"
+
+    # Split results differ from single ones and with the chunk size, both are part of the key
+    mode_key = f"split{PAGES_PER_CHUNK}" if mode == "split" else mode
+    key = cache_key(pdf_bytes, response_schema or DEFAULT_RESPONSE_SCHEMA, MODEL_NAME, mode_key)
+    if result_cache:
+        cached = result_cache.get(key)
+        if cached is not None:
+            print(f"Result cache hit for {key}")
+            return cached
+
+    if mode == "split":
+        json_output = generate_split(pdf_bytes, response_schema)
+    else:
+        json_output = generate(pdf_bytes, response_schema)
+
+    # Only cache well-formed, non-empty, complete results so transient failures are retried
+    if result_cache and json_output != "{}":
+        try:
+            result = json.loads(json_output)
+            if not (isinstance(result, dict) and FAILED_PAGES_KEY in result):
+                result_cache.set(key, json_output)
+        except json.JSONDecodeError:
+            pass
+
+    return json_output
+
 @app.route('/process_pdf', methods=['POST'])
 def process_pdf():
     if 'file' not in request.files:
@@ -89,12 +172,21 @@ def process_pdf():
         except json.JSONDecodeError:
             return jsonify({"error": "Invalid response schema"}), 400
 
+    # Optional extraction mode: "single", "split" or "auto" (split large documents)
+    mode = request.form.get('mode', 'auto')
+    if mode not in ('auto', 'single', 'split'):
+        return jsonify({"error": "Invalid mode"}), 400
+
     if file and file.filename.endswith('.pdf'):
         pdf_bytes = file.read()  # Read the file content into memory
-        json_output = generate(pdf_bytes, response_schema)
+        json_output = extract(pdf_bytes, response_schema, mode)
         return jsonify(json.loads(json_output)), 200
 
     return jsonify({"error": "Invalid file type"}), 400
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({"result_cache": result_cache.metrics() if result_cache else None}), 200
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 8080)))
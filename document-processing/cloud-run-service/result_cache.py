@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import threading
+
+
+def cache_key(pdf_bytes, response_schema, model_name, mode):
+    """Content address for an extraction: (PDF hash, schema hash, model, extraction mode)."""
+    pdf_hash = hashlib.sha256(pdf_bytes).hexdigest()
+    schema_hash = hashlib.sha256(
+        json.dumps(response_schema, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+    return f"{model_name}:{mode}:{schema_hash[:16]}:{pdf_hash}"
+
+
+class DiskBackend:
+    """Stores one JSON file per key below a local directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, value):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+
+
+class RedisBackend:
+    """Works with any client exposing the Redis get/set API (Redis, Memorystore, Valkey)."""
+
+    def __init__(self, client, ttl_seconds=None, prefix="process_pdf:"):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        return value
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.ttl_seconds)
+
+
+class ResultCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key):
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            # A broken cache must never fail the request, treat it as a miss
+            print(f"Result cache read failed: {e}")
+            value = None
+            with self._lock:
+                self.errors += 1
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            print(f"Result cache write failed: {e}")
+            with self._lock:
+                self.errors += 1
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def create_result_cache():
+    """Builds the cache from the environment.
+
+    RESULT_CACHE=disk (default) uses RESULT_CACHE_DIR, RESULT_CACHE=redis uses
+    REDIS_URL and RESULT_CACHE_TTL, RESULT_CACHE=none disables caching.
+    """
+    kind = os.environ.get("RESULT_CACHE", "disk")
+    if kind == "none":
+        return None
+    if kind == "redis":
+        import redis
+
+        client = redis.Redis.from_url(os.environ.get("REDIS_URL", "redis://localhost:6379/0"))
+        ttl = os.environ.get("RESULT_CACHE_TTL")
+        return ResultCache(RedisBackend(client, ttl_seconds=int(ttl) if ttl else None))
+    return ResultCache(DiskBackend(os.environ.get("RESULT_CACHE_DIR", "/tmp/process_pdf_cache")))
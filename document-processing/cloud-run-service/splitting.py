@@ -0,0 +1,57 @@
+import io
+
+from pypdf import PdfReader, PdfWriter
+
+
+def page_count(pdf_bytes):
+    return len(PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+
+def split_pdf(pdf_bytes, pages_per_chunk):
+    """Splits a PDF into consecutive page ranges.
+
+    Returns a list of (first_page, last_page, chunk_bytes) tuples with 1-based,
+    inclusive page numbers, in document order.
+    """
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    total_pages = len(reader.pages)
+    chunks = []
+    for start in range(0, total_pages, pages_per_chunk):
+        end = min(start + pages_per_chunk, total_pages)
+        writer = PdfWriter()
+        for page_index in range(start, end):
+            writer.add_page(reader.pages[page_index])
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        chunks.append((start + 1, end, buffer.getvalue()))
+    return chunks
+
+
+def merge_results(results):
+    """Merges per-chunk extraction results given in document order.
+
+    Arrays are concatenated in chunk order, nested objects are merged key by
+    key and for scalar values the first non-null value wins, so the header
+    fields of an invoice come from the first page that contains them.
+    """
+    merged = None
+    for result in results:
+        merged = _merge_value(merged, result)
+    return merged if merged is not None else {}
+
+
+def _merge_value(current, new):
+    if current is None:
+        return new
+    if new is None:
+        return current
+    if isinstance(current, list) and isinstance(new, list):
+        return current + new
+    if isinstance(current, dict) and isinstance(new, dict):
+        merged = dict(current)
+        for key, value in new.items():
+            merged[key] = _merge_value(merged.get(key), value)
+        return merged
+    if current == "":
+        return new
+    return current
@@ -4,6 +4,7 @@ client.interactions lives in google-genai 2.x, which requires Python 3.10 or new
 Install with: pip install "google-genai>=2.3.0"
 """
 import os
+import random
 import time
 from google import genai
 
@@ -23,15 +24,31 @@ def get(interaction_id):
     return client.interactions.get(interaction_id)
 
 
+async def aget(interaction_id):
+    # async client, lets poller.py watch many interactions from one event loop
+    return await client.aio.interactions.get(interaction_id)
+
+
+def backoff(delay, base=2, factor=1.6, max_delay=30):
+    """Next poll delay, exponential with full jitter so many pollers do not sync up."""
+    delay = min(max(delay, base) * factor, max_delay)
+    return delay, random.uniform(base / 2, delay)
+
+
 def poll(interaction_id, every=2, cap=180):
-    """Poll a background interaction by id until it stops running."""
-    waited = 0
-    while waited < cap:
+    """Poll a background interaction by id until it stops running.
+
+    Starts at `every` seconds between polls and backs off exponentially with
+    jitter, a long task costs a handful of calls instead of one every 2 s.
+    """
+    started = time.monotonic()
+    delay = every
+    while time.monotonic() - started < cap:
         rec = get(interaction_id)
         if rec.status != "in_progress":
             return rec
-        time.sleep(every)
-        waited += every
+        delay, sleep = backoff(delay, base=every)
+        time.sleep(min(sleep, max(cap - (time.monotonic() - started), 0)))
     raise TimeoutError(f"still in_progress after {cap}s")
 
 
@@ -44,19 +61,26 @@ def _text(v):
     return "".join(getattr(c, "text", "") for c in v)
 
 
-def show_steps(rec):
-    for s in rec.steps:
-        t = s.type
-        if t == "function_call":
-            args = getattr(s, "arguments", None) or {}
-            action = args.get("toolAction", "") if isinstance(args, dict) else ""
-            print(f"  call   {getattr(s, 'name', None) or 'tool'}  {action}")
-        elif t == "code_execution_call":
-            code = getattr(getattr(s, "arguments", None), "code", "") or ""
-            print(f"  code   {' '.join(code.split())[:80]}")
-        elif t in ("function_result", "code_execution_result"):
-            out = _text(getattr(s, "result", None)).strip()
-            if out:
-                print(f"  result {out[:80]}")
-        elif t == "model_output":
-            print(f"  say    {_text(getattr(s, 'content', None)).strip()[:200]}")
+def show_steps(rec, start=0, prefix=""):
+    """Print the steps of a record from index `start` on, returns how many steps it has."""
+    steps = rec.steps or []
+    for s in steps[start:]:
+        show_step(s, prefix)
+    return len(steps)
+
+
+def show_step(s, prefix=""):
+    t = s.type
+    if t == "function_call":
+        args = getattr(s, "arguments", None) or {}
+        action = args.get("toolAction", "") if isinstance(args, dict) else ""
+        print(f"{prefix}  call   {getattr(s, 'name', None) or 'tool'}  {action}")
+    elif t == "code_execution_call":
+        code = getattr(getattr(s, "arguments", None), "code", "") or ""
+        print(f"{prefix}  code   {' '.join(code.split())[:80]}")
+    elif t in ("function_result", "code_execution_result"):
+        out = _text(getattr(s, "result", None)).strip()
+        if out:
+            print(f"{prefix}  result {out[:80]}")
+    elif t == "model_output":
+        print(f"{prefix}  say    {_text(getattr(s, 'content', None)).strip()[:200]}")
@@ -1,11 +1,14 @@
 """Beat 1, fire and forget. Kick off a real task, get an id back instantly."""
 import agent
+import poller
 
 rec = agent.create(
     input="Create a folder stream-tools/ and write chapters.py inside that turns "
           "a list of video timestamps into YouTube chapter markers.",
     background=True,
 )
+# Persist the id the moment we have it, reconnect.py resumes from the registry
+poller.register(rec.id, label="chapters.py")
 print("id:    ", rec.id)
 print("status:", rec.status)   # in_progress, it did not wait for the work
 print()
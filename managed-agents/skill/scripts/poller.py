@@ -0,0 +1,172 @@
+"""Watch many background interactions at once, from one asyncio event loop.
+
+Polling one interaction at a time with a fixed sleep wastes time and quota
+once dozens of background tasks are in flight. This poller tracks all of them
+concurrently, each with its own exponential backoff with jitter (reset when
+new steps show up), and prints only the steps it has not shown yet.
+
+In-flight ids are persisted to a local registry file (MANAGED_AGENTS_REGISTRY,
+default inflight.json next to this script) the moment they are tracked, with
+how many steps were already shown. A fresh process resumes them all, the same
+way reconnect.py does for one id, and does not print steps twice. Finished
+interactions are removed from the registry, and so are ids the API rejects
+for good (unknown or expired, HTTP 400, 404 or 410). Every change re-reads the file and
+writes it back under a lock file (flock, where the OS has it), so ids that
+another process registers while a poller runs are kept.
+
+Usage:
+    python poller.py                  # resume everything in the registry
+    python poller.py <id> [<id> ...]  # track these ids too
+"""
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+
+import agent
+
+try:
+    import fcntl
+except ImportError:  # Windows, changes are not serialized between processes
+    fcntl = None
+
+REGISTRY_PATH = os.environ.get(
+    "MANAGED_AGENTS_REGISTRY", os.path.join(os.path.dirname(os.path.abspath(__file__)), "inflight.json")
+)
+# At most this many get calls in flight at the same time
+MAX_CONCURRENT_GETS = 8
+# HTTP codes of get errors that will never pass, unknown or expired ids leave the registry
+TERMINAL_CODES = (400, 404, 410)
+
+
+class Registry:
+    """In-flight interaction ids persisted as JSON, {id: {"label", "created", "steps_seen"}}."""
+
+    def __init__(self, path=REGISTRY_PATH):
+        self.path = path
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Latest entries from disk under the lock, saved back when the block exits."""
+        with open(f"{self.path}.lock", "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = self._load()
+            yield entries
+            self._save(entries)
+            self.entries = entries
+
+    def add(self, interaction_id, label=""):
+        with self._locked() as entries:
+            entries.setdefault(interaction_id, {"label": label, "created": time.time(), "steps_seen": 0})
+
+    def update(self, interaction_id, steps_seen):
+        with self._locked() as entries:
+            if interaction_id in entries:
+                entries[interaction_id]["steps_seen"] = steps_seen
+
+    def remove(self, interaction_id):
+        with self._locked() as entries:
+            entries.pop(interaction_id, None)
+
+    def _save(self, entries):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def register(interaction_id, label=""):
+    """Persist an id right after create, so no background interaction is ever lost."""
+    Registry().add(interaction_id, label)
+
+
+class Poller:
+    """Polls every tracked interaction concurrently until it stops running."""
+
+    def __init__(self, registry=None, base=2, max_delay=30, cap=None, on_step=None, on_done=None):
+        self.registry = registry or Registry()
+        self.base = base
+        self.max_delay = max_delay
+        self.cap = cap
+        self.on_step = on_step or self._print_step
+        self.on_done = on_done or self._print_done
+        self.results = {}
+
+    def track(self, interaction_id, label=""):
+        self.registry.add(interaction_id, label)
+
+    def _print_step(self, interaction_id, step):
+        agent.show_step(step, prefix=f"[{interaction_id[:12]}]")
+
+    def _print_done(self, interaction_id, rec):
+        print(f"[{interaction_id[:12]}] {rec.status}")
+
+    async def _watch(self, interaction_id, gets):
+        # another process may have finished and removed it since run() started
+        seen = self.registry.entries.get(interaction_id, {}).get("steps_seen", 0)
+        started = time.monotonic()
+        delay = self.base
+        while True:
+            async with gets:
+                rec = await agent.aget(interaction_id)
+            steps = rec.steps or []
+            for step in steps[seen:]:
+                self.on_step(interaction_id, step)
+            if len(steps) > seen:
+                # Progress, come back soon
+                seen = len(steps)
+                self.registry.update(interaction_id, seen)
+                delay = self.base
+            if rec.status != "in_progress":
+                self.registry.remove(interaction_id)
+                self.results[interaction_id] = rec
+                self.on_done(interaction_id, rec)
+                return rec
+            if self.cap is not None and time.monotonic() - started > self.cap:
+                raise TimeoutError(f"{interaction_id} still in_progress after {self.cap}s")
+            delay, sleep = agent.backoff(delay, base=self.base, max_delay=self.max_delay)
+            await asyncio.sleep(sleep)
+
+    async def run(self, ids=None):
+        """Polls `ids`, default all registry entries, until each finishes, returns {id: record}."""
+        gets = asyncio.Semaphore(MAX_CONCURRENT_GETS)
+        ids = list(self.registry.entries) if ids is None else list(ids)
+        outcomes = await asyncio.gather(*(self._watch(i, gets) for i in ids), return_exceptions=True)
+        for interaction_id, outcome in zip(ids, outcomes):
+            if not isinstance(outcome, Exception):
+                continue
+            # google-genai API errors carry the HTTP status as .code
+            if getattr(outcome, "code", None) in TERMINAL_CODES:
+                self.registry.remove(interaction_id)
+                print(f"[{interaction_id[:12]}] error: {outcome}, removed from the registry")
+            else:
+                # Stays in the registry, the next run picks it up again
+                print(f"[{interaction_id[:12]}] error: {outcome}")
+        return self.results
+
+
+def main():
+    poller = Poller()
+    for interaction_id in sys.argv[1:]:
+        poller.track(interaction_id)
+    if not poller.registry.entries:
+        print(f"nothing in flight, {poller.registry.path} is empty")
+        return
+    print(f"watching {len(poller.registry.entries)} interactions ...")
+    results = asyncio.run(poller.run())
+    print(f"{len(results)} finished, {len(poller.registry.entries)} still in flight")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,23 @@
 """Beat 2, reconnect. Fresh process, only the id. Poll until done, show the work.
 
-Usage, pass the id printed by background_run.py:
-    python reconnect.py <interaction_id>
+Usage, pass the id printed by background_run.py to follow that interaction
+only, or no id to resume every interaction background_run.py registered:
+    python reconnect.py <interaction_id> [<interaction_id> ...]
+    python reconnect.py
 """
+import asyncio
 import sys
-import agent
 
-interaction_id = sys.argv[1]
-print(f"reconnecting to {interaction_id} ...")
-rec = agent.poll(interaction_id)
-print("status:", rec.status)
-print("steps the agent ran while we were disconnected:")
-agent.show_steps(rec)
+import poller
+
+watcher = poller.Poller()
+for interaction_id in sys.argv[1:]:
+    watcher.track(interaction_id)
+# ids on the command line are followed alone, the rest of the registry waits for its own run
+targets = sys.argv[1:] or list(watcher.registry.entries)
+ids = ", ".join(targets) or "nothing, the registry is empty"
+print(f"reconnecting to {ids} ...")
+print("steps the agent runs, new ones as they appear:")
+results = asyncio.run(watcher.run(targets))
+for interaction_id, rec in results.items():
+    print(f"{interaction_id} status: {rec.status}")
@@ -3,26 +3,94 @@
 
 Build a prompt the way you build code: resolve includes, inject variables,
 validate the wiring, and fail the build before anything reaches the model.
+
+One entry per call, or a whole prompt repo with --build:
+
+  transpile.py agents/stream_ops_agent.prompt.md --root . --set city=Berlin --out build/x.md
+  transpile.py --build prompts.build.json [--force] [--check]
+
+The build file lists targets, an entry plus variables, optionally a matrix of
+variable values that renders one golden file per combination,
+
+  {"root": ".", "out_dir": "build", "targets": [
+    {"entry": "agents/stream_ops_agent.prompt.md",
+     "out": "stream_ops_agent.{environment}.golden.md",
+     "vars": {"city": "Berlin"},
+     "matrix": {"environment": ["production", "dev"]}}]}
+
+A build is incremental. A manifest next to the build file keeps every
+fragment's content hash and includes, plus the inputs each golden file was
+rendered from. Only fragments whose size or mtime changed are re-read, and
+only targets whose entry, transitive includes or variables changed are
+rendered again, through one Jinja environment with a bytecode cache.
+
+--watch keeps that state in memory. Every --interval it stats the tree,
+re-reads only edited fragments, patches the include graph and its reverse
+edges, and re-renders just the golden files whose entry includes an edited
+fragment, printing the render time of each. Edits to the build file reload
+the targets. Mid-edit states, a half-saved build file, a fragment that fails
+to render or vanishes between the scan and its stat, are reported and the
+watch goes on. Only *.prompt.md files are watched, an include outside that
+pattern is hashed into its golden files' inputs by input_key, so --build
+notices the change, but editing it does not trigger a re-render in --watch.
+
+  transpile.py --build prompts.build.json --watch
+  transpile.py agents/stream_ops_agent.prompt.md --set city=Berlin --out build/x.md --watch
 """
 import argparse
+import hashlib
+import itertools
+import json
+import os
 import re
 import sys
+import time
 from pathlib import Path
 
-from jinja2 import Environment, FileSystemLoader, StrictUndefined
-from jinja2.exceptions import TemplateNotFound, UndefinedError
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined
+from jinja2.exceptions import TemplateError, TemplateNotFound, TemplateSyntaxError, UndefinedError
 
-INCLUDE_RE = re.compile(r'{%-?\s*include\s+["\']([^"\']+)["\']')
+# include, import, from ... import and extends all pull in another template
+INCLUDE_RE = re.compile(r'{%-?\s*(?:include|import|from|extends)\s+["\']([^"\']+)["\']')
+FRAGMENT_SUFFIX = ".prompt.md"
+# Bump when rendering changes in a way old golden files must not survive
+MANIFEST_VERSION = 1
+STATE_DIR = ".transpile"
 
 
-def build_include_graph(root: Path):
-    """Map every fragment to the fragments it includes (static parse, pre-render)."""
-    graph = {}
-    for path in root.rglob("*.prompt.md"):
+def _hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def scan_fragment(path: Path, previous=None):
+    """Hash and includes of one fragment, reused from previous while size and mtime match."""
+    st = path.stat()
+    if previous and previous.get("mtime_ns") == st.st_mtime_ns and previous.get("size") == st.st_size:
+        return previous
+    data = path.read_bytes()
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": _hash(data),
+            "includes": INCLUDE_RE.findall(data.decode(errors="replace"))}
+
+
+def scan_fragments(root: Path, previous=None):
+    """Every fragment under root, {rel: {"sha256", "includes", ...}}, only changed files are read."""
+    previous = previous or {}
+    fragments = {}
+    for path in root.rglob("*" + FRAGMENT_SUFFIX):
         rel = str(path.relative_to(root))
-        text = path.read_text()
-        graph[rel] = INCLUDE_RE.findall(text)
-    return graph
+        try:
+            fragments[rel] = scan_fragment(path, previous.get(rel))
+        except FileNotFoundError:
+            # deleted between the directory walk and the stat, it counts as removed
+            continue
+    return fragments
+
+
+def build_include_graph(root: Path, fragments=None):
+    """Map every fragment to the fragments it includes (static parse, pre-render)."""
+    if fragments is None:
+        fragments = scan_fragments(root)
+    return {rel: rec["includes"] for rel, rec in fragments.items()}
 
 
 def find_cycle(graph, start):
@@ -47,21 +115,33 @@ def find_cycle(graph, start):
     return walk(start)
 
 
-def transpile(root: Path, entry: str, context: dict) -> str:
-    graph = build_include_graph(root)
+def dependencies(graph, entry):
+    """The entry and everything it includes, transitively."""
+    deps, todo = set(), [entry]
+    while todo:
+        node = todo.pop()
+        if node not in deps:
+            deps.add(node)
+            todo.extend(graph.get(node, []))
+    return deps
 
-    # Build-time check 1: circular imports, caught before render.
-    cycle = find_cycle(graph, entry)
-    if cycle:
-        raise SystemExit("BUILD FAILED: circular import -> " + " -> ".join(cycle))
 
-    env = Environment(
+def make_env(root: Path, bytecode_dir=None) -> Environment:
+    return Environment(
         loader=FileSystemLoader(str(root)),
         undefined=StrictUndefined,       # Build-time check 2: missing variables raise, not silently blank
         trim_blocks=True,
         lstrip_blocks=True,
         keep_trailing_newline=True,
+        bytecode_cache=FileSystemBytecodeCache(str(bytecode_dir)) if bytecode_dir else None,
     )
+
+
+def render(env: Environment, graph, entry: str, context: dict) -> str:
+    # Build-time check 1: circular imports, caught before render.
+    cycle = find_cycle(graph, entry)
+    if cycle:
+        raise SystemExit("BUILD FAILED: circular import -> " + " -> ".join(cycle))
     try:
         tmpl = env.get_template(entry)
         return tmpl.render(**context)
@@ -69,24 +149,270 @@ def transpile(root: Path, entry: str, context: dict) -> str:
         raise SystemExit(f"BUILD FAILED: missing include -> {e}")
     except UndefinedError as e:
         raise SystemExit(f"BUILD FAILED: undefined variable -> {e}")
+    except TemplateSyntaxError as e:
+        raise SystemExit(f"BUILD FAILED: syntax error -> {e.filename}:{e.lineno} {e.message}")
+    except TemplateError as e:
+        raise SystemExit(f"BUILD FAILED: template error -> {e}")
+
+
+def transpile(root: Path, entry: str, context: dict) -> str:
+    return render(make_env(root), build_include_graph(root), entry, context)
+
+
+def expand_targets(spec):
+    """One (entry, context, out) per target and combination of its matrix values."""
+    out_dir = spec.get("out_dir", "build")
+    for target in spec["targets"]:
+        matrix = target.get("matrix", {})
+        keys = sorted(matrix)
+        for values in itertools.product(*(matrix[k] for k in keys)):
+            context = {**target.get("vars", {}), **dict(zip(keys, values))}
+            out = target.get("out") or Path(target["entry"]).name.replace(FRAGMENT_SUFFIX, ".golden.md")
+            yield target["entry"], context, os.path.join(out_dir, out.format(**context))
+
+
+def input_key(root: Path, fragments, graph, entry, context):
+    """Hash of everything a golden file depends on, its transitive fragments and variables."""
+    deps = []
+    for rel in sorted(dependencies(graph, entry)):
+        if rel in fragments:
+            deps.append((rel, fragments[rel]["sha256"]))
+        else:
+            # an include outside the *.prompt.md scan, or a missing one
+            path = root / rel
+            deps.append((rel, _hash(path.read_bytes()) if path.is_file() else None))
+    payload = json.dumps([MANIFEST_VERSION, entry, context, deps], sort_keys=True, default=str)
+    return _hash(payload.encode())
+
+
+def load_manifest(path: Path):
+    try:
+        manifest = json.loads(path.read_text())
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "fragments": {}, "outputs": {}}
+
+
+def save_manifest(path: Path, manifest):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def reverse_graph(graph):
+    """Fragment -> the fragments that include it."""
+    dependents = {}
+    for rel, includes in graph.items():
+        for dep in includes:
+            dependents.setdefault(dep, set()).add(rel)
+    return dependents
+
+
+class Builder:
+    """A build file's fragments, include graph, manifest and Jinja environment, held in memory."""
+
+    def __init__(self, spec, base: Path):
+        self.base = base
+        self.root = base / spec.get("root", ".")
+        self.state = base / STATE_DIR
+        self.manifest_path = self.state / "manifest.json"
+        self.manifest = load_manifest(self.manifest_path)
+        (self.state / "bytecode").mkdir(parents=True, exist_ok=True)
+        self.env = make_env(self.root, self.state / "bytecode")
+        self.fragments = scan_fragments(self.root, self.manifest["fragments"])
+        self.graph = build_include_graph(self.root, self.fragments)
+        self.dependents = reverse_graph(self.graph)
+        self.load(spec)
+
+    @classmethod
+    def from_file(cls, config: Path):
+        return cls(json.loads(config.read_text()), config.parent)
+
+    def load(self, spec):
+        self.targets = list(expand_targets(spec))
+
+    def render_target(self, entry, context, out, force=False, check=False):
+        """Renders one golden file if its inputs changed, returns the status."""
+        out_path = self.base / out
+        key = input_key(self.root, self.fragments, self.graph, entry, context)
+        outputs = self.manifest["outputs"]
+        previous = outputs.get(out, {})
+        current = out_path.read_bytes() if out_path.exists() else None
+        if (not force and previous.get("input") == key and current is not None
+                and previous.get("sha256") == _hash(current)):
+            return "fresh"
+        # failed targets drop out of the manifest, they render again next time
+        outputs.pop(out, None)
+        try:
+            rendered = render(self.env, self.graph, entry, context)
+        except SystemExit as e:
+            print(f"FAILED   {out}: {e}")
+            return "failed"
+        except Exception as e:
+            # errors raised by the template's own expressions, e.g. {{ city + 1 }} -> TypeError,
+            # fail this target only, the others still render and the manifest is saved
+            print(f"FAILED   {out}: BUILD FAILED: {type(e).__name__} -> {e}")
+            return "failed"
+        data = rendered.encode()
+        if check:
+            if current != data:
+                print(f"DRIFT    {out} does not match a fresh build of {entry}")
+                return "failed"
+        elif current != data:
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            out_path.write_bytes(data)
+        outputs[out] = {"entry": entry, "context": context, "input": key, "sha256": _hash(data)}
+        return "checked" if check else "rendered"
+
+    def build(self, force=False, check=False):
+        """Renders every target that is out of date, returns the number of failures."""
+        t0 = time.time()
+        counts = {"rendered": 0, "checked": 0, "fresh": 0, "failed": 0}
+        for entry, context, out in self.targets:
+            status = self.render_target(entry, context, out, force, check)
+            counts[status] += 1
+            if status in ("rendered", "checked"):
+                print(f"{status:<8} {out}")
+        wanted = {out for _, _, out in self.targets}
+        self.manifest["outputs"] = {k: v for k, v in self.manifest["outputs"].items() if k in wanted}
+        self.save()
+        done = "checked" if check else "rendered"
+        print(f"{counts[done]} {done}, {counts['fresh']} up to date, {counts['failed']} failed, "
+              f"{len(self.fragments)} fragments, {time.time() - t0:.2f}s")
+        return counts["failed"]
+
+    def save(self):
+        self.manifest["fragments"] = self.fragments
+        save_manifest(self.manifest_path, self.manifest)
+
+    def rescan(self):
+        """Re-stats the tree, re-reads only changed files, patches the graph, returns the changed fragments."""
+        old = self.fragments
+        self.fragments = scan_fragments(self.root, old)
+        changed = {rel for rel, rec in self.fragments.items()
+                   if rel not in old or old[rel]["sha256"] != rec["sha256"]} | (old.keys() - self.fragments.keys())
+        for rel in changed:
+            for dep in self.graph.pop(rel, []):
+                self.dependents.get(dep, set()).discard(rel)
+            if rel in self.fragments:
+                self.graph[rel] = self.fragments[rel]["includes"]
+                for dep in self.graph[rel]:
+                    self.dependents.setdefault(dep, set()).add(rel)
+        return changed
+
+    def affected(self, changed):
+        """The changed fragments and every fragment that includes one of them, transitively."""
+        seen, todo = set(), list(changed)
+        while todo:
+            rel = todo.pop()
+            if rel not in seen:
+                seen.add(rel)
+                todo.extend(self.dependents.get(rel, ()))
+        return seen
+
+    def watch(self, interval=0.5, config: Path = None):
+        """Re-renders the golden files downstream of every fragment edit, until Ctrl-C."""
+        self.build()
+        print(f"watching {self.root}, {len(self.fragments)} fragments, {len(self.targets)} targets, Ctrl-C to stop")
+        config_mtime = config.stat().st_mtime_ns if config else None
+        try:
+            while True:
+                time.sleep(interval)
+                try:
+                    if config and config.stat().st_mtime_ns != config_mtime:
+                        config_mtime = config.stat().st_mtime_ns
+                        print(f"{config} changed, reloading targets")
+                        try:
+                            self.load(json.loads(config.read_text()))
+                        except (ValueError, KeyError, TypeError) as e:
+                            # e.g. a half-saved file, the next save is picked up again
+                            print(f"FAILED   {config}: {type(e).__name__} -> {e}, keeping the previous targets")
+                            continue
+                        self.rescan()
+                        self.build()
+                        continue
+                    changed = self.rescan()
+                    if changed:
+                        self.rebuild(changed)
+                except OSError as e:
+                    # a file moved or deleted mid-save, the next interval sees the settled tree
+                    print(f"watch: {e}")
+        except KeyboardInterrupt:
+            self.save()
+
+    def rebuild(self, changed):
+        t0 = time.time()
+        affected = self.affected(changed)
+        by_entry = {}
+        for entry, context, out in self.targets:
+            if entry in affected:
+                by_entry.setdefault(entry, []).append((context, out))
+        print(f"changed {', '.join(sorted(changed))} -> {len(by_entry)} entries downstream")
+        for entry, targets in by_entry.items():
+            # a new cycle has to pass through an edited fragment, so only these subgraphs are walked
+            cycle = find_cycle(self.graph, entry)
+            if cycle:
+                print(f"FAILED   {entry}: BUILD FAILED: circular import -> " + " -> ".join(cycle))
+                for _, out in targets:
+                    self.manifest["outputs"].pop(out, None)
+                continue
+            for context, out in targets:
+                t1 = time.time()
+                status = self.render_target(entry, context, out)
+                if status != "failed":
+                    print(f"{status:<8} {out} {(time.time() - t1) * 1000:.1f} ms")
+        self.save()
+        print(f"done in {(time.time() - t0) * 1000:.1f} ms")
+
+
+def build(config: Path, force=False, check=False):
+    """Renders every target of a build file that is out of date, returns the number of failures."""
+    return Builder.from_file(config).build(force=force, check=check)
+
+
+def parse_sets(pairs):
+    context = {}
+    for pair in pairs:
+        k, _, v = pair.partition("=")
+        if v in ("true", "false"):
+            v = (v == "true")
+        context[k] = v
+    return context
 
 
 def main():
     ap = argparse.ArgumentParser(description="Transpile prompt fragments into a golden file.")
-    ap.add_argument("entry", help="entry template, relative to --root, e.g. agents/stream_ops_agent.prompt.md")
+    ap.add_argument("entry", nargs="?", help="entry template, relative to --root, e.g. agents/stream_ops_agent.prompt.md")
     ap.add_argument("--root", default=".", help="fragment source root")
     ap.add_argument("--set", action="append", default=[], metavar="k=v", help="template variable, repeatable")
     ap.add_argument("--out", help="write golden file here instead of stdout")
+    ap.add_argument("--build", metavar="BUILD_JSON", help="render every target of a build file, incrementally")
+    ap.add_argument("--force", action="store_true", help="with --build, render every target again")
+    ap.add_argument("--check", action="store_true", help="with --build, compare instead of writing, fail on drift")
+    ap.add_argument("--watch", action="store_true", help="keep running, re-render what an edit affects")
+    ap.add_argument("--interval", type=float, default=0.5, help="seconds between checks for edits in --watch")
     args = ap.parse_args()
 
-    context = {}
-    for pair in args.set:
-        k, _, v = pair.partition("=")
-        if v in ("true", "false"):
-            v = (v == "true")
-        context[k] = v
+    if args.watch:
+        if args.build:
+            Builder.from_file(Path(args.build)).watch(args.interval, Path(args.build))
+        elif args.entry and args.out:
+            # a build of one target, rooted at the current directory
+            spec = {"root": args.root, "out_dir": "",
+                    "targets": [{"entry": args.entry, "vars": parse_sets(args.set), "out": args.out}]}
+            Builder(spec, Path(".")).watch(args.interval)
+        else:
+            ap.error("--watch needs --build, or an entry with --out")
+        return
+    if args.build:
+        sys.exit(1 if build(Path(args.build), force=args.force, check=args.check) else 0)
+    if not args.entry:
+        ap.error("give an entry template or --build")
 
-    rendered = transpile(Path(args.root), args.entry, context)
+    rendered = transpile(Path(args.root), args.entry, parse_sets(args.set))
     if args.out:
         Path(args.out).write_text(rendered)
         print(f"wrote {args.out}")
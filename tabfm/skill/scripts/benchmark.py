@@ -7,93 +7,42 @@ prints accuracy, time, and notes side by side.
   ./benchmark.py data.csv --target label
   ./benchmark.py data.csv --target label --models tabfm,xgboost
   ./benchmark.py data.csv --target label --max-context 500 --test-size 0.2
+  ./benchmark.py data.csv --target label --seeds 1,2,3
+  ./benchmark.py big.csv --target label --context knn --max-context 500
+  ./benchmark.py data.csv --target label --repeats 10 --out results.json
+  ./benchmark.py data.csv --target label --repeats 3 --cv 5 --memory-gb 32
 
 Guardrails built in, classification only, at most 10 classes (TabFM's hard
 cap, checked before the 6.6 GB model loads), a warning above 500 features,
 and context capping with dedup plus stratified sampling for the zero-shot
 models (every context row costs TabFM memory and time, 1,000 rows measured
-at ~13 minutes on CPU).
+at ~13 minutes on CPU). With --context knn the zero-shot models instead get
+a local context per batch of test rows, the nearest training rows, so large
+tables are scored in bounded memory and time (context.py). Test rows are
+predicted in chunks sized from --predict-memory-mb (predict.py), the table
+shows predict rows/sec and the worker's peak RSS.
 
 Each model runs in its own subprocess, XGBoost and PyTorch bundle
 conflicting OpenMP runtimes on macOS and crash or deadlock in one process.
+The CSV is encoded once into memory-mapped .npy files (dataset.py) and each
+model's process stays up for all seeds (model_worker.py), so the TabFM
+checkpoint loads once per benchmark, not once per run.
+
+--repeats N (N seeds) and --cv K (K stratified folds per seed) turn one draw
+into many (model, seed, fold) jobs. They run on pools of worker processes
+sized from --memory-gb and --threads, models that do not fit the memory
+budget together run one after another (schedule.py). The summary reports
+mean accuracy and fit/predict time with 95% bootstrap confidence intervals,
+plus each model's paired accuracy difference to the first. --out writes every
+run, the summary and the package versions as JSON, to compare across versions.
 """
-import argparse, json, os, subprocess, sys, time
+import argparse, json, os, sys, tempfile
 os.environ.setdefault("HF_HUB_DISABLE_XET", "1")
 
-CHILD = r'''
-import json, os, sys, time
-os.environ.setdefault("HF_HUB_DISABLE_XET", "1")
-import numpy as np
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
-
-cfg = json.loads(sys.argv[1])
-df = pd.read_csv(cfg["csv"])
-y_raw = df[cfg["target"]]
-X = df.drop(columns=[cfg["target"]])
-
-# uniform, deterministic encoding so every model sees identical data
-classes = sorted(y_raw.astype(str).unique())
-y = y_raw.astype(str).map({c: i for i, c in enumerate(classes)}).to_numpy()
-for col in X.columns:
-    if not pd.api.types.is_numeric_dtype(X[col]):
-        X[col] = X[col].astype("category").cat.codes
-X = X.to_numpy(dtype="float32")
-
-X_tr, X_te, y_tr, y_te = train_test_split(
-    X, y, test_size=cfg["test_size"], random_state=cfg["seed"], stratify=y)
-
-def cap_context(Xa, ya, k, seed):
-    if len(ya) <= k:
-        return Xa, ya, False
-    rng = np.random.default_rng(seed)
-    seen, keep = set(), []
-    for i in rng.permutation(len(ya)):
-        b = Xa[i].tobytes()
-        if b not in seen:
-            seen.add(b); keep.append(i)
-        if len(keep) >= 3 * k:
-            break
-    keep = np.array(keep)
-    out = []
-    n_cls = len(np.unique(ya[keep]))
-    for c in np.unique(ya[keep]):
-        ci = keep[ya[keep] == c]
-        out.append(ci[: max(1, k // n_cls)])
-    idx = np.concatenate(out)[:k]
-    return Xa[idx], ya[idx], True
-
-name = cfg["model"]
-t0 = time.time()
-capped = False
-if name == "xgboost":
-    from xgboost import XGBClassifier
-    m = XGBClassifier(verbosity=0, tree_method="hist")
-    m.fit(X_tr, y_tr); preds = m.predict(X_te); ctx = len(y_tr)
-elif name == "tabicl":
-    from tabicl import TabICLClassifier
-    Xc, yc, capped = cap_context(X_tr, y_tr, cfg["max_context"], cfg["seed"])
-    m = TabICLClassifier()
-    m.fit(Xc, yc); preds = m.predict(X_te); ctx = len(yc)
-elif name == "tabfm":
-    import torch
-    from tabfm.src.pytorch import tabfm_v1_0_0
-    from tabfm import TabFMClassifier
-    Xc, yc, capped = cap_context(X_tr, y_tr, cfg["max_context"], cfg["seed"])
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    model = tabfm_v1_0_0.load(**({} if device == "cuda" else {"dtype": torch.float32}))
-    m = TabFMClassifier(model=model)
-    m.fit(Xc, yc); preds = m.predict(X_te); ctx = len(yc)
-
-if getattr(preds, "dtype", None) == object:
-    preds = preds.astype(int)
-print(json.dumps({
-    "model": name, "acc": float(accuracy_score(y_te, preds)),
-    "seconds": round(time.time() - t0, 1), "context_rows": int(ctx),
-    "context_capped": bool(capped),
-}))
-'''
+import context
+import dataset
+import schedule
+from model_worker import MODELS
 
 def main():
     ap = argparse.ArgumentParser(description="TabFM vs the classics, on your CSV")
@@ -103,9 +52,27 @@ def main():
                     help="comma separated subset of xgboost,tabicl,tabfm")
     ap.add_argument("--test-size", type=float, default=0.3)
     ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--seeds", help="comma separated seeds, one split each, the models load once")
+    ap.add_argument("--predict-memory-mb", type=int, default=2048,
+                    help="memory budget for one predict chunk of the zero-shot models")
+    ap.add_argument("--predict-chunk", type=int, help="test rows per predict chunk, overrides the budget")
+    ap.add_argument("--predict-threads", type=int, default=1, help="predict chunks in parallel threads")
+    ap.add_argument("--repeats", type=int, help="run N seeds, --seed to --seed+N-1")
+    ap.add_argument("--cv", type=int, help="K stratified folds per seed instead of --test-size")
+    ap.add_argument("--memory-gb", type=float, help="memory budget for the worker pool, default all RAM")
+    ap.add_argument("--threads", type=int, help="cores to split between the workers, default all")
+    ap.add_argument("--out", help="write every run and the summary as JSON here")
     ap.add_argument("--max-context", type=int, default=1000,
                     help="context cap for the zero-shot models, dedup + stratified sample")
+    ap.add_argument("--context", choices=context.MODES, default="sample",
+                    help="sample, one context for all test rows, or knn, nearest rows per test batch")
+    ap.add_argument("--knn-batch", type=int, default=64, help="test rows sharing one knn context")
     args = ap.parse_args()
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    unknown = [m for m in models if m not in MODELS]
+    if unknown or not models:
+        sys.exit(f"unknown model {', '.join(unknown) or '(none given)'}, "
+                 f"--models takes a comma separated subset of {','.join(MODELS)}")
 
     import pandas as pd
     df = pd.read_csv(args.csv)
@@ -123,29 +90,68 @@ def main():
     print(f"dataset: {os.path.basename(args.csv)}, {df.shape[0]} rows, "
           f"{n_features} features, {n_classes} classes", flush=True)
 
-    results = []
-    for name in [m.strip() for m in args.models.split(",") if m.strip()]:
-        cfg = {"csv": args.csv, "target": args.target, "model": name,
-               "test_size": args.test_size, "seed": args.seed,
-               "max_context": args.max_context}
-        print(f"running {name} in its own process...", flush=True)
-        out = subprocess.run([sys.executable, "-c", CHILD, json.dumps(cfg)],
-                             capture_output=True, text=True)
-        lines = [l for l in out.stdout.strip().splitlines() if l.startswith("{")]
-        if not lines:
-            err = out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "no output"
-            print(f"  {name} FAILED: {err}", flush=True)
-            continue
-        results.append(json.loads(lines[-1]))
-
-    if results:
-        print(f"\n{'model':<10} {'accuracy':>9} {'seconds':>9} {'context':>9}")
-        for r in results:
-            cap = " (capped)" if r["context_capped"] else ""
-            print(f"{r['model']:<10} {r['acc']:>9.4f} {r['seconds']:>9.1f} "
-                  f"{r['context_rows']:>9}{cap}")
+    if args.seeds:
+        seeds = [int(s) for s in args.seeds.split(",")]
+    else:
+        seeds = list(range(args.seed, args.seed + (args.repeats or 1)))
+    folds = range(args.cv) if args.cv else [None]
+    jobs = [{"seed": seed, "fold": fold, "folds": args.cv, "test_size": args.test_size,
+             "max_context": args.max_context, "context": args.context, "knn_batch": args.knn_batch,
+             "predict_memory_mb": args.predict_memory_mb, "predict_chunk": args.predict_chunk,
+             "predict_threads": args.predict_threads}
+            for seed in seeds for fold in folds]
+    waves = schedule.plan(models, len(jobs), args.memory_gb, args.threads)
+    print(f"{len(jobs)} splits x {len(models)} models on "
+          + ", then ".join(", ".join(f"{counts[m]} {m}" for m in counts) + f" workers, {threads} threads each"
+                           for counts, threads in waves), flush=True)
+
+    def progress(r):
+        if "error" in r:
+            print(f"  {r['model']} FAILED: {r['error']}", flush=True)
+        elif r["load_seconds"]:
+            print(f"  {r['model']} loaded in {r['load_seconds']:.1f}s", flush=True)
+
+    X, y, classes = dataset.encode_frame(df, args.target)
+    del df
+    with tempfile.TemporaryDirectory(prefix="tabfm-bench-") as data_dir:
+        dataset.save(data_dir, X, y, classes)
+        del X, y
+        for job in jobs:
+            job["data"] = data_dir
+        results = schedule.run_jobs(models, jobs, waves, on_result=progress)
+    ok = [r for r in results if "error" not in r]
+
+    if ok and len(ok) <= 12:
+        print(f"\n{'model':<10} {'seed':>6} {'fold':>5} {'accuracy':>9} {'seconds':>9} "
+              f"{'rows/s':>9} {'peak MB':>8} {'context':>9}")
+        for r in ok:
+            cap = " (knn)" if r["context"] == "knn" else " (capped)" if r["context_capped"] else ""
+            fold = "-" if r["fold"] is None else r["fold"]
+            print(f"{r['model']:<10} {r['seed']:>6} {fold:>5} {r['acc']:>9.4f} {r['seconds']:>9.1f} "
+                  f"{r['rows_per_second'] or 0:>9.0f} {r['peak_rss_mb']:>8.0f} {r['context_rows']:>9}{cap}")
+    summary = schedule.summarize(results, models)
+    if len(jobs) > 1 and summary:
+        print(f"\n{'model':<10} {'runs':>5} {'accuracy [95% CI]':>26} {'fit s':>8} {'predict s':>10}")
+        for name, s in summary.items():
+            a = s["acc"]
+            print(f"{name:<10} {s['runs']:>5} {a['mean']:>8.4f} [{a['ci_low']:.4f}, {a['ci_high']:.4f}] "
+                  f"{s['fit_seconds']['mean']:>8.1f} {s['predict_seconds']['mean']:>10.1f}")
+            for key, d in s.items():
+                if key.startswith("acc_minus_"):
+                    print(f"{'':<10} {key.replace('_', ' ')} {d['mean']:+.4f} "
+                          f"[{d['ci_low']:+.4f}, {d['ci_high']:+.4f}]")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"dataset": os.path.basename(args.csv), "args": vars(args),
+                       "versions": schedule.versions(models),
+                       "waves": [{"workers": counts, "threads": threads} for counts, threads in waves],
+                       "runs": results, "summary": summary}, f, indent=2)
+        print(f"\nresults written to {args.out}")
+    if ok:
         print("\nA tie means the smaller model already does the job. "
-              "This split is one draw, rerun with another --seed before deciding.")
+              + ("An interval that contains zero difference is a tie, not a win."
+                 if len(jobs) > 1 else
+                 "This split is one draw, rerun with --repeats 10 before deciding."))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,103 @@
+"""Pick the context rows TabFM and TabICL see, every row costs memory and time.
+
+Two modes:
+
+  sample  dedup plus stratified sample of the training set, one context for
+          all test rows. This is what benchmark.py always did, the dedup is
+          now one np.unique over row views instead of a Python loop with
+          tobytes(), so it scales to millions of rows.
+  knn     a nearest-neighbour index over the deduplicated training set. Test
+          rows are scored in batches, each batch gets its own small local
+          context, the union of its rows' nearest training rows. Memory and
+          time per batch stay bounded by the context size however large the
+          table is, the model is fit once per batch.
+
+    ctx = KNNContext(X_tr, y_tr, max_context=1000)
+    for rows, idx in ctx.batches(X_te, batch_size=64):
+        m.fit(X_tr[idx], y_tr[idx]); preds[rows] = m.predict(X_te[rows])
+"""
+import numpy as np
+
+MODES = ("sample", "knn")
+
+
+def dedup_rows(X, order=None):
+    """Indices of the first occurrence of every distinct row, taken in `order`."""
+    if order is None:
+        order = np.arange(len(X))
+    rows = np.ascontiguousarray(X[order])
+    # one opaque item per row, np.unique then compares whole rows byte for byte
+    view = rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).ravel()
+    _, first = np.unique(view, return_index=True)
+    return order[np.sort(first)]
+
+
+def stratified(idx, y, k):
+    """Up to k of idx, the same share per class, in the order given."""
+    labels = y[idx]
+    classes = np.unique(labels)
+    per_class = max(1, k // len(classes))
+    out = [idx[labels == c][:per_class] for c in classes]
+    return np.concatenate(out)[:k]
+
+
+def sample_context(X, y, k, seed):
+    """Dedup plus stratified sample of at most k rows, returns (idx, capped)."""
+    if len(y) <= k:
+        return np.arange(len(y)), False
+    order = np.random.default_rng(seed).permutation(len(y))
+    return stratified(dedup_rows(X, order), y, k), True
+
+
+class KNNContext:
+    """Nearest-neighbour index over a training set, hands out a local context per batch."""
+
+    def __init__(self, X, y, max_context=1000, seed=0, min_neighbors=8):
+        from sklearn.neighbors import NearestNeighbors
+
+        self.y = y
+        self.max_context = max_context
+        self.min_neighbors = min_neighbors
+        # duplicates would fill a neighbourhood with copies of one row
+        self.rows = dedup_rows(X)
+        Xd = np.asarray(X[self.rows], dtype="float32")
+        self.mean = Xd.mean(axis=0)
+        self.scale = Xd.std(axis=0)
+        self.scale[self.scale == 0] = 1
+        self.index = NearestNeighbors().fit(self._scaled(Xd))
+        rng = np.random.default_rng(seed)
+        # one spare row per class, for batches whose neighbourhood misses a class
+        labels = y[self.rows]
+        self.spare = {c: rng.choice(self.rows[labels == c]) for c in np.unique(labels)}
+        self.sizes = []
+
+    def _scaled(self, X):
+        return (np.asarray(X, dtype="float32") - self.mean) / self.scale
+
+    def select(self, Xq):
+        """Training row indices forming the local context of the query rows."""
+        k = min(len(self.rows), max(self.min_neighbors, -(-self.max_context // len(Xq))))
+        dist, nbr = self.index.kneighbors(self._scaled(Xq), n_neighbors=k)
+        # closest first across the whole batch, each training row once
+        nbr = nbr.ravel()[np.argsort(dist.ravel(), kind="stable")]
+        _, first = np.unique(nbr, return_index=True)
+        idx = self.rows[nbr[np.sort(first)][: self.max_context]]
+        present = set(np.unique(self.y[idx]).tolist())
+        missing = [r for c, r in self.spare.items() if c not in present]
+        if missing:
+            idx = np.concatenate([idx, missing])
+        self.sizes.append(len(idx))
+        return idx
+
+    def batches(self, Xq, batch_size=64):
+        """Yields (query row indices, context indices), neighbouring queries share a batch."""
+        Xs = self._scaled(Xq)
+        order = np.arange(len(Xq))
+        if len(Xq) > batch_size:
+            # sort along the main direction of the data, so a batch is one region
+            sample = Xs[:: max(1, len(Xs) // 10000)]
+            _, _, vt = np.linalg.svd(sample - sample.mean(axis=0), full_matrices=False)
+            order = np.argsort(Xs @ vt[0], kind="stable")
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            yield rows, self.select(Xq[rows])
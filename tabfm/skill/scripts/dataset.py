@@ -0,0 +1,49 @@
+"""Encode a CSV once and share it with the model workers as memory-mapped .npy.
+
+Every model used to re-read and re-encode the CSV with pandas in its own
+subprocess. The parent now encodes it once, uniformly and deterministically so
+every model sees identical data, and writes X (float32) and y (int64) as .npy
+files. Workers open them with mmap_mode="r", the pages are shared through the
+OS page cache instead of being copied per process.
+"""
+import json
+import os
+
+import numpy as np
+
+
+def encode_frame(df, target):
+    """Returns X (float32), y (int64 class codes) and the sorted class labels."""
+    import pandas as pd
+
+    y_raw = df[target]
+    X = df.drop(columns=[target]).copy()
+    classes = sorted(y_raw.astype(str).unique())
+    y = y_raw.astype(str).map({c: i for i, c in enumerate(classes)}).to_numpy(dtype="int64")
+    for col in X.columns:
+        if not pd.api.types.is_numeric_dtype(X[col]):
+            X[col] = X[col].astype("category").cat.codes
+    return X.to_numpy(dtype="float32"), y, classes
+
+
+def save(out_dir, X, y, classes=None, **meta):
+    """Writes X.npy, y.npy and meta.json to out_dir, returns out_dir."""
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "X.npy"), np.ascontiguousarray(X, dtype="float32"))
+    np.save(os.path.join(out_dir, "y.npy"), np.ascontiguousarray(y, dtype="int64"))
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump({"rows": int(len(y)), "features": int(X.shape[1]),
+                   "classes": classes if classes is not None else sorted(set(map(int, y))), **meta}, f)
+    return out_dir
+
+
+def load(data_dir):
+    """Opens a saved dataset memory-mapped, returns (X, y)."""
+    X = np.load(os.path.join(data_dir, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(data_dir, "y.npy"), mmap_mode="r")
+    return X, y
+
+
+def load_meta(data_dir):
+    with open(os.path.join(data_dir, "meta.json")) as f:
+        return json.load(f)
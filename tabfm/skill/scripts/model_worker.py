@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""A long-lived worker process per model that serves many fit/predict jobs.
+
+The benchmark used to start a fresh subprocess per model and run, so every
+seed re-imported torch and reloaded the 6.6 GB TabFM checkpoint, multi-seed
+runs spent most of their time loading. A worker loads its model once and then
+answers jobs (seed, split or CV fold, context cap and mode, prediction chunking)
+sent as JSON lines over its stdin, each answer is one JSON line on stdout.
+Predictions go through predict.py in memory-bounded chunks.
+
+Each model still gets its own process, XGBoost and PyTorch bundle conflicting
+OpenMP runtimes on macOS and crash or deadlock in one process.
+
+The data comes from dataset.py, memory-mapped .npy files written once by the
+parent, a job only names the directory.
+
+    worker = ModelWorker("tabfm")
+    worker.run({"data": data_dir, "seed": 42, "test_size": 0.3, "max_context": 1000})
+    worker.close()
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("HF_HUB_DISABLE_XET", "1")
+
+MODELS = ("xgboost", "tabicl", "tabfm")
+
+
+class ModelWorker:
+    """Parent side handle of one worker process."""
+
+    def __init__(self, model, env=None):
+        if model not in MODELS:
+            raise ValueError(f"unknown model {model}, expected one of {', '.join(MODELS)}")
+        self.model = model
+        self.stderr = tempfile.TemporaryFile(mode="w+")
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), model],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=self.stderr,
+            text=True, env={**os.environ, **(env or {})})
+
+    def run(self, job):
+        """Sends one job and waits for its result dict, {"error": ...} if it failed."""
+        try:
+            self.process.stdin.write(json.dumps(job) + "\n")
+            self.process.stdin.flush()
+            line = self.process.stdout.readline()
+        except BrokenPipeError:
+            line = ""
+        if not line:
+            return {"model": self.model, "error": f"worker died, {self.last_error()}"}
+        return json.loads(line)
+
+    def last_error(self):
+        self.stderr.seek(0)
+        lines = self.stderr.read().strip().splitlines()
+        return lines[-1] if lines else "no output"
+
+    def close(self):
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.stderr.close()
+
+
+# ---- worker side, runs in the child process ----
+
+_loaded = {}
+_jobs_served = 0
+
+
+def _tabfm_model():
+    # loaded once per worker, this is the 6.6 GB checkpoint
+    if "tabfm" not in _loaded:
+        import torch
+        from tabfm.src.pytorch import tabfm_v1_0_0
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        _loaded["tabfm"] = tabfm_v1_0_0.load(**({} if device == "cuda" else {"dtype": torch.float32}))
+    return _loaded["tabfm"]
+
+
+def make_estimator(name):
+    if name == "xgboost":
+        from xgboost import XGBClassifier
+        threads = os.environ.get("OMP_NUM_THREADS")
+        return XGBClassifier(verbosity=0, tree_method="hist", n_jobs=int(threads) if threads else None)
+    if name == "tabicl":
+        # refitting the same instance keeps its loaded checkpoint around
+        if "tabicl" not in _loaded:
+            from tabicl import TabICLClassifier
+            _loaded["tabicl"] = TabICLClassifier()
+        return _loaded["tabicl"]
+    from tabfm import TabFMClassifier
+    return TabFMClassifier(model=_tabfm_model())
+
+
+def split(X, y, job):
+    from sklearn.model_selection import StratifiedKFold, train_test_split
+    import numpy as np
+    if job.get("folds"):
+        # fold i of a shuffled stratified k-fold, the seed picks the shuffle
+        folds = StratifiedKFold(job["folds"], shuffle=True, random_state=job["seed"])
+        return list(folds.split(np.zeros(len(y)), y))[job["fold"]]
+    # same shuffle as splitting the arrays themselves, row order is kept
+    return train_test_split(np.arange(len(y)), test_size=job["test_size"],
+                            random_state=job["seed"], stratify=y)
+
+
+def fit_predict_knn(m, X_tr, y_tr, X_te, job):
+    """Fits on a local context per batch of test rows, returns (preds, fit s, predict s, ctx)."""
+    import numpy as np
+    import context
+
+    ctx = context.KNNContext(X_tr, y_tr, job["max_context"], seed=job["seed"])
+    preds = np.empty(len(X_te), dtype=y_tr.dtype)
+    fit_s = predict_s = 0.0
+    for rows, idx in ctx.batches(X_te, job.get("knn_batch", 64)):
+        t0 = time.time()
+        m.fit(X_tr[idx], y_tr[idx])
+        t1 = time.time()
+        p = np.asarray(m.predict(X_te[rows]))
+        predict_s += time.time() - t1
+        fit_s += t1 - t0
+        preds[rows] = p.astype(int) if p.dtype == object else p
+    return preds, fit_s, predict_s, ctx
+
+
+def run_job(name, job):
+    global _jobs_served
+    import numpy as np
+    from sklearn.metrics import accuracy_score
+    import context
+    import dataset
+    import predict
+
+    X, y = dataset.load(job["data"])
+    tr, te = split(X, y, job)
+    # fancy indexing copies just the rows of this split out of the mapping
+    X_tr, y_tr, X_te, y_te = X[tr], y[tr], X[te], y[te]
+
+    # only the first job of a worker pays for imports and the checkpoint
+    t_load = time.time()
+    m = make_estimator(name)
+    load_seconds = time.time() - t_load if _jobs_served == 0 else 0.0
+    _jobs_served += 1
+
+    mode = job.get("context", "sample")
+    if name != "xgboost" and mode == "knn" and len(y_tr) > job["max_context"]:
+        preds, fit_s, predict_s, ctx = fit_predict_knn(m, X_tr, y_tr, X_te, job)
+        # a context per batch, report the largest
+        context_rows, capped = max(ctx.sizes), True
+        stats = {"chunk_rows": job.get("knn_batch", 64), "chunks": len(ctx.sizes),
+                 "rows_per_second": round(len(te) / predict_s, 1) if predict_s else None,
+                 "peak_rss_mb": round(predict.peak_rss_mb(), 1)}
+    else:
+        if name == "xgboost":
+            mode, Xc, yc, capped = "full", X_tr, y_tr, False
+        else:
+            mode = "sample"
+            idx, capped = context.sample_context(X_tr, y_tr, job["max_context"], job["seed"])
+            Xc, yc = X_tr[idx], y_tr[idx]
+        t0 = time.time()
+        m.fit(Xc, yc)
+        t1 = time.time()
+        # fit once, then the test rows in memory-bounded chunks, trees need no chunking
+        preds, stats = predict.predict_chunked(
+            m, X_te, chunk_rows=len(X_te) if name == "xgboost" else job.get("predict_chunk"),
+            memory_mb=job.get("predict_memory_mb", 2048), context_rows=len(yc),
+            threads=job.get("predict_threads", 1))
+        fit_s, predict_s = t1 - t0, time.time() - t1
+        context_rows = len(yc)
+    return {
+        "model": name, "seed": job["seed"], "acc": float(accuracy_score(y_te, preds)),
+        "seconds": round(fit_s + predict_s, 2), "fit_seconds": round(fit_s, 2),
+        "predict_seconds": round(predict_s, 2), "load_seconds": round(load_seconds, 1),
+        "context": mode, "context_rows": int(context_rows), "context_capped": bool(capped),
+        "test_rows": int(len(te)), **stats,
+    }
+
+
+def serve(name):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    # Answers go to the real stdout, anything the libraries print goes to stderr
+    out = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        try:
+            result = run_job(name, job)
+        except Exception as e:
+            result = {"model": name, "seed": job.get("seed"), "error": f"{type(e).__name__}: {e}"}
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1])
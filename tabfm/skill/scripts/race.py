@@ -2,53 +2,32 @@
 
 Each model runs in its OWN subprocess. XGBoost and PyTorch each bring their
 own OpenMP runtime on macOS, and loading both in one process segfaults or
-deadlocks. Process isolation avoids the fight entirely.
+deadlocks. Process isolation avoids the fight entirely. The processes are the
+model workers of model_worker.py, fed the split from a shared .npy dataset,
+and the model load is reported apart from fit plus predict.
 """
-import json, os, subprocess, sys
-
-BENCH = r'''
-import json, os, sys, time
-os.environ.setdefault("HF_HUB_DISABLE_XET", "1")
+import os, tempfile
 from sklearn.datasets import load_wine
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
 
-X, y = load_wine(return_X_y=True, as_frame=True)
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.3, random_state=42, stratify=y)
+import dataset
+from model_worker import ModelWorker
 
-name = sys.argv[1]
-t0 = time.time()
-if name == "XGBoost":
-    from xgboost import XGBClassifier
-    m = XGBClassifier(verbosity=0)
-    m.fit(X_train, y_train); preds = m.predict(X_test)
-elif name == "TabICL":
-    from tabicl import TabICLClassifier
-    m = TabICLClassifier()
-    m.fit(X_train, y_train); preds = m.predict(X_test)
-elif name == "TabFM":
-    import torch
-    from tabfm.src.pytorch import tabfm_v1_0_0
-    from tabfm import TabFMClassifier
-    model = tabfm_v1_0_0.load(dtype=torch.float32)
-    m = TabFMClassifier(model=model)
-    m.fit(X_train, y_train); preds = m.predict(X_test)
-dt = time.time() - t0
-if getattr(preds, "dtype", None) == object:
-    preds = preds.astype(int)
-print(json.dumps({"name": name, "acc": accuracy_score(y_test, preds), "sec": dt}))
-'''
+MODELS = {"XGBoost": "xgboost", "TabICL": "tabicl", "TabFM": "tabfm"}
 
+X, y = load_wine(return_X_y=True)
 results = {}
-for name in ["XGBoost", "TabICL", "TabFM"]:
-    print(f"running {name} in its own process...", flush=True)
-    out = subprocess.run([sys.executable, "-c", BENCH, name],
-                         capture_output=True, text=True)
-    line = [l for l in out.stdout.strip().splitlines() if l.startswith("{")][-1]
-    r = json.loads(line)
-    results[name] = (r["acc"], r["sec"])
-    print(f'{name:8s} accuracy={r["acc"]:.4f}  fit+predict={r["sec"]:.1f}s', flush=True)
+with tempfile.TemporaryDirectory(prefix="tabfm-race-") as data_dir:
+    dataset.save(data_dir, X, y)
+    for name, model in MODELS.items():
+        print(f"running {name} in its own process...", flush=True)
+        worker = ModelWorker(model)
+        r = worker.run({"data": data_dir, "seed": 42, "test_size": 0.3, "max_context": len(y)})
+        worker.close()
+        if "error" in r:
+            raise SystemExit(f"{name} failed: {r['error']}")
+        results[name] = (r["acc"], r["seconds"])
+        print(f'{name:8s} accuracy={r["acc"]:.4f}  fit+predict={r["seconds"]:.1f}s  '
+              f'(load {r["load_seconds"]:.1f}s)', flush=True)
 
 import glob
 def gb(pat):
@@ -0,0 +1,157 @@
+"""Run (model, seed, fold) jobs on a pool of model workers and summarize them.
+
+One train/test draw is one sample, deciding between TabFM and XGBoost needs
+the spread. benchmark.py --repeats / --cv turns into many jobs, this module
+sizes a pool of ModelWorker processes from a memory budget and a thread
+budget, feeds each model's jobs to its workers, and reduces the runs to means
+with bootstrap confidence intervals.
+
+The workers run in waves, one after another. Models that fit the memory
+budget together share a wave, a model that would push the wave over budget
+waits for the next one (TabFM holds a 6.6 GB checkpoint per process, XGBoost
+next to nothing). With one job per model nothing runs in parallel anyway, so
+every model gets a wave of its own and all the cores, as a single split always
+did. Within a wave, workers per model grow round robin while the memory budget
+allows, and never beyond the number of cores. The cores are split evenly
+between the wave's workers, each process gets that many OpenMP / BLAS / torch
+threads, so workers do not oversubscribe the machine and timings stay
+comparable.
+"""
+import os
+import queue
+import threading
+from importlib import metadata
+
+import numpy as np
+
+from model_worker import ModelWorker
+
+# Resident memory per worker in GB, measured peaks on CPU rounded up
+MEMORY_GB = {"xgboost": 1, "tabicl": 2, "tabfm": 16}
+BOOTSTRAP_SAMPLES = 2000
+METRICS = ("acc", "fit_seconds", "predict_seconds")
+
+
+def total_memory_gb():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024 ** 3
+    except (ValueError, OSError, AttributeError):
+        return 16.0
+
+
+def plan(models, jobs_per_model, memory_gb=None, threads=None):
+    """Waves of workers run one after another, returns [({model: count}, threads per worker)]."""
+    memory_gb = total_memory_gb() if memory_gb is None else memory_gb
+    threads = threads or os.cpu_count() or 1
+    waves = []
+    for m in models:
+        wave = waves[-1] if waves and jobs_per_model > 1 else None
+        if wave and len(wave) < threads and sum(MEMORY_GB[n] for n in wave) + MEMORY_GB[m] <= memory_gb:
+            wave[m] = 1
+        else:
+            waves.append({m: 1})  # a model alone in its wave runs even over budget
+    for counts in waves:
+        used = sum(MEMORY_GB[m] for m in counts)
+        grew = True
+        while grew:
+            grew = False
+            for m in counts:
+                if sum(counts.values()) >= threads:
+                    break
+                if counts[m] < jobs_per_model and used + MEMORY_GB[m] <= memory_gb:
+                    counts[m] += 1
+                    used += MEMORY_GB[m]
+                    grew = True
+    return [(counts, max(1, threads // sum(counts.values()))) for counts in waves]
+
+
+def run_jobs(models, jobs, waves, on_result=None):
+    """Runs every job on every model wave by wave, returns the result dicts (failed ones carry "error")."""
+    results = []
+    lock = threading.Lock()
+
+    def drive(name, todo, threads, env):
+        worker = ModelWorker(name, env=env)
+        try:
+            while True:
+                try:
+                    job = todo.get_nowait()
+                except queue.Empty:
+                    return
+                r = worker.run(job)
+                r.setdefault("seed", job["seed"])
+                r["fold"] = job.get("fold")
+                r["threads"] = threads
+                with lock:
+                    results.append(r)
+                    if on_result:
+                        on_result(r)
+                if "error" in r:
+                    # a dead worker takes its model's remaining jobs with it
+                    return
+        finally:
+            worker.close()
+
+    for counts, threads in waves:
+        env = {v: str(threads) for v in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")}
+        pool = []
+        for name, count in counts.items():
+            todo = queue.Queue()
+            for job in jobs:
+                todo.put(job)
+            pool += [threading.Thread(target=drive, args=(name, todo, threads, env), daemon=True)
+                     for _ in range(count)]
+        for t in pool:
+            t.start()
+        # the next wave's models only load once this wave's workers have exited
+        for t in pool:
+            t.join()
+    return sorted(results, key=lambda r: (models.index(r["model"]), r["seed"], r["fold"] or 0))
+
+
+def bootstrap_ci(values, level=0.95, seed=0):
+    """Mean and percentile bootstrap interval of the mean, (mean, low, high)."""
+    values = np.asarray(values, dtype=float)
+    if len(values) < 2:
+        return float(values.mean()), float(values.mean()), float(values.mean())
+    rng = np.random.default_rng(seed)
+    means = rng.choice(values, size=(BOOTSTRAP_SAMPLES, len(values))).mean(axis=1)
+    tail = (1 - level) / 2 * 100
+    low, high = np.percentile(means, [tail, 100 - tail])
+    return float(values.mean()), float(low), float(high)
+
+
+def summarize(results, models):
+    """Per model means with bootstrap CIs, plus each model's accuracy minus the first's, paired by split."""
+    ok = [r for r in results if "error" not in r]
+    summary = {}
+    for name in models:
+        runs = [r for r in ok if r["model"] == name]
+        if not runs:
+            continue
+        summary[name] = {"runs": len(runs)}
+        for metric in METRICS:
+            mean, low, high = bootstrap_ci([r[metric] for r in runs])
+            summary[name][metric] = {"mean": mean, "ci_low": low, "ci_high": high}
+    base = next((m for m in models if m in summary), None)
+    by_split = {(r["model"], r["seed"], r["fold"]): r["acc"] for r in ok}
+    for name in summary:
+        if name == base:
+            continue
+        deltas = [acc - by_split[(base, s, f)] for (m, s, f), acc in by_split.items()
+                  if m == name and (base, s, f) in by_split]
+        if deltas:
+            mean, low, high = bootstrap_ci(deltas)
+            summary[name][f"acc_minus_{base}"] = {"mean": mean, "ci_low": low, "ci_high": high}
+    return summary
+
+
+def versions(models):
+    """Installed versions of the model packages, for comparing results across upgrades."""
+    out = {}
+    for pkg in ("numpy", "scikit-learn", "torch", *models):
+        try:
+            out[pkg] = metadata.version(pkg)
+        except metadata.PackageNotFoundError:
+            pass
+    return out
@@ -3,8 +3,8 @@ import base64
 import vertexai
 import requests
 import time
-import datetime  # For caching TTL
-from vertexai.preview import caching  # Correct import for caching
+from google.api_core import exceptions as google_exceptions
+from cache_registry import CacheRegistry
 from vertexai.preview.generative_models import GenerativeModel, Part, SafetySetting, GenerationConfig  # Correct preview import
 
 RESPONSE_SCHEMA = {
@@ -22,51 +22,43 @@ RESPONSE_SCHEMA = {
 def initialize_vertex_ai():
     vertexai.init(project="sascha-playground-doit", location="us-central1")
 
+# One registry per process so cached content is reused across requests and reruns
+@st.cache_resource
+def get_cache_registry():
+    return CacheRegistry()
+
 # Function to generate content using Vertex AI and retrieve metadata
 def generate_content(model_name, text_input, system_instruction, use_cache, taxnomy):
     
     
     if use_cache:
-        # Show message to indicate cache generation
-        st.write("Generating cache...")  
-        
-        #st.write(system_instruction)
-      
-        
-        
-        #st.write(contents)
-        cached_content = caching.CachedContent.create(
-            model_name=model_name,
-            system_instruction=system_instruction,
-            contents=[Part.from_text(taxnomy)],
-            ttl=datetime.timedelta(minutes=60),
-        )
-        
-        
-        cached_content = caching.CachedContent(cached_content_name=cached_content.name)
-
-        
-        #st.write(cached_content)
-        
-        # Cache generation done, proceed to content generation
-        st.write("Cache generated. Now generating content...")  
+        cached_content, created = get_cache_registry().get_or_create(model_name, system_instruction, taxnomy)
+        if created:
+            st.write("Cache generated. Now generating content...")
+        else:
+            st.write("Reusing existing cache. Now generating content...")
 
         # Use cached content for the model
         model = GenerativeModel.from_cached_content(cached_content=cached_content)
         
         start_time = time.time()  # Start the timer to measure response time
         print(text_input)
-        responses = model.generate_content(
-            [text_input],
-            generation_config=GenerationConfig(
-                temperature=1.0,
-                max_output_tokens=8192,
-                response_mime_type="application/json",
-                response_schema=RESPONSE_SCHEMA
-            ),
-            safety_settings=safety_settings,
-            stream=False,
-        )
+        try:
+            responses = model.generate_content(
+                [text_input],
+                generation_config=GenerationConfig(
+                    temperature=1.0,
+                    max_output_tokens=8192,
+                    response_mime_type="application/json",
+                    response_schema=RESPONSE_SCHEMA
+                ),
+                safety_settings=safety_settings,
+                stream=False,
+            )
+        except google_exceptions.NotFound:
+            # Cache expired between lookup and generation, fall back to an uncached call
+            get_cache_registry().invalidate(cached_content.name)
+            return generate_content(model_name, text_input, system_instruction, False, taxnomy)
         end_time = time.time()  # End the timer to measure response time
     else:
         model = GenerativeModel(
@@ -0,0 +1,257 @@
+"""Bulk product classification against a product taxonomy.
+
+Reads products from a CSV or JSONL file, narrows the taxonomy down to a small
+candidate subtree per product with a local lexical index, classifies the
+products concurrently and streams one JSON line per product to the output.
+
+Usage:
+    python batch_classify.py products.csv --output results.jsonl --workers 16 --qps 10
+"""
+import argparse
+import collections
+import concurrent.futures
+import csv
+import json
+import math
+import re
+import sys
+import threading
+import time
+
+import requests
+import vertexai
+from google.api_core import exceptions as google_exceptions
+from vertexai.preview.generative_models import GenerativeModel, GenerationConfig
+
+DEFAULT_TAXONOMY_URL = "https://www.google.com/basepages/producttype/taxonomy.en-US.txt"
+
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "taxonomy_hierarchy": {
+            "type": "string",
+            "description": "The full hierarchical taxonomy classification for the product."
+        }
+    },
+    "required": ["taxonomy_hierarchy"]
+}
+
+SYSTEM_INSTRUCTION = (
+    "As a product taxonomy expert based on a predefined product taxonomy you are categorizing products "
+    "either based on the image and or the product description and potential additional metadata. "
+    "Only answer with one of the provided taxonomy paths."
+)
+
+# Same flat rate as the Streamlit app
+COST_PER_1K_TOKENS = 0.0000046875
+
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def parse_taxonomy(text):
+    """Returns the taxonomy paths, skipping the version header and blank lines."""
+    return [line.strip() for line in text.splitlines() if line.strip() and not line.startswith("#")]
+
+
+class TaxonomyIndex:
+    """BM25 index over taxonomy paths used to pick candidate categories per product."""
+
+    def __init__(self, paths, k1=1.2, b=0.75):
+        self.paths = paths
+        self.k1 = k1
+        self.b = b
+        self.postings = collections.defaultdict(list)
+        self.lengths = []
+        for doc_id, path in enumerate(paths):
+            # The leaf category is the most specific signal, so weigh it twice
+            tokens = tokenize(path) + tokenize(path.split(">")[-1])
+            self.lengths.append(len(tokens))
+            for token, count in collections.Counter(tokens).items():
+                self.postings[token].append((doc_id, count))
+        self.avg_length = sum(self.lengths) / max(len(self.lengths), 1)
+
+    def search(self, text, top_k):
+        scores = collections.defaultdict(float)
+        n_docs = len(self.paths)
+        for token in set(tokenize(text)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, count in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / self.avg_length)
+                scores[doc_id] += idf * count * (self.k1 + 1) / (count + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+        return [self.paths[doc_id] for doc_id, _ in ranked]
+
+    def candidate_subtree(self, text, top_k):
+        """Top matching paths plus all of their ancestors, in taxonomy order."""
+        matches = self.search(text, top_k)
+        if not matches:
+            # Nothing matched lexically, let the model choose among the top level categories
+            return [path for path in self.paths if ">" not in path]
+        selected = set()
+        for path in matches:
+            parts = [part.strip() for part in path.split(">")]
+            for depth in range(1, len(parts) + 1):
+                selected.add(" > ".join(parts[:depth]))
+        return [path for path in self.paths if path in selected]
+
+
+class RateLimiter:
+    """Simple thread-safe limiter spacing calls at most `qps` per second."""
+
+    def __init__(self, qps):
+        self.interval = 1.0 / qps if qps > 0 else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def read_products(path):
+    """Yields dicts with at least an `id` and a `text` field from a CSV or JSONL file."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for i, row in enumerate(rows):
+            text = row.get("text") or "\n".join(
+                f"{field.capitalize()}: {row[field]}" for field in ("title", "description") if row.get(field)
+            )
+            yield {"id": row.get("id", str(i)), "text": text}
+
+
+def classify_product(model, product, candidates, rate_limiter, max_retries):
+    prompt = (
+        f"Product:\n{product['text']}\n\n"
+        "Candidate taxonomy paths:\n" + "\n".join(candidates)
+    )
+    for attempt in range(max_retries + 1):
+        rate_limiter.wait()
+        try:
+            start_time = time.time()
+            response = model.generate_content(
+                [prompt],
+                generation_config=GenerationConfig(
+                    temperature=0.0,
+                    max_output_tokens=256,
+                    response_mime_type="application/json",
+                    response_schema=RESPONSE_SCHEMA
+                ),
+            )
+            latency_ms = (time.time() - start_time) * 1000
+            break
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            backoff = min(2 ** attempt, 30)
+            print(f"Retrying {product['id']} in {backoff}s after: {e}", file=sys.stderr)
+            time.sleep(backoff)
+
+    usage = response.usage_metadata
+    return {
+        "id": product["id"],
+        "taxonomy_hierarchy": json.loads(response.text)["taxonomy_hierarchy"],
+        "candidates": len(candidates),
+        "latency_ms": round(latency_ms, 2),
+        "prompt_token_count": usage.prompt_token_count,
+        "candidates_token_count": usage.candidates_token_count,
+        "cost": (usage.prompt_token_count + usage.candidates_token_count) / 1000 * COST_PER_1K_TOKENS,
+    }
+
+
+def run_batch(products, index, model, output, workers, qps, top_k, max_retries):
+    rate_limiter = RateLimiter(qps)
+    totals = collections.Counter()
+    # Only keep a bounded number of products in flight so huge catalogs stream through
+    max_in_flight = workers * 4
+
+    def submit(executor, product):
+        candidates = index.candidate_subtree(product["text"], top_k)
+        return executor.submit(classify_product, model, product, candidates, rate_limiter, max_retries)
+
+    def write(future, product):
+        try:
+            result = future.result()
+            totals["ok"] += 1
+            totals["prompt_tokens"] += result["prompt_token_count"]
+            totals["cost"] += result["cost"]
+        except Exception as e:
+            result = {"id": product["id"], "error": str(e)}
+            totals["failed"] += 1
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+        for product in products:
+            in_flight[submit(executor, product)] = product
+            if len(in_flight) >= max_in_flight:
+                done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    write(future, in_flight.pop(future))
+        for future in concurrent.futures.as_completed(in_flight):
+            write(future, in_flight[future])
+
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify a catalog of products against a product taxonomy.")
+    parser.add_argument("products", help="CSV or JSONL file with id and text (or title/description) columns")
+    parser.add_argument("--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("--taxonomy-url", default=DEFAULT_TAXONOMY_URL)
+    parser.add_argument("--model", default="gemini-1.5-flash-002")
+    parser.add_argument("--project", default="sascha-playground-doit")
+    parser.add_argument("--location", default="us-central1")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--qps", type=float, default=5.0, help="Maximum requests per second, 0 to disable")
+    parser.add_argument("--top-k", type=int, default=25, help="Matching taxonomy paths to send per product")
+    parser.add_argument("--max-retries", type=int, default=5)
+    args = parser.parse_args()
+
+    vertexai.init(project=args.project, location=args.location)
+    model = GenerativeModel(model_name=args.model, system_instruction=[SYSTEM_INSTRUCTION])
+
+    response = requests.get(args.taxonomy_url)
+    response.raise_for_status()
+    index = TaxonomyIndex(parse_taxonomy(response.text))
+    print(f"Indexed {len(index.paths)} taxonomy paths", file=sys.stderr)
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    start_time = time.time()
+    try:
+        totals = run_batch(read_products(args.products), index, model, output,
+                           args.workers, args.qps, args.top_k, args.max_retries)
+    finally:
+        if args.output:
+            output.close()
+
+    elapsed = time.time() - start_time
+    print(f"Classified {totals['ok']} products ({totals['failed']} failed) in {elapsed:.1f}s, "
+          f"{totals['prompt_tokens']} prompt tokens, ${totals['cost']:.6f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
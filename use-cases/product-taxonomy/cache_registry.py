@@ -0,0 +1,119 @@
+import datetime
+import hashlib
+import json
+import os
+import threading
+
+from google.api_core import exceptions as google_exceptions
+from vertexai.preview import caching
+from vertexai.preview.generative_models import Part
+
+# Where the key -> cached content mapping is stored so a restarted app can pick
+# up caches that are still alive on Vertex AI instead of creating new ones.
+DEFAULT_REGISTRY_PATH = os.environ.get("CACHE_REGISTRY_PATH", "cache_registry.json")
+DEFAULT_TTL = datetime.timedelta(minutes=60)
+# Extend the TTL once a cache gets this close to expiring
+DEFAULT_REFRESH_MARGIN = datetime.timedelta(minutes=10)
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class CacheRegistry:
+    """Reuses one CachedContent per (model, system instruction, taxonomy).
+
+    Entries are persisted as JSON. A cache that was evicted or expired on the
+    Vertex AI side is detected on lookup and transparently re-created.
+    """
+
+    def __init__(self, path=DEFAULT_REGISTRY_PATH, ttl=DEFAULT_TTL, refresh_margin=DEFAULT_REFRESH_MARGIN):
+        self.path = path
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable cache registry {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def make_key(model_name, system_instruction, taxonomy):
+        return f"{model_name}:{_sha256(system_instruction)[:16]}:{_sha256(taxonomy)[:16]}"
+
+    def get_or_create(self, model_name, system_instruction, taxonomy):
+        """Returns (cached_content, created) for the given inputs."""
+        key = self.make_key(model_name, system_instruction, taxonomy)
+        with self._lock:
+            cached_content = self._reuse(key)
+            if cached_content is not None:
+                return cached_content, False
+
+            cached_content = caching.CachedContent.create(
+                model_name=model_name,
+                system_instruction=system_instruction,
+                contents=[Part.from_text(taxonomy)],
+                ttl=self.ttl,
+            )
+            self._entries[key] = {
+                "name": cached_content.name,
+                "expire_time": (_utcnow() + self.ttl).isoformat(),
+            }
+            self._save()
+            return cached_content, True
+
+    def _reuse(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expire_time = datetime.datetime.fromisoformat(entry["expire_time"])
+        if expire_time <= _utcnow():
+            self._forget(key)
+            return None
+
+        try:
+            cached_content = caching.CachedContent(cached_content_name=entry["name"])
+        except google_exceptions.NotFound:
+            # Evicted or deleted on the server side
+            self._forget(key)
+            return None
+
+        if expire_time - _utcnow() < self.refresh_margin:
+            try:
+                cached_content.update(ttl=self.ttl)
+            except google_exceptions.NotFound:
+                self._forget(key)
+                return None
+            entry["expire_time"] = (_utcnow() + self.ttl).isoformat()
+            self._save()
+
+        return cached_content
+
+    def _forget(self, key):
+        self._entries.pop(key, None)
+        self._save()
+
+    def invalidate(self, cached_content_name):
+        """Drops a cache that failed at generation time so the next call re-creates it."""
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry["name"] == cached_content_name:
+                    self._forget(key)